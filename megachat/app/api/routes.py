@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from redis.asyncio import Redis
-from qdrant_client import QdrantClient
 from datetime import datetime
+import json
 import uuid
 
 from app.models.schemas import (
@@ -12,9 +13,15 @@ from app.models.schemas import (
     ProductResponse,
     Product,
 )
-from app.core.dependencies import get_redis, get_qdrant
+from app.core.config import get_settings
+from app.core.dependencies import get_redis, get_async_qdrant, get_pipeline
+from app.core.connections import get_connections
+from app.core.metrics import latency_snapshot
+from app.core.registry import ModelRegistry, get_registry
 from app.chains.rag_chain import RAGPipeline
-from app.services.retriever import MultiQueryRetriever
+from app.core.vector_store import AsyncVectorStore
+
+settings = get_settings()
 
 router = APIRouter()
 
@@ -22,18 +29,14 @@ router = APIRouter()
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    redis: Redis = Depends(get_redis),
-    qdrant: QdrantClient = Depends(get_qdrant),
+    pipeline: RAGPipeline = Depends(get_pipeline),
 ):
     """
     Main chat endpoint.
 
-    Process user query through RAG pipeline and return response.
+    Process user query through the shared RAG pipeline and return response.
     """
     try:
-        # Initialize RAG pipeline
-        pipeline = RAGPipeline(redis, qdrant)
-
         # Generate session_id if not provided
         session_id = request.session_id or str(uuid.uuid4())
 
@@ -68,10 +71,46 @@ async def chat(
         )
 
 
+def format_sse(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    pipeline: RAGPipeline = Depends(get_pipeline),
+):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+
+    Emits metadata, the reranked products as soon as they are known,
+    response tokens as the LLM produces them, and a final done event.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+
+    async def event_stream():
+        try:
+            async for event, data in pipeline.astream(
+                query=request.text,
+                user_id=request.user_id,
+                session_id=session_id
+            ):
+                yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Error processing chat request: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check(
     redis: Redis = Depends(get_redis),
-    qdrant: QdrantClient = Depends(get_qdrant),
+    qdrant: AsyncVectorStore = Depends(get_async_qdrant),
 ):
     """
     Health check endpoint.
@@ -89,7 +128,7 @@ async def health_check(
 
     # Check Qdrant
     try:
-        qdrant.get_collections()
+        await qdrant.get_collections()
         services["qdrant"] = True
     except Exception:
         services["qdrant"] = False
@@ -105,17 +144,47 @@ async def health_check(
     )
 
 
+@router.get("/stats")
+async def stats(registry: ModelRegistry = Depends(get_registry)):
+    """
+    Runtime statistics.
+
+    Reports load time and resident memory per shared component,
+    connection pool utilisation, cache hit rates and stage latencies.
+    """
+    return {
+        "models": registry.report(),
+        "connections": get_connections().metrics(),
+        "embedding_cache": registry.pipeline.embedding_cache.stats(),
+        "semantic_cache": registry.pipeline.semantic_cache.stats(),
+        "expansion": registry.pipeline.retriever.expansion.stats(),
+        "retrieval_policy": registry.pipeline.retrieval_policy.stats(),
+        "rerank_batching": registry.pipeline.reranker.batcher.stats(),
+        "rerank_cache": registry.pipeline.reranker.score_cache.stats(),
+        "rerank_cascade": registry.pipeline.reranker.cascade_stats(),
+        "latency": latency_snapshot(),
+    }
+
+
 @router.post("/products", response_model=ProductResponse)
 async def add_product(
     request: ProductCreateRequest,
-    qdrant: QdrantClient = Depends(get_qdrant),
+    pipeline: RAGPipeline = Depends(get_pipeline),
 ):
     """
     Add a product to the vector database.
+
+    Not available with VECTOR_STORE=local: the API opens the store
+    read-only, products are added with scripts/ingest_data.py.
     """
+    if settings.VECTOR_STORE == "local":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The local vector store is read-only in the API; add products with scripts/ingest_data.py",
+        )
+
     try:
-        retriever = MultiQueryRetriever(qdrant)
-        retriever.add_product(request.product)
+        await pipeline.retriever.aadd_product(request.product)
 
         return ProductResponse(
             product=request.product,
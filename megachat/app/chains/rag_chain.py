@@ -1,15 +1,26 @@
-from typing import Dict, Any
+import re
+import time
+from typing import Dict, Any, AsyncIterator, Tuple, TYPE_CHECKING
 from langgraph.graph import StateGraph, END
 from redis.asyncio import Redis
-from qdrant_client import QdrantClient
 
 from app.models.schemas import RAGState, IntentType
-from app.services.preprocessor import PersianPreprocessor
+from app.services.preprocessor import PersianPreprocessor, canonicalize
 from app.services.intent import IntentDetector
 from app.services.retriever import MultiQueryRetriever
 from app.services.reranker import RerankerService
 from app.services.generator import ResponseGenerator
-from app.services.cache import CacheService
+from app.services.cache import CacheService, EmbeddingCache, RerankScoreCache
+from app.services.semantic_cache import SemanticCache
+from app.services.expansion import ExpansionCache
+from app.services.retrieval_policy import RetrievalPolicy
+from app.core.vector_store import VectorStore, AsyncVectorStore
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from app.core.registry import ModelRegistry
+
+settings = get_settings()
 
 
 class RAGPipeline:
@@ -17,39 +28,78 @@ class RAGPipeline:
     LangGraph-based RAG pipeline for Persian sales chatbot.
 
     Pipeline:
-    1. Check cache
+    1. Check cache (canonical query key)
     2. Preprocess query
-    3. Detect intent & extract slots
-    4. Retrieve documents (if needed)
-    5. Rerank documents
-    6. Generate response
-    7. Cache response
+    3. Detect intent & extract slots, pick a retrieval budget
+    4. Check semantic cache (similar previously answered queries)
+    5. Retrieve documents (if the budget allows)
+    6. Rerank documents (if the budget allows)
+    7. Generate response
+    8. Cache response
     """
 
-    def __init__(self, redis_client: Redis, qdrant_client: QdrantClient):
+    def __init__(
+        self,
+        redis_client: Redis,
+        qdrant_client: VectorStore,
+        registry: "ModelRegistry" = None,
+        async_qdrant_client: AsyncVectorStore = None,
+        binary_redis_client: Redis = None,
+    ):
+        # Shared models come from the process-wide registry when available
+        models = registry.models if registry else {}
+
         # Initialize services
-        self.cache_service = CacheService(redis_client)
+        self.cache_service = CacheService(redis_client, binary_redis_client)
+        self.embedding_cache = EmbeddingCache(
+            self.cache_service if binary_redis_client is not None else None
+        )
+        self.semantic_cache = SemanticCache(self.cache_service)
         self.preprocessor = PersianPreprocessor()
         self.intent_detector = IntentDetector()
-        self.retriever = MultiQueryRetriever(qdrant_client)
-        self.reranker = RerankerService()
-        self.generator = ResponseGenerator()
+        self.retrieval_policy = RetrievalPolicy()
+        self.retriever = MultiQueryRetriever(
+            qdrant_client,
+            embedding_model=models.get("embedding_model"),
+            llm=models.get("expansion_llm"),
+            async_qdrant_client=async_qdrant_client,
+            embedding_cache=self.embedding_cache,
+            expansion_cache=ExpansionCache(redis_client),
+            sparse_index=models.get("sparse_index"),
+        )
+        self.embedding_cache.dim = self.retriever.embedding_model.get_sentence_embedding_dimension()
+        self.reranker = RerankerService(
+            model=models.get("reranker_model"),
+            score_cache=RerankScoreCache(
+                self.cache_service if settings.RERANK_CACHE_REDIS else None
+            ),
+        )
+        self.generator = ResponseGenerator(llm=models.get("generation_llm"))
 
-        # Build graph
+        # Build graph; the streaming path runs the same graph up to generation
         self.graph = self._build_graph()
+        self.stream_graph = self._build_graph(stream=True)
 
-    def _build_graph(self) -> StateGraph:
-        """Build LangGraph state graph"""
+    def _build_graph(self, stream: bool = False) -> StateGraph:
+        """
+        Build LangGraph state graph.
+
+        With stream=True the graph ends where generation would start, so
+        astream can run the LLM token by token and cache the result itself.
+        """
         workflow = StateGraph(dict)
 
         # Add nodes
         workflow.add_node("check_cache", self.check_cache)
         workflow.add_node("preprocess", self.preprocess)
         workflow.add_node("detect_intent", self.detect_intent)
+        workflow.add_node("check_semantic_cache", self.check_semantic_cache)
         workflow.add_node("retrieve", self.retrieve)
         workflow.add_node("rerank", self.rerank)
-        workflow.add_node("generate", self.generate)
-        workflow.add_node("cache_response", self.cache_response)
+        if not stream:
+            workflow.add_node("generate", self.generate)
+            workflow.add_node("cache_response", self.cache_response)
+        generate = END if stream else "generate"
 
         # Define edges
         workflow.set_entry_point("check_cache")
@@ -65,28 +115,32 @@ class RAGPipeline:
         )
 
         workflow.add_edge("preprocess", "detect_intent")
+        workflow.add_edge("detect_intent", "check_semantic_cache")
 
-        # Conditional: if greeting, skip retrieval
+        # Conditional: if semantically cached, skip to end; if greeting, skip retrieval
         workflow.add_conditional_edges(
-            "detect_intent",
-            self.should_retrieve,
+            "check_semantic_cache",
+            self.route_after_semantic_cache,
             {
+                "use_cache": END,
                 "retrieve": "retrieve",
-                "skip_retrieval": "generate"
+                "skip_retrieval": generate
             }
         )
 
         workflow.add_edge("retrieve", "rerank")
-        workflow.add_edge("rerank", "generate")
-        workflow.add_edge("generate", "cache_response")
-        workflow.add_edge("cache_response", END)
+        workflow.add_edge("rerank", generate)
+        if not stream:
+            workflow.add_edge("generate", "cache_response")
+            workflow.add_edge("cache_response", END)
 
         return workflow.compile()
 
     async def check_cache(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Check if response is cached"""
-        query = state["query"]
-        cached_response = await self.cache_service.get_cached_response(query)
+        """Check if response is cached (keyed on the canonical query)"""
+        cache_key = canonicalize(state["query"])
+        state["cache_key"] = cache_key
+        cached_response = await self.semantic_cache.get_exact(cache_key)
 
         if cached_response:
             state["final_response"] = cached_response
@@ -108,7 +162,7 @@ class RAGPipeline:
         return state
 
     async def detect_intent(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Detect intent and extract slots"""
+        """Detect intent, extract slots and choose the retrieval budget"""
         original_query = state["query"]
         normalized_query = state["normalized_query"]
 
@@ -116,15 +170,49 @@ class RAGPipeline:
 
         state["intent"] = parsed.intent
         state["slots"] = parsed.slots
+        state["confidence"] = parsed.confidence
+        state["retrieval_budget"] = self.retrieval_policy.select(
+            parsed.intent, parsed.slots, parsed.confidence
+        )
+
+        return state
+
+    async def check_semantic_cache(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Look up similar previously answered queries. Requests without
+        retrieval (greetings, "none" budget) skip it and never embed.
+        """
+        if self.should_retrieve(state) == "skip_retrieval":
+            return state
+
+        normalized_query = state["normalized_query"]
+
+        # Embedding is cached, so retrieval reuses it for the original query
+        embedding = (await self.retriever.aembed_texts([normalized_query]))[0]
+        state["query_embedding"] = embedding
+        cached_response = await self.semantic_cache.get_similar(
+            embedding, state.get("intent"), state.get("slots")
+        )
+
+        if cached_response:
+            state["final_response"] = cached_response
+            state["from_cache"] = True
 
         return state
 
+    def route_after_semantic_cache(self, state: Dict[str, Any]) -> str:
+        """Use a semantic cache hit, otherwise route on intent"""
+        if state.get("from_cache", False):
+            return "use_cache"
+        return self.should_retrieve(state)
+
     def should_retrieve(self, state: Dict[str, Any]) -> str:
         """Decide whether to retrieve documents"""
         intent = state.get("intent")
+        budget = state.get("retrieval_budget")
 
-        # Skip retrieval for greetings
-        if intent == IntentType.GREETING:
+        # Skip retrieval for greetings and zero-budget requests
+        if intent == IntentType.GREETING or (budget is not None and budget.top_k == 0):
             return "skip_retrieval"
 
         return "retrieve"
@@ -134,22 +222,37 @@ class RAGPipeline:
         query = state["normalized_query"]
         intent = state.get("intent")
         slots = state.get("slots")
+        budget = state.get("retrieval_budget") or self.retrieval_policy.select(intent, slots)
 
-        retrieved_docs = self.retriever.retrieve(query, intent, slots)
+        state["retrieval_started"] = time.perf_counter()
+        retrieved_docs = await self.retriever.aretrieve(
+            query, intent, slots, num_variations=budget.variations, top_k=budget.top_k
+        )
         state["retrieved_docs"] = retrieved_docs
 
         return state
 
     async def rerank(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Rerank retrieved documents"""
+        """Rerank retrieved documents (vector order is kept when the budget skips reranking)"""
         query = state["normalized_query"]
         retrieved_docs = state.get("retrieved_docs", [])
+        budget = state.get("retrieval_budget")
 
-        if retrieved_docs:
-            reranked_docs = self.reranker.rerank(query, retrieved_docs)
+        if retrieved_docs and (budget is None or budget.rerank):
+            rerank_stats = {}
+            reranked_docs = await self.reranker.arerank(query, retrieved_docs, stats=rerank_stats)
             state["reranked_docs"] = reranked_docs
+            state["rerank_cache"] = rerank_stats
         else:
-            state["reranked_docs"] = []
+            state["reranked_docs"] = retrieved_docs[:settings.RERANK_TOP_K]
+
+        if budget is not None and "retrieval_started" in state:
+            self.retrieval_policy.record(
+                budget,
+                (time.perf_counter() - state["retrieval_started"]) * 1000,
+                state["reranked_docs"],
+                rerank_skipped=bool((state.get("rerank_cache") or {}).get("skipped")),
+            )
 
         return state
 
@@ -159,17 +262,26 @@ class RAGPipeline:
         intent = state.get("intent", IntentType.GENERAL)
         reranked_docs = state.get("reranked_docs", [])
 
-        response = self.generator.generate(query, intent, reranked_docs)
+        response = await self.generator.agenerate(query, intent, reranked_docs)
         state["final_response"] = response
 
         return state
 
     async def cache_response(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Cache the generated response"""
-        query = state["query"]
+        cache_key = state["cache_key"]
         response = state["final_response"]
 
-        await self.cache_service.set_cached_response(query, response)
+        if state.get("query_embedding") is not None:
+            await self.semantic_cache.add(
+                cache_key,
+                state["query_embedding"],
+                state.get("intent", IntentType.GENERAL),
+                state.get("slots"),
+                response,
+            )
+        else:
+            await self.cache_service.set_cached_response(cache_key, response)
 
         return state
 
@@ -197,3 +309,67 @@ class RAGPipeline:
         final_state = await self.graph.ainvoke(initial_state)
 
         return final_state
+
+    @staticmethod
+    def _stream_metadata(state: Dict[str, Any]) -> Dict[str, Any]:
+        intent = state.get("intent")
+        return {
+            "session_id": state.get("session_id"),
+            "intent": getattr(intent, "value", intent),
+            "retrieval_budget": getattr(state.get("retrieval_budget"), "name", None),
+            "rerank_cache": state.get("rerank_cache"),
+            "from_cache": state.get("from_cache", False),
+        }
+
+    async def astream(
+        self, query: str, user_id: str, session_id: str = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run the pipeline and stream (event, data) pairs.
+
+        Runs the streaming graph (the same nodes and routing as the full
+        graph, up to generation), then emits the reranked products and the
+        response as LLM tokens. Cached responses are replayed through the
+        same token events. If the LLM stream fails, the exception
+        propagates (the route sends an error event instead of done) and
+        the partial response is not cached.
+
+        Events: metadata, products, token, done
+        """
+        state = {
+            "query": query,
+            "user_id": user_id,
+            "session_id": session_id,
+            "from_cache": False,
+        }
+
+        state = await self.stream_graph.ainvoke(state)
+
+        if state.get("from_cache", False):
+            yield "metadata", self._stream_metadata(state)
+            for chunk in re.findall(r"\S+\s*", state["final_response"]):
+                yield "token", {"text": chunk}
+            yield "done", self._stream_metadata(state)
+            return
+
+        yield "metadata", self._stream_metadata(state)
+        yield "products", {
+            "products": [
+                doc.product.model_dump(mode="json")
+                for doc in state.get("reranked_docs", [])
+            ]
+        }
+
+        chunks = []
+        async for chunk in self.generator.astream(
+            state["query"],
+            state.get("intent", IntentType.GENERAL),
+            state.get("reranked_docs", []),
+        ):
+            chunks.append(chunk)
+            yield "token", {"text": chunk}
+
+        state["final_response"] = "".join(chunks).strip()
+        await self.cache_response(state)
+
+        yield "done", self._stream_metadata(state)
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -12,12 +13,32 @@ class Settings(BaseSettings):
     QDRANT_HOST: str = "localhost"
     QDRANT_PORT: int = 6333
     QDRANT_COLLECTION_NAME: str = "products"
+    QDRANT_POOL_SIZE: int = 20
+    QDRANT_TIMEOUT: int = 10
+    # Vector store backend: "qdrant" (server) or "local" (in-process index persisted
+    # under LOCAL_VECTOR_STORE_PATH; no network hop, one process per store directory)
+    VECTOR_STORE: str = "qdrant"
+    LOCAL_VECTOR_STORE_PATH: str = "data/vector_store"
+    # Local index: "brute" (exact NumPy scan), "hnsw" (graph) or "auto" (HNSW from
+    # LOCAL_HNSW_THRESHOLD points); filters keeping less than LOCAL_FILTER_BRUTE_FRACTION
+    # of the points are always scanned exactly
+    LOCAL_INDEX: str = "auto"
+    LOCAL_HNSW_THRESHOLD: int = 20000
+    LOCAL_HNSW_M: int = 16
+    LOCAL_HNSW_EF_CONSTRUCTION: int = 100
+    LOCAL_HNSW_EF_SEARCH: int = 64
+    LOCAL_FILTER_BRUTE_FRACTION: float = 0.3
 
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: str = ""
+    REDIS_POOL_SIZE: int = 50
+    REDIS_POOL_TIMEOUT: int = 5
+
+    # Connection health checks (seconds between probes)
+    CONNECTION_HEALTH_INTERVAL: int = 30
 
     # PostgreSQL
     POSTGRES_HOST: str = "localhost"
@@ -36,11 +57,100 @@ class Settings(BaseSettings):
     CACHE_EMBEDDING_TTL: int = 86400
     CACHE_PRODUCT_TTL: int = 3600
     CACHE_SESSION_TTL: int = 1800
+    CACHE_RERANK_TTL: int = 86400
+
+    # In-process embedding cache (entries, in front of Redis)
+    EMBEDDING_CACHE_SIZE: int = 10000
+    # Redis embedding encoding: "float32", "float16" or "int8"
+    EMBEDDING_CACHE_CODEC: str = "float32"
+    # Look up (and rewrite) pre-versioned embedding keys on a miss; each worker stops
+    # after CACHE_EMBEDDING_TTL seconds, by when every legacy entry has expired
+    EMBEDDING_CACHE_MIGRATE_LEGACY: bool = True
+
+    # Semantic response cache (answered queries indexed per worker)
+    SEMANTIC_CACHE_SIZE: int = 5000
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+
+    # Cross-encoder pair-score cache (in-process entries; Redis tier when RERANK_CACHE_REDIS)
+    RERANK_CACHE_SIZE: int = 50000
+    RERANK_CACHE_REDIS: bool = True
 
     # Retrieval Settings
     RETRIEVAL_TOP_K: int = 10
     RERANK_TOP_K: int = 3
     QUERY_VARIATIONS: int = 3
+    RETRIEVAL_FUSION: str = "max"  # "max" or "rrf"
+    RRF_K: int = 60
+    # Search the original query while expansion runs; stop waiting after the deadline
+    SPECULATIVE_RETRIEVAL: bool = True
+    EXPANSION_DEADLINE_MS: int = 1500
+    # Expansion backend per intent ("llm", "local" or "none"); "default" covers the rest
+    EXPANSION_BACKENDS: Dict[str, str] = {
+        "default": "llm",
+        "price_check": "local",
+        "availability": "local",
+        "shipping": "none",
+        "greeting": "none",
+    }
+    # In-process expansion cache (entries, in front of the Redis hash)
+    EXPANSION_CACHE_SIZE: int = 10000
+    # Hybrid retrieval: BM25 index built by scripts/ingest_data.py, fused with dense
+    # results (RRF); identifier queries whose top BM25 hit leads by SPARSE_EXACT_MARGIN
+    # (score ratio) skip the embedding model
+    HYBRID_RETRIEVAL: bool = True
+    SPARSE_INDEX_PATH: str = "data/bm25_index.npz"
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    SPARSE_WEIGHT: float = 1.0
+    SPARSE_EXACT_MARGIN: float = 1.5
+    # Payload filters pushed down to Qdrant: price range from slots (unpriced products
+    # kept when FILTER_KEEP_UNPRICED), in-stock only, and restriction to channels
+    FILTER_KEEP_UNPRICED: bool = True
+    FILTER_AVAILABLE_ONLY: bool = False
+    SEARCH_CHANNELS: List[str] = []
+    # Intent-aware retrieval budgets; "lookup"/"focused" need this detector confidence
+    RETRIEVAL_POLICY_ENABLED: bool = True
+    RETRIEVAL_POLICY_CONFIDENCE: float = 0.8
+
+    # Product search text, computed at ingestion: embedded in full; the cross-encoder
+    # input is cut to this many reranker tokens (0 = full text), optionally storing the token ids
+    SEARCH_TEXT_MAX_TOKENS: int = 256
+    SEARCH_TEXT_TOKEN_IDS: bool = False
+
+    # Inference (threads for embedding/reranking off the event loop)
+    INFERENCE_WORKERS: int = 4
+    # Embedding/reranker runtime: "torch" or "onnx" (exported once to ONNX_MODEL_DIR)
+    INFERENCE_BACKEND: str = "torch"
+    ONNX_MODEL_DIR: str = "models/onnx"
+    ONNX_QUANTIZE: bool = True  # dynamic int8 weights
+    ONNX_THREADS: int = 0  # intra-op threads per session; 0 = cores / INFERENCE_WORKERS
+    # Cascade reranking: cheap first stage keeps RERANK_CASCADE_HEAD candidates for the
+    # cross-encoder; skip it when the top_k vector scores lead the rest by
+    # RERANK_CASCADE_SKIP_MARGIN of the candidates' score spread (scale-free: cosine or RRF)
+    RERANK_CASCADE: bool = True
+    RERANK_CASCADE_HEAD: int = 6
+    RERANK_CASCADE_SKIP_MARGIN: float = 0.3
+    RERANK_CASCADE_LEXICAL_WEIGHT: float = 0.3
+    # Cross-encoder micro-batching across concurrent requests
+    RERANK_BATCHING: bool = True
+    RERANK_MAX_BATCH: int = 64  # query-document pairs per forward pass
+    RERANK_MAX_WAIT_MS: float = 5
+    # Bulk ingestion (scripts/ingest_data.py): products per embedding call, points per
+    # upsert request, upsert requests in flight, embedding processes (0 = in-process)
+    INGEST_EMBED_BATCH: int = 256
+    INGEST_UPSERT_BATCH: int = 128
+    INGEST_PARALLEL_UPSERTS: int = 4
+    INGEST_WORKERS: int = 0
+    INGEST_QUEUE_SIZE: int = 1024  # items buffered between streaming pipeline stages
+    # Incremental ingestion: per-channel manifests of ingested posts (content hashes),
+    # checkpointed every INGEST_CHECKPOINT_EVERY acknowledged products
+    INGEST_MANIFEST_DIR: str = "data/ingest_manifest"
+    INGEST_CHECKPOINT_EVERY: int = 500
+    # Persistent embedding store written by ingestion (memory-mapped matrix + id index
+    # per embedding version); rebuilding a collection reads vectors from it
+    EMBEDDING_STORE: bool = True
+    EMBEDDING_STORE_DIR: str = "data/embeddings"
+    EMBEDDING_STORE_DTYPE: str = "float32"  # or "float16" (half the size)
 
     # Model Settings
     EMBEDDING_MODEL: str = "intfloat/multilingual-e5-large"
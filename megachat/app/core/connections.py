@@ -0,0 +1,236 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set
+import httpx
+from redis.asyncio import Redis, BlockingConnectionPool
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from app.core.config import get_settings
+from app.core.vector_store import (
+    AsyncLocalVectorStore,
+    AsyncVectorStore,
+    VectorStore,
+    get_local_vector_store,
+)
+
+settings = get_settings()
+
+
+def _qdrant_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.QDRANT_POOL_SIZE,
+        max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+    )
+
+
+def create_qdrant_client(read_only: bool = False) -> VectorStore:
+    """
+    Create a Qdrant client with a bounded keep-alive HTTP pool, or the local
+    store with VECTOR_STORE=local (read_only: the API, which must not
+    overwrite what ingestion saved)
+    """
+    if settings.VECTOR_STORE == "local":
+        return get_local_vector_store(read_only)
+    return QdrantClient(
+        host=settings.QDRANT_HOST,
+        port=settings.QDRANT_PORT,
+        timeout=settings.QDRANT_TIMEOUT,
+        limits=_qdrant_limits(),
+    )
+
+
+def create_async_qdrant_client(read_only: bool = False) -> AsyncVectorStore:
+    """Create an async Qdrant client with a bounded keep-alive HTTP pool (or the local store)"""
+    if settings.VECTOR_STORE == "local":
+        return AsyncLocalVectorStore(get_local_vector_store(read_only))
+    return AsyncQdrantClient(
+        host=settings.QDRANT_HOST,
+        port=settings.QDRANT_PORT,
+        timeout=settings.QDRANT_TIMEOUT,
+        limits=_qdrant_limits(),
+    )
+
+
+class TrackedConnectionPool(BlockingConnectionPool):
+    """
+    BlockingConnectionPool that counts its own checkouts for /stats (the
+    pool's connection lists are private to redis-py). Holds at most
+    max_connections connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checked_out: Set[Any] = set()
+        self.opened: Set[Any] = set()
+
+    async def get_connection(self, *args, **kwargs):
+        connection = await super().get_connection(*args, **kwargs)
+        self.checked_out.add(connection)
+        self.opened.add(connection)
+        return connection
+
+    async def release(self, connection) -> None:
+        self.checked_out.discard(connection)
+        await super().release(connection)
+
+
+class ConnectionManager:
+    """
+    Long-lived, pooled Redis and Qdrant clients shared by all requests.
+
+    Created once in the app lifespan. A background task pings both
+    services and rebuilds a client after a failed health check, so a
+    restarted Redis/Qdrant does not leave the worker with dead sockets.
+    A local vector store (VECTOR_STORE=local) is in process: it is neither
+    probed nor rebuilt.
+    """
+
+    def __init__(self):
+        self.redis_pool = TrackedConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.REDIS_POOL_SIZE,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            encoding="utf-8",
+            decode_responses=True,
+        )
+        self.redis = Redis(connection_pool=self.redis_pool)
+        # Separate pool for raw-bytes values (e.g. packed embeddings)
+        self.redis_binary_pool = TrackedConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.REDIS_POOL_SIZE,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+        )
+        self.redis_binary = Redis(connection_pool=self.redis_binary_pool)
+        # The API only reads a local store; ingestion owns its directory
+        self.qdrant = create_qdrant_client(read_only=True)
+        self.async_qdrant = create_async_qdrant_client(read_only=True)
+
+        self.healthy: Dict[str, bool] = {"redis": True, "qdrant": True}
+        self.reconnects: Dict[str, int] = {"redis": 0, "qdrant": 0}
+        self._qdrant_listeners: List[Callable[[VectorStore, AsyncVectorStore], None]] = []
+        self._health_task: Optional[asyncio.Task] = None
+
+    def on_qdrant_reconnect(
+        self, listener: Callable[[VectorStore, AsyncVectorStore], None]
+    ) -> None:
+        """Register a callback that receives the new clients after a reconnect"""
+        self._qdrant_listeners.append(listener)
+
+    async def check_redis(self) -> bool:
+        """Ping Redis; drop pooled connections if it is unreachable"""
+        try:
+            await self.redis.ping()
+            self.healthy["redis"] = True
+        except Exception as e:
+            print(f"Redis health check failed: {e}")
+            if self.healthy["redis"]:
+                # Stale sockets are discarded, new ones are opened lazily
+                await self.redis_pool.disconnect()
+                await self.redis_binary_pool.disconnect()
+                self.reconnects["redis"] += 1
+            self.healthy["redis"] = False
+        return self.healthy["redis"]
+
+    async def check_qdrant(self) -> bool:
+        """Probe Qdrant; rebuild the client (and its HTTP pool) on failure"""
+        if settings.VECTOR_STORE == "local":
+            return self.healthy["qdrant"]
+        try:
+            await self.async_qdrant.get_collections()
+            self.healthy["qdrant"] = True
+        except Exception as e:
+            print(f"Qdrant health check failed: {e}")
+            if self.healthy["qdrant"]:
+                await self._reconnect_qdrant()
+            self.healthy["qdrant"] = False
+        return self.healthy["qdrant"]
+
+    async def _reconnect_qdrant(self) -> None:
+        old_client, old_async_client = self.qdrant, self.async_qdrant
+        self.qdrant = create_qdrant_client(read_only=True)
+        self.async_qdrant = create_async_qdrant_client(read_only=True)
+        self.reconnects["qdrant"] += 1
+        for listener in self._qdrant_listeners:
+            listener(self.qdrant, self.async_qdrant)
+        try:
+            old_client.close()
+            await old_async_client.close()
+        except Exception:
+            pass
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.CONNECTION_HEALTH_INTERVAL)
+            await self.check_redis()
+            await self.check_qdrant()
+
+    def start(self) -> None:
+        """Start background health checks"""
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        """Stop health checks and close all pooled connections"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        await self.redis.close()
+        await self.redis_pool.disconnect()
+        await self.redis_binary.close()
+        await self.redis_binary_pool.disconnect()
+        self.qdrant.close()
+        await self.async_qdrant.close()
+
+    @staticmethod
+    def _pool_metrics(pool: TrackedConnectionPool) -> Dict[str, Any]:
+        in_use = len(pool.checked_out)
+        idle = len(pool.opened) - in_use
+        return {
+            "max_connections": pool.max_connections,
+            "in_use": in_use,
+            "idle": idle,
+            "utilisation": round(in_use / pool.max_connections, 3),
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pool utilisation and health per backend"""
+        return {
+            "redis": {
+                "healthy": self.healthy["redis"],
+                **self._pool_metrics(self.redis_pool),
+                "binary_pool": self._pool_metrics(self.redis_binary_pool),
+                "reconnects": self.reconnects["redis"],
+            },
+            "qdrant": {
+                "healthy": self.healthy["qdrant"],
+                "max_connections": settings.QDRANT_POOL_SIZE,
+                "reconnects": self.reconnects["qdrant"],
+            },
+        }
+
+
+_connections: Optional[ConnectionManager] = None
+
+
+def init_connections() -> ConnectionManager:
+    """Create the worker's connection pools and start health checks"""
+    global _connections
+    _connections = ConnectionManager()
+    _connections.start()
+    return _connections
+
+
+def get_connections() -> Optional[ConnectionManager]:
+    """Get the worker's connection manager (None outside the app, e.g. scripts)"""
+    return _connections
+
+
+async def close_connections() -> None:
+    """Close the worker's connection pools"""
+    global _connections
+    if _connections is not None:
+        await _connections.close()
+        _connections = None
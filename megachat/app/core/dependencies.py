@@ -1,8 +1,10 @@
 from typing import AsyncGenerator
 from redis.asyncio import Redis
-from qdrant_client import QdrantClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from app.core.vector_store import AsyncVectorStore, VectorStore
 from app.core.config import get_settings
+from app.core.connections import get_connections, create_qdrant_client
+from app.core.registry import get_registry
 
 settings = get_settings()
 
@@ -35,21 +37,23 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def get_redis() -> Redis:
-    """Get Redis client"""
-    redis_client = Redis.from_url(
-        settings.redis_url,
-        encoding="utf-8",
-        decode_responses=True
-    )
-    try:
-        yield redis_client
-    finally:
-        await redis_client.close()
-
-
-def get_qdrant() -> QdrantClient:
-    """Get Qdrant client"""
-    return QdrantClient(
-        host=settings.QDRANT_HOST,
-        port=settings.QDRANT_PORT
-    )
+    """Get the pooled Redis client"""
+    return get_connections().redis
+
+
+def get_qdrant() -> VectorStore:
+    """Get the pooled Qdrant client (a standalone one outside the app, e.g. scripts)"""
+    connections = get_connections()
+    if connections is None:
+        return create_qdrant_client()
+    return connections.qdrant
+
+
+async def get_async_qdrant() -> AsyncVectorStore:
+    """Get the pooled async Qdrant client (for request handlers)"""
+    return get_connections().async_qdrant
+
+
+def get_pipeline():
+    """Get the shared RAG pipeline built at startup"""
+    return get_registry().pipeline
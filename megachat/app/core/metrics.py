@@ -0,0 +1,78 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds"""
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float) -> None:
+        """Record one latency sample"""
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BUCKETS_MS, value_ms)] += 1
+            self.count += 1
+            self.total_ms += value_ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-th percentile"""
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return float(self.BUCKETS_MS[i]) if i < len(self.BUCKETS_MS) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, mean, approximate percentiles and bucket counts"""
+        labels = [f"<={bound}" for bound in self.BUCKETS_MS] + ["+inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def get_histogram(name: str) -> LatencyHistogram:
+    """Get (or create) the process-wide histogram for a name"""
+    with _histograms_lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram()
+        return _histograms[name]
+
+
+@contextmanager
+def record_latency(name: str) -> Iterator[None]:
+    """Record the wall time of a block (including awaits) into a histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_histogram(name).observe((time.perf_counter() - start) * 1000)
+
+
+def latency_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of all histograms"""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {name: histogram.snapshot() for name, histogram in sorted(histograms.items())}
@@ -0,0 +1,216 @@
+import os
+from pathlib import Path
+from typing import List, Sequence, Tuple
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def session_options() -> ort.SessionOptions:
+    """
+    ONNX Runtime options tuned for CPU inference next to the executor.
+
+    Each inference worker runs its own forward pass, so intra-op threads
+    are split across INFERENCE_WORKERS instead of every session grabbing
+    all cores (ONNX_THREADS overrides the split).
+    """
+    threads = settings.ONNX_THREADS or max(1, (os.cpu_count() or 1) // settings.INFERENCE_WORKERS)
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def model_path(model_name: str, quantize: bool) -> Path:
+    """Location of an exported model under ONNX_MODEL_DIR"""
+    suffix = "int8" if quantize else "fp32"
+    return Path(settings.ONNX_MODEL_DIR) / model_name.replace("/", "__") / f"model.{suffix}.onnx"
+
+
+def export_model(model_name: str, kind: str, quantize: bool = True) -> Path:
+    """
+    Export a Hugging Face model to ONNX (once) and optionally apply
+    dynamic int8 quantisation to its weights.
+
+    kind: "embedding" (encoder hidden states) or "cross_encoder" (logits)
+    """
+    target = model_path(model_name, quantize)
+    if target.exists():
+        return target
+
+    fp32_path = model_path(model_name, quantize=False)
+    if not fp32_path.exists():
+        import torch
+        from transformers import AutoModel, AutoModelForSequenceClassification
+
+        model_class = AutoModel if kind == "embedding" else AutoModelForSequenceClassification
+        model = model_class.from_pretrained(model_name).eval()
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        sample = tokenizer(["export"], ["export"] if kind == "cross_encoder" else None, return_tensors="pt")
+        input_names = list(sample.keys())
+        output_name = "last_hidden_state" if kind == "embedding" else "logits"
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        # Hidden states are (batch, sequence, hidden); logits (batch, labels)
+        dynamic_axes[output_name] = {0: "batch", 1: "sequence"} if kind == "embedding" else {0: "batch"}
+
+        fp32_path.parent.mkdir(parents=True, exist_ok=True)
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                str(fp32_path),
+                input_names=input_names,
+                output_names=[output_name],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(fp32_path.parent)
+        print(f"Exported {model_name} to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantize_dynamic(str(fp32_path), str(target), weight_type=QuantType.QInt8)
+        print(f"Quantised {model_name} to {target}")
+
+    return target
+
+
+class OnnxModel:
+    """Tokenizer + ONNX Runtime session for one exported model"""
+
+    kind = ""
+
+    def __init__(self, model_name: str, quantize: bool = None, max_length: int = 512):
+        quantize = settings.ONNX_QUANTIZE if quantize is None else quantize
+        path = export_model(model_name, self.kind, quantize)
+
+        self.model_name = model_name
+        self.quantized = quantize
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(path.parent)
+        self.session = ort.InferenceSession(
+            str(path), sess_options=session_options(), providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _session_run(self, encoded) -> Tuple[np.ndarray, np.ndarray]:
+        feed = {
+            name: np.asarray(value, dtype=np.int64)
+            for name, value in encoded.items()
+            if name in self.input_names
+        }
+        return self.session.run(None, feed)[0], np.asarray(encoded["attention_mask"])
+
+    def _run(self, *texts, batch_size: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        outputs = []
+        total = len(texts[0])
+        for start in range(0, total, batch_size):
+            chunk = [t[start:start + batch_size] for t in texts]
+            encoded = self.tokenizer(
+                *chunk,
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            outputs.append(self._session_run(encoded))
+        return outputs
+
+
+class OnnxEmbedder(OnnxModel):
+    """
+    Drop-in for SentenceTransformer.encode on an e5-style model
+    (mean pooling over the attention mask, L2-normalised).
+    """
+
+    kind = "embedding"
+
+    def encode(
+        self,
+        sentences: Sequence[str],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        chunks = []
+        for hidden, mask in self._run(texts, batch_size=max(batch_size, 1)):
+            mask = mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            chunks.append(pooled.astype(np.float32))
+
+        embeddings = np.vstack(chunks)
+        return embeddings[0] if single else embeddings
+
+    @property
+    def dimension(self) -> int:
+        return self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+
+class OnnxCrossEncoder(OnnxModel):
+    """
+    Drop-in for CrossEncoder.predict (sigmoid over a single logit).
+
+    Pairs may carry the document's stored token ids as a third element;
+    documents are then not re-tokenised, only joined to the query ids.
+    """
+
+    kind = "cross_encoder"
+    accepts_token_ids = True
+
+    def _run_token_ids(self, pairs: Sequence[Sequence], batch_size: int):
+        outputs = []
+        for start in range(0, len(pairs), batch_size):
+            chunk = pairs[start:start + batch_size]
+            query_ids = self.tokenizer(
+                [pair[0] for pair in chunk], add_special_tokens=False
+            )["input_ids"]
+            features = [
+                self.tokenizer.prepare_for_model(
+                    q_ids,
+                    list(pair[2]),
+                    truncation="only_second",
+                    max_length=self.max_length,
+                )
+                for q_ids, pair in zip(query_ids, chunk)
+            ]
+            encoded = self.tokenizer.pad(features, return_tensors="np")
+            outputs.append(self._session_run(encoded))
+        return outputs
+
+    def predict(self, sentences: Sequence[Sequence], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if not sentences:
+            return np.zeros(0, dtype=np.float32)
+
+        batch_size = max(batch_size, 1)
+        if all(len(pair) > 2 for pair in sentences):
+            batches = self._run_token_ids(sentences, batch_size)
+        else:
+            queries = [pair[0] for pair in sentences]
+            documents = [pair[1] for pair in sentences]
+            batches = self._run(queries, documents, batch_size=batch_size)
+
+        scores = []
+        for logits, _ in batches:
+            if logits.shape[-1] == 1:
+                scores.append(1 / (1 + np.exp(-logits[:, 0])))
+            else:
+                scores.append(logits)
+
+        return np.concatenate(scores).astype(np.float32)
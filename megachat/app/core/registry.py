@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+from redis.asyncio import Redis
+from sentence_transformers import SentenceTransformer, CrossEncoder
+from langchain_openai import ChatOpenAI
+from app.core.vector_store import VectorStore, AsyncVectorStore
+from app.core.config import get_settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+settings = get_settings()
+
+
+def current_rss_mb() -> float:
+    """Resident memory of the current process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # Fall back to peak RSS where /proc is not available (KB on Linux, bytes on macOS)
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return 0.0
+
+
+@dataclass
+class ComponentStats:
+    """Load cost of a single registry component"""
+
+    load_seconds: float
+    rss_delta_mb: float
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of models and the compiled RAG pipeline.
+
+    Each component is loaded once per worker (in the app lifespan) and
+    shared by every request, so /chat no longer pays model loading,
+    client construction and graph compilation on each call.
+    """
+
+    def __init__(self):
+        self.models: Dict[str, Any] = {}
+        self.stats: Dict[str, ComponentStats] = {}
+        self.pipeline = None
+
+    def load(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Load a component once, recording load time and memory growth"""
+        if name in self.models:
+            return self.models[name]
+
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+
+        component = factory()
+
+        self.stats[name] = ComponentStats(
+            load_seconds=round(time.perf_counter() - start, 3),
+            rss_delta_mb=round(current_rss_mb() - rss_before, 1),
+        )
+        self.models[name] = component
+        return component
+
+    def load_models(self) -> None:
+        """Load embedding, reranker and LLM clients"""
+        if settings.INFERENCE_BACKEND == "onnx":
+            # Imported lazily: onnxruntime is only needed for this backend
+            from app.core.onnx_backend import OnnxEmbedder, OnnxCrossEncoder
+
+            self.load(
+                "embedding_model",
+                lambda: OnnxEmbedder(settings.EMBEDDING_MODEL),
+            )
+            self.load(
+                "reranker_model",
+                lambda: OnnxCrossEncoder(settings.RERANKER_MODEL),
+            )
+        elif settings.INFERENCE_BACKEND == "torch":
+            self.load(
+                "embedding_model",
+                lambda: SentenceTransformer(settings.EMBEDDING_MODEL),
+            )
+            self.load(
+                "reranker_model",
+                lambda: CrossEncoder(settings.RERANKER_MODEL),
+            )
+        else:
+            raise ValueError(f"Unknown inference backend: {settings.INFERENCE_BACKEND}")
+        # Imported lazily like the ONNX backend (pulls in Hazm)
+        from app.services.sparse_index import load_sparse_index
+
+        self.load("sparse_index", load_sparse_index)
+        self.load(
+            "expansion_llm",
+            lambda: ChatOpenAI(
+                model=settings.LLM_MODEL,
+                temperature=0.3,
+                api_key=settings.OPENAI_API_KEY,
+            ),
+        )
+        self.load(
+            "generation_llm",
+            lambda: ChatOpenAI(
+                model=settings.LLM_MODEL,
+                temperature=settings.LLM_TEMPERATURE,
+                max_tokens=settings.LLM_MAX_TOKENS,
+                api_key=settings.OPENAI_API_KEY,
+            ),
+        )
+
+    def build_pipeline(
+        self,
+        redis_client: Redis,
+        qdrant_client: VectorStore,
+        async_qdrant_client: AsyncVectorStore = None,
+        binary_redis_client: Redis = None,
+    ):
+        """Build the shared RAG pipeline (compiles the LangGraph graph once)"""
+        from app.chains.rag_chain import RAGPipeline
+
+        self.pipeline = self.load(
+            "pipeline",
+            lambda: RAGPipeline(
+                redis_client,
+                qdrant_client,
+                registry=self,
+                async_qdrant_client=async_qdrant_client,
+                binary_redis_client=binary_redis_client,
+            ),
+        )
+        return self.pipeline
+
+    def rebind_qdrant(
+        self, qdrant_client: VectorStore, async_qdrant_client: AsyncVectorStore
+    ) -> None:
+        """Point the shared pipeline at reconnected Qdrant clients"""
+        if self.pipeline is not None:
+            self.pipeline.retriever.qdrant = qdrant_client
+            self.pipeline.retriever.async_qdrant = async_qdrant_client
+
+    def report(self) -> Dict[str, Any]:
+        """Load time and resident memory per component"""
+        return {
+            "components": {name: asdict(stats) for name, stats in self.stats.items()},
+            "rss_mb": round(current_rss_mb(), 1),
+        }
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def init_registry(
+    redis_client: Redis,
+    qdrant_client: VectorStore,
+    async_qdrant_client: AsyncVectorStore = None,
+    binary_redis_client: Redis = None,
+) -> ModelRegistry:
+    """Create the worker's registry, load all models and build the pipeline"""
+    global _registry
+    registry = ModelRegistry()
+    registry.load_models()
+    registry.build_pipeline(
+        redis_client, qdrant_client, async_qdrant_client, binary_redis_client
+    )
+    _registry = registry
+    return registry
+
+
+def get_registry() -> ModelRegistry:
+    """Get the worker's registry (initialised in the app lifespan)"""
+    if _registry is None:
+        raise RuntimeError("Model registry is not initialised; start the app via its lifespan")
+    return _registry
@@ -0,0 +1,240 @@
+import heapq
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def brute_force_search_batch(
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    allowed: Optional[np.ndarray] = None,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Exact top-k rows by dot product for each query, restricted to allowed
+    rows; returns one (rows, scores) pair per query. All queries share a
+    single pass over the matrix.
+    """
+    rows = None
+    if allowed is not None:
+        rows = np.flatnonzero(allowed)
+        if len(rows) == len(matrix):
+            rows = None
+    candidates = matrix if rows is None else matrix[rows]
+
+    k = min(k, len(candidates))
+    if k <= 0:
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        return [empty for _ in range(len(queries))]
+
+    results = []
+    for scores in (queries @ candidates.T):
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results.append(((top if rows is None else rows[top]), scores[top]))
+    return results
+
+
+def brute_force_search(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    allowed: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k rows by dot product, restricted to allowed rows; returns (rows, scores)"""
+    return brute_force_search_batch(matrix, query[None, :], k, allowed)[0]
+
+
+class HNSWIndex:
+    """
+    Hierarchical navigable small world graph over the rows of a vector matrix
+    (dot-product similarity; vectors are unit-normalised for cosine).
+
+    The index stores only the graph; vectors stay in the caller's matrix and
+    are passed to every call, so it can sit on top of a memory-mapped file.
+    Rows are added incrementally; removed rows stay in the graph as
+    waypoints and are excluded from results through the `allowed` mask.
+    """
+
+    def __init__(self, m: int = None, ef_construction: int = None, ef_search: int = None, seed: int = 0):
+        self.m = m or settings.LOCAL_HNSW_M
+        self.m0 = 2 * self.m  # layer 0 keeps more links
+        self.ef_construction = ef_construction or settings.LOCAL_HNSW_EF_CONSTRUCTION
+        self.ef_search = ef_search or settings.LOCAL_HNSW_EF_SEARCH
+        self.level_mult = 1 / math.log(self.m)
+        self.rng = np.random.default_rng(seed)
+
+        # graph[level][row] -> neighbour rows
+        self.graph: List[Dict[int, List[int]]] = []
+        self.entry: Optional[int] = None
+        self.size = 0  # rows [0, size) are indexed
+
+    def _search_layer(
+        self, matrix: np.ndarray, query: np.ndarray, entry_points: List[int], ef: int, level: int
+    ) -> List[Tuple[float, int]]:
+        """Best-first search of one layer; returns up to ef (similarity, row)"""
+        visited = set(entry_points)
+        similarities = (matrix[entry_points] @ query).tolist()
+        candidates = [(-s, row) for s, row in zip(similarities, entry_points)]
+        heapq.heapify(candidates)
+        results = [(s, row) for s, row in zip(similarities, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        links = self.graph[level]
+        while candidates:
+            negative, row = heapq.heappop(candidates)
+            if len(results) >= ef and -negative < results[0][0]:
+                break
+
+            neighbours = [n for n in links.get(row, ()) if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+
+            for s, n in zip((matrix[neighbours] @ query).tolist(), neighbours):
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, n))
+                    heapq.heappush(results, (s, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return results
+
+    @staticmethod
+    def _select_neighbours(matrix: np.ndarray, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Pick up to m links among (similarity, row) candidates, skipping rows
+        closer to an already picked link than to the base vector, so links
+        spread across clusters instead of piling into the nearest one.
+        Skipped rows fill any remaining slots.
+        """
+        candidates = sorted(candidates, reverse=True)
+        if len(candidates) <= 1:
+            return [row for _, row in candidates]
+        rows = [row for _, row in candidates]
+        vectors = matrix[rows]
+        pairwise = (vectors @ vectors.T).tolist()
+
+        selected, skipped = [], []
+        for i, (similarity, _) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            closest = pairwise[i]
+            if any(closest[j] > similarity for j in selected):
+                skipped.append(i)
+            else:
+                selected.append(i)
+        return [rows[i] for i in selected + skipped[:m - len(selected)]]
+
+    def _descend(self, matrix: np.ndarray, query: np.ndarray, down_to: int) -> List[int]:
+        """Greedy descent from the entry point to layer down_to"""
+        entry = [self.entry]
+        for level in range(len(self.graph) - 1, down_to, -1):
+            entry = [max(self._search_layer(matrix, query, entry, 1, level))[1]]
+        return entry
+
+    def add(self, matrix: np.ndarray, stop: int = None) -> None:
+        """Index rows appended to the matrix since the last call (up to stop)"""
+        stop = len(matrix) if stop is None else stop
+        for row in range(self.size, stop):
+            vector = matrix[row]
+            level = int(-math.log(1.0 - self.rng.random()) * self.level_mult)
+
+            if self.entry is None:
+                self.graph = [{row: []} for _ in range(level + 1)]
+                self.entry = row
+                continue
+
+            top = len(self.graph) - 1
+            entry = self._descend(matrix, vector, level)
+            for lc in range(min(level, top), -1, -1):
+                found = self._search_layer(matrix, vector, entry, self.ef_construction, lc)
+                neighbours = self._select_neighbours(matrix, found, self.m)
+                links = self.graph[lc]
+                links[row] = neighbours
+
+                max_links = self.m0 if lc == 0 else self.m
+                for n in neighbours:
+                    adjacent = links[n]
+                    adjacent.append(row)
+                    if len(adjacent) > max_links:
+                        similarities = (matrix[adjacent] @ matrix[n]).tolist()
+                        links[n] = self._select_neighbours(
+                            matrix, list(zip(similarities, adjacent)), max_links
+                        )
+
+                entry = [n for _, n in found]
+
+            if level > top:
+                self.graph.extend({row: []} for _ in range(level - top))
+                self.entry = row
+
+        self.size = max(self.size, stop)
+
+    def search(
+        self,
+        matrix: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+        ef: int = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k rows among allowed ones; returns (rows, scores)"""
+        if self.entry is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        ef = max(ef or self.ef_search, k)
+        found = self._search_layer(matrix, query, self._descend(matrix, query, 0), ef, 0)
+        found.sort(reverse=True)
+        if allowed is not None:
+            found = [(s, row) for s, row in found if allowed[row]]
+        found = found[:k]
+
+        return (
+            np.asarray([row for _, row in found], dtype=np.int64),
+            np.asarray([s for s, _ in found], dtype=np.float32),
+        )
+
+    def save(self, path: Path) -> None:
+        arrays = {
+            "meta": np.asarray(
+                [self.m, self.ef_construction, self.ef_search, -1 if self.entry is None else self.entry, self.size],
+                dtype=np.int64,
+            )
+        }
+        for level, links in enumerate(self.graph):
+            nodes = sorted(links)
+            offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(links[node]) for node in nodes])
+            arrays[f"nodes_{level}"] = np.asarray(nodes, dtype=np.int64)
+            arrays[f"offsets_{level}"] = offsets
+            arrays[f"links_{level}"] = np.asarray(
+                [n for node in nodes for n in links[node]], dtype=np.int64
+            )
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "HNSWIndex":
+        with np.load(path) as data:
+            m, ef_construction, ef_search, entry, size = data["meta"].tolist()
+            # ef_search is a query-time knob: the current setting wins
+            index = cls(m=m, ef_construction=ef_construction)
+            index.entry = None if entry < 0 else entry
+            index.size = size
+
+            level = 0
+            while f"nodes_{level}" in data:
+                nodes = data[f"nodes_{level}"].tolist()
+                offsets = data[f"offsets_{level}"].tolist()
+                links = data[f"links_{level}"].tolist()
+                index.graph.append({
+                    node: links[offsets[i]:offsets[i + 1]] for i, node in enumerate(nodes)
+                })
+                level += 1
+        return index
@@ -0,0 +1,832 @@
+import os
+import json
+import atexit
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Protocol, Sequence
+import numpy as np
+from qdrant_client.models import (
+    CollectionDescription,
+    CollectionsResponse,
+    Record,
+    ScoredPoint,
+    UpdateResult,
+    UpdateStatus,
+)
+from app.core.config import get_settings
+from app.core.executor import run_in_executor
+from app.core.vector_index import HNSWIndex, brute_force_search_batch
+
+settings = get_settings()
+
+# Filter results are cached per collection until its next write
+FILTER_CACHE_SIZE = 256
+# Rows reclaimed once more than this fraction of the matrix is deleted/replaced
+COMPACT_DEAD_FRACTION = 0.5
+
+
+class VectorStore(Protocol):
+    """
+    The subset of the qdrant-client API the app uses (retriever, ingestion,
+    health checks, scripts). QdrantClient satisfies it as is; LocalVectorStore
+    implements it in process. Services are typed against this, and
+    app.core.connections picks the implementation (VECTOR_STORE).
+    """
+
+    def get_collections(self): ...
+
+    def get_collection(self, collection_name: str): ...
+
+    def create_collection(self, collection_name: str, vectors_config, **kwargs) -> bool: ...
+
+    def recreate_collection(self, collection_name: str, vectors_config, **kwargs) -> bool: ...
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool: ...
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs): ...
+
+    def upsert(self, collection_name: str, points, wait: bool = True, **kwargs): ...
+
+    def search(self, collection_name: str, query_vector, query_filter=None, limit: int = 10, **kwargs): ...
+
+    def search_batch(self, collection_name: str, requests, **kwargs): ...
+
+    def retrieve(self, collection_name: str, ids, with_payload=True, with_vectors=False, **kwargs): ...
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True, **kwargs): ...
+
+    def overwrite_payload(self, collection_name: str, payload: dict, points, wait: bool = True, **kwargs): ...
+
+    def batch_update_points(self, collection_name: str, update_operations, wait: bool = True, **kwargs): ...
+
+    def close(self, **kwargs) -> None: ...
+
+
+class AsyncVectorStore(Protocol):
+    """Async counterpart of VectorStore (AsyncQdrantClient, AsyncLocalVectorStore)"""
+
+    async def get_collections(self): ...
+
+    async def search_batch(self, collection_name: str, requests, **kwargs): ...
+
+    async def retrieve(self, collection_name: str, ids, with_payload=True, with_vectors=False, **kwargs): ...
+
+    async def upsert(self, collection_name: str, points, wait: bool = True, **kwargs): ...
+
+    async def close(self, **kwargs) -> None: ...
+
+
+def _as_list(conditions) -> list:
+    if conditions is None:
+        return []
+    return list(conditions) if isinstance(conditions, (list, tuple)) else [conditions]
+
+
+def _field_values(payload: Optional[dict], key: str) -> list:
+    """Values at a dotted payload path, flattening lists like Qdrant does"""
+    values = [payload or {}]
+    for part in key.replace("[]", "").split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                child = value[part]
+                found.extend(child if isinstance(child, list) else [child])
+            elif isinstance(value, list):
+                found.extend(
+                    item[part] for item in value if isinstance(item, dict) and part in item
+                )
+        values = found
+    return [value for value in values if value is not None]
+
+
+def _is_null(payload: Optional[dict], key: str) -> bool:
+    *parents, last = key.replace("[]", "").split(".")
+    value = payload or {}
+    for part in parents:
+        value = value.get(part) if isinstance(value, dict) else None
+    return isinstance(value, dict) and last in value and value[last] is None
+
+
+class _ReadWriteLock:
+    """Shared for searches (NumPy releases the GIL), exclusive and re-entrant for writes"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._depth = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._condition:
+            while self._writer not in (None, me):
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer != me:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._writer = me
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class LocalCollection:
+    """
+    One collection: vectors in a growable float32 matrix, ids and payloads
+    in row order, a liveness mask for deleted/replaced rows and an optional
+    HNSW graph over the matrix.
+
+    Persisted to its own directory as
+        vectors.npy  the matrix (memory-mapped on load)
+        points.json  row ids and payloads, distance, payload schema
+        hnsw.npz     the graph, when one was built
+    """
+
+    def __init__(self, directory: Path, size: int = None, distance: str = "cosine"):
+        self.directory = directory
+        self.dim = size
+        self.distance = distance
+        self.payload_schema: Dict[str, Any] = {}
+
+        self.vectors = np.zeros((0, size or 0), dtype=np.float32)
+        self.size = 0
+        self.ids: List[Any] = []
+        self.payloads: List[Optional[dict]] = []
+        self.rows: Dict[Any, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.index: Optional[HNSWIndex] = None
+        self.dirty = False
+
+        self._columns: Dict[str, list] = {}
+        self._numeric: Dict[str, np.ndarray] = {}
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._masks: Dict[str, np.ndarray] = {}
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.vectors[:self.size]
+
+    @property
+    def points_count(self) -> int:
+        return len(self.rows)
+
+    # Persistence
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.build_index()
+
+        tmp_path = self.directory / "vectors.tmp.npy"
+        np.save(tmp_path, self.matrix)
+        os.replace(tmp_path, self.directory / "vectors.npy")
+
+        if self.index is not None:
+            tmp_path = self.directory / "hnsw.tmp.npz"
+            self.index.save(tmp_path)
+            os.replace(tmp_path, self.directory / "hnsw.npz")
+        elif (self.directory / "hnsw.npz").exists():
+            os.remove(self.directory / "hnsw.npz")
+
+        # Written last: it records how many rows of the files above are valid
+        tmp_path = self.directory / "points.tmp.json"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dim": self.dim,
+                    "distance": self.distance,
+                    "size": self.size,
+                    "payload_schema": self.payload_schema,
+                    "ids": [point_id if alive else None for point_id, alive in zip(self.ids, self.alive)],
+                    "payloads": self.payloads,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.directory / "points.json")
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory: Path) -> "LocalCollection":
+        with open(directory / "points.json", "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        collection = cls(directory, data["dim"], data["distance"])
+        collection.payload_schema = data["payload_schema"]
+        collection.size = data["size"]
+        collection.ids = data["ids"]
+        collection.payloads = data["payloads"]
+        collection.alive = np.asarray([point_id is not None for point_id in collection.ids], dtype=bool)
+        collection.rows = {
+            point_id: row for row, point_id in enumerate(collection.ids) if point_id is not None
+        }
+
+        if collection.size:
+            # Read-only map; copied into a writable buffer on the first write
+            collection.vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+
+        index_path = directory / "hnsw.npz"
+        if index_path.exists():
+            index = HNSWIndex.load(index_path)
+            if index.size <= collection.size:
+                collection.index = index
+        return collection
+
+    # Writes
+
+    def _invalidate(self) -> None:
+        self._columns.clear()
+        self._numeric.clear()
+        self._postings.clear()
+        self._masks.clear()
+        self.dirty = True
+
+    def _reserve(self, count: int) -> None:
+        needed = self.size + count
+        if needed <= len(self.vectors) and self.vectors.flags.writeable:
+            return
+        capacity = max(needed, 2 * len(self.vectors), 1024)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        self.vectors = vectors
+
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        self.alive = alive
+
+    def _kill(self, row: int) -> None:
+        self.alive[row] = False
+        self.payloads[row] = None
+
+    def upsert(self, ids: Sequence[Any], vectors: np.ndarray, payloads: Sequence[Optional[dict]]) -> None:
+        """Append points; an existing id gets a new row and its old one is retired"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector size {vectors.shape[1]} does not match collection ({self.dim})")
+        if self.distance == "cosine":
+            vectors = _normalize(vectors)
+
+        self._reserve(len(ids))
+        for point_id, vector, payload in zip(ids, vectors, payloads):
+            if point_id in self.rows:
+                self._kill(self.rows[point_id])
+            row = self.size
+            self.vectors[row] = vector
+            self.alive[row] = True
+            self.ids.append(point_id)
+            self.payloads.append(payload or {})
+            self.rows[point_id] = row
+            self.size += 1
+
+        self._invalidate()
+        self._maybe_compact()
+
+    def delete(self, ids: Sequence[Any]) -> None:
+        for point_id in ids:
+            row = self.rows.pop(point_id, None)
+            if row is not None:
+                self._kill(row)
+        self._invalidate()
+        self._maybe_compact()
+
+    def overwrite_payload(self, ids: Sequence[Any], payload: dict) -> None:
+        for point_id in ids:
+            row = self.rows.get(point_id)
+            if row is not None:
+                self.payloads[row] = dict(payload)
+        self._invalidate()
+
+    def _maybe_compact(self) -> None:
+        dead = self.size - len(self.rows)
+        if not dead or dead <= COMPACT_DEAD_FRACTION * self.size:
+            return
+
+        keep = np.flatnonzero(self.alive[:self.size])
+        self.vectors = np.ascontiguousarray(self.vectors[keep])
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.ids = [self.ids[row] for row in keep]
+        self.payloads = [self.payloads[row] for row in keep]
+        self.rows = {point_id: row for row, point_id in enumerate(self.ids)}
+        self.size = len(keep)
+        # Row numbers changed: the graph is rebuilt on the next save
+        self.index = None
+
+    # Search
+
+    def use_index(self) -> bool:
+        if settings.LOCAL_INDEX == "hnsw":
+            return True
+        if settings.LOCAL_INDEX == "auto":
+            return self.points_count >= settings.LOCAL_HNSW_THRESHOLD
+        return False
+
+    def build_index(self) -> None:
+        """
+        Create or extend the HNSW graph to cover every row (when the index is
+        in use). Called from save() only: building runs in Python at a few ms
+        per point, so the query path never does it.
+        """
+        if not self.use_index():
+            return
+        if self.index is None:
+            print(f"Building HNSW index over {self.size} points...")
+            self.index = HNSWIndex()
+        if self.index.size < self.size:
+            self.index.add(self.matrix)
+            self.dirty = True
+
+    def _column(self, key: str) -> list:
+        if key not in self._columns:
+            self._columns[key] = [_field_values(payload, key) for payload in self.payloads]
+        return self._columns[key]
+
+    def _numeric_column(self, key: str) -> np.ndarray:
+        """First numeric value of each row (NaN when there is none)"""
+        if key not in self._numeric:
+            self._numeric[key] = np.fromiter(
+                (
+                    next((v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)), np.nan)
+                    for values in self._column(key)
+                ),
+                dtype=np.float64,
+                count=self.size,
+            )
+        return self._numeric[key]
+
+    def _posting_lists(self, key: str) -> Dict[Any, np.ndarray]:
+        """value -> rows holding it, built on first use like a keyword payload index"""
+        if key not in self._postings:
+            postings: Dict[Any, list] = {}
+            for row, values in enumerate(self._column(key)):
+                for value in values:
+                    if isinstance(value, (str, int, float, bool)):
+                        postings.setdefault((type(value) is bool, value), []).append(row)
+            self._postings[key] = {
+                value: np.asarray(rows, dtype=np.int64) for value, rows in postings.items()
+            }
+        return self._postings[key]
+
+    def _rows_mask(self, rows) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for found in rows:
+            mask[found] = True
+        return mask
+
+    def _match_mask(self, key: str, match) -> np.ndarray:
+        postings = self._posting_lists(key)
+        if getattr(match, "value", None) is not None:
+            value = match.value
+            return self._rows_mask([postings.get((type(value) is bool, value), [])])
+        if getattr(match, "any", None) is not None:
+            return self._rows_mask(postings.get((type(v) is bool, v), []) for v in match.any)
+        if getattr(match, "except_", None) is not None:
+            excluded = set(match.except_)
+            return np.fromiter(
+                (any(v not in excluded for v in values) for values in self._column(key)),
+                dtype=bool,
+                count=self.size,
+            )
+        if getattr(match, "text", None) is not None:
+            return np.fromiter(
+                (any(isinstance(v, str) and match.text in v for v in values) for values in self._column(key)),
+                dtype=bool,
+                count=self.size,
+            )
+        raise ValueError(f"Unsupported match condition: {match!r}")
+
+    def _range_mask(self, key: str, bounds) -> np.ndarray:
+        values = self._numeric_column(key)
+        mask = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            if getattr(bounds, "gt", None) is not None:
+                mask &= values > bounds.gt
+            if getattr(bounds, "gte", None) is not None:
+                mask &= values >= bounds.gte
+            if getattr(bounds, "lt", None) is not None:
+                mask &= values < bounds.lt
+            if getattr(bounds, "lte", None) is not None:
+                mask &= values <= bounds.lte
+        return mask
+
+    def _condition_mask(self, condition) -> np.ndarray:
+        if any(hasattr(condition, clause) for clause in ("must", "should", "must_not")):
+            return self._filter_mask(condition)
+        if getattr(condition, "is_empty", None) is not None:
+            key = condition.is_empty.key
+            return np.fromiter((not values for values in self._column(key)), dtype=bool, count=self.size)
+        if getattr(condition, "is_null", None) is not None:
+            key = condition.is_null.key
+            return np.fromiter((_is_null(p, key) for p in self.payloads), dtype=bool, count=self.size)
+        if getattr(condition, "has_id", None) is not None:
+            return self._rows_mask([[self.rows[i] for i in condition.has_id if i in self.rows]])
+        if getattr(condition, "key", None) is not None:
+            if getattr(condition, "match", None) is not None:
+                return self._match_mask(condition.key, condition.match)
+            if getattr(condition, "range", None) is not None:
+                return self._range_mask(condition.key, condition.range)
+        raise ValueError(f"Unsupported filter condition: {condition!r}")
+
+    def _filter_mask(self, query_filter) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        for condition in _as_list(getattr(query_filter, "must", None)):
+            mask &= self._condition_mask(condition)
+        should = _as_list(getattr(query_filter, "should", None))
+        if should:
+            any_mask = np.zeros(self.size, dtype=bool)
+            for condition in should:
+                any_mask |= self._condition_mask(condition)
+            mask &= any_mask
+        for condition in _as_list(getattr(query_filter, "must_not", None)):
+            mask &= ~self._condition_mask(condition)
+        return mask
+
+    def allowed(self, query_filter=None) -> Optional[np.ndarray]:
+        """Rows a search may return (None when every row qualifies)"""
+        if query_filter is None:
+            if len(self.rows) == self.size:
+                return None
+            return self.alive[:self.size]
+
+        key = repr(query_filter)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._filter_mask(query_filter) & self.alive[:self.size]
+            if len(self._masks) >= FILTER_CACHE_SIZE:
+                # Concurrent searches may evict the same entry
+                self._masks.pop(next(iter(self._masks), None), None)
+            self._masks[key] = mask
+        return mask
+
+    def search(self, queries: np.ndarray, limit: int, query_filter=None) -> list:
+        """Top rows for each query; returns [(rows, scores)] per query"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if self.distance == "cosine":
+            queries = _normalize(queries)
+
+        allowed = self.allowed(query_filter)
+        allowed_count = self.size if allowed is None else int(allowed.sum())
+        if not allowed_count:
+            empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            return [empty for _ in range(len(queries))]
+
+        fraction = allowed_count / self.size
+        if (
+            self.index is None
+            or not self.use_index()
+            or fraction < settings.LOCAL_FILTER_BRUTE_FRACTION
+        ):
+            # Exact scan of the allowed rows: small corpora, selective filters,
+            # or no graph yet (it is built when the collection is saved)
+            return brute_force_search_batch(self.matrix, queries, limit, allowed)
+
+        # Rows added since the graph was built are scanned exactly and merged
+        covered = self.index.size
+        tail = None
+        if covered < self.size:
+            tail = np.zeros(self.size, dtype=bool)
+            tail[covered:] = True if allowed is None else allowed[covered:]
+            tail_results = brute_force_search_batch(self.matrix, queries, limit, tail)
+
+        # Widen the beam so enough allowed rows survive post-filtering
+        ef = int(min(self.index.ef_search / fraction, 10 * self.index.ef_search))
+        covered_allowed = allowed_count if allowed is None else int(allowed[:covered].sum())
+        results = []
+        for i, query in enumerate(queries):
+            rows, scores = self.index.search(self.matrix, query, limit, allowed, ef=ef)
+            if len(rows) < min(limit, covered_allowed):
+                head = np.zeros(self.size, dtype=bool)
+                head[:covered] = True if allowed is None else allowed[:covered]
+                rows, scores = brute_force_search_batch(self.matrix, query[None, :], limit, head)[0]
+            if tail is not None:
+                rows = np.concatenate([rows, tail_results[i][0]])
+                scores = np.concatenate([scores, tail_results[i][1]])
+                order = np.argsort(-scores, kind="stable")[:limit]
+                rows, scores = rows[order], scores[order]
+            results.append((rows, scores))
+        return results
+
+
+class LocalVectorStore:
+    """
+    In-process vector store with the qdrant-client call signatures the app
+    uses (see VectorStore), selected with VECTOR_STORE=local.
+
+    Small collections are searched exactly with a NumPy scan; from
+    LOCAL_HNSW_THRESHOLD points an HNSW graph answers unfiltered and
+    broadly filtered queries. The graph is built or extended when a
+    collection is saved; rows added since are scanned exactly. Collections
+    live under LOCAL_VECTOR_STORE_PATH, are loaded lazily and saved on
+    close() / interpreter exit. Only one process should write a store
+    directory: the API opens it read_only and serves what ingestion saved
+    by the time it started; writes then raise and nothing is saved.
+    """
+
+    def __init__(self, path: str = None, read_only: bool = False):
+        self.path = Path(path or settings.LOCAL_VECTOR_STORE_PATH)
+        self.read_only = read_only
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = _ReadWriteLock()
+        self._load_lock = threading.Lock()
+        if not read_only:
+            atexit.register(self.save)
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise PermissionError(f"Local vector store {self.path} is open read-only")
+
+    def _directory(self, collection_name: str) -> Path:
+        return self.path / collection_name
+
+    def _collection(self, collection_name: str) -> LocalCollection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            with self._load_lock:
+                collection = self._collections.get(collection_name)
+                if collection is None:
+                    directory = self._directory(collection_name)
+                    if not (directory / "points.json").exists():
+                        raise ValueError(f"Collection {collection_name} not found")
+                    collection = LocalCollection.load(directory)
+                    self._collections[collection_name] = collection
+        return collection
+
+    def _exists(self, collection_name: str) -> bool:
+        return (
+            collection_name in self._collections
+            or (self._directory(collection_name) / "points.json").exists()
+        )
+
+    @staticmethod
+    def _done() -> UpdateResult:
+        return UpdateResult(operation_id=0, status=UpdateStatus.COMPLETED)
+
+    # Collections
+
+    def get_collections(self) -> CollectionsResponse:
+        with self._lock.read():
+            names = set(self._collections)
+            if self.path.exists():
+                names.update(p.parent.name for p in self.path.glob("*/points.json"))
+            return CollectionsResponse(
+                collections=[CollectionDescription(name=name) for name in sorted(names)]
+            )
+
+    def get_collection(self, collection_name: str) -> SimpleNamespace:
+        with self._lock.read():
+            collection = self._collection(collection_name)
+            return SimpleNamespace(
+                status="green",
+                points_count=collection.points_count,
+                vectors_count=collection.points_count,
+                indexed_vectors_count=collection.index.size if collection.index is not None else 0,
+                payload_schema=dict(collection.payload_schema),
+                config=SimpleNamespace(
+                    params=SimpleNamespace(
+                        vectors=SimpleNamespace(size=collection.dim, distance=collection.distance)
+                    )
+                ),
+            )
+
+    def create_collection(self, collection_name: str, vectors_config, **kwargs) -> bool:
+        self._check_writable()
+        if isinstance(vectors_config, dict):
+            raise ValueError("Local vector store supports a single unnamed vector per point")
+        distance = str(getattr(vectors_config.distance, "value", vectors_config.distance)).lower()
+        if distance not in ("cosine", "dot"):
+            raise ValueError(f"Local vector store supports cosine and dot distance, not {distance}")
+
+        with self._lock.write():
+            if self._exists(collection_name):
+                raise ValueError(f"Collection {collection_name} already exists")
+            collection = LocalCollection(self._directory(collection_name), vectors_config.size, distance)
+            collection.dirty = True
+            self._collections[collection_name] = collection
+        return True
+
+    def recreate_collection(self, collection_name: str, vectors_config, **kwargs) -> bool:
+        self._check_writable()
+        with self._lock.write():
+            self.delete_collection(collection_name)
+            return self.create_collection(collection_name, vectors_config, **kwargs)
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        self._check_writable()
+        with self._lock.write():
+            existed = self._exists(collection_name)
+            self._collections.pop(collection_name, None)
+            directory = self._directory(collection_name)
+            for name in ("points.json", "vectors.npy", "hnsw.npz"):
+                if (directory / name).exists():
+                    os.remove(directory / name)
+            return existed
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs) -> UpdateResult:
+        """Recorded for payload_schema; filter structures are built on demand"""
+        self._check_writable()
+        with self._lock.write():
+            collection = self._collection(collection_name)
+            collection.payload_schema[field_name] = str(getattr(field_schema, "value", field_schema))
+            collection.dirty = True
+        return self._done()
+
+    # Points
+
+    def upsert(self, collection_name: str, points, wait: bool = True, **kwargs) -> UpdateResult:
+        self._check_writable()
+        if hasattr(points, "ids"):
+            # Batch of columns
+            ids, vectors, payloads = points.ids, points.vectors, points.payloads or [None] * len(points.ids)
+        else:
+            ids = [point.id for point in points]
+            vectors = [point.vector for point in points]
+            payloads = [point.payload for point in points]
+
+        with self._lock.write():
+            self._collection(collection_name).upsert(ids, np.asarray(vectors, dtype=np.float32), payloads)
+        return self._done()
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True, **kwargs) -> UpdateResult:
+        self._check_writable()
+        with self._lock.write():
+            collection = self._collection(collection_name)
+            collection.delete(self._selected_ids(collection, points_selector))
+        return self._done()
+
+    def overwrite_payload(self, collection_name: str, payload: dict, points, wait: bool = True, **kwargs) -> UpdateResult:
+        self._check_writable()
+        with self._lock.write():
+            collection = self._collection(collection_name)
+            collection.overwrite_payload(self._selected_ids(collection, points), payload)
+        return self._done()
+
+    def batch_update_points(self, collection_name: str, update_operations, wait: bool = True, **kwargs) -> List[UpdateResult]:
+        """Payload overwrites (OverwritePayloadOperation), applied in order"""
+        self._check_writable()
+        with self._lock.write():
+            collection = self._collection(collection_name)
+            for operation in update_operations:
+                overwrite = getattr(operation, "overwrite_payload", None)
+                if overwrite is None:
+                    raise ValueError(f"Unsupported update operation: {operation!r}")
+                collection.overwrite_payload(self._selected_ids(collection, overwrite.points), overwrite.payload)
+        return [self._done() for _ in update_operations]
+
+    @staticmethod
+    def _selected_ids(collection: LocalCollection, selector) -> list:
+        """Ids from a list, PointIdsList or FilterSelector"""
+        if isinstance(selector, (list, tuple)):
+            return list(selector)
+        if getattr(selector, "points", None) is not None:
+            return list(selector.points)
+        if getattr(selector, "filter", None) is not None:
+            mask = collection.allowed(selector.filter)
+            return [collection.ids[row] for row in np.flatnonzero(mask)]
+        raise ValueError(f"Unsupported points selector: {selector!r}")
+
+    def retrieve(self, collection_name: str, ids, with_payload=True, with_vectors=False, **kwargs) -> List[Record]:
+        with self._lock.read():
+            collection = self._collection(collection_name)
+            records = []
+            for point_id in ids:
+                row = collection.rows.get(point_id)
+                if row is not None:
+                    records.append(Record(
+                        id=point_id,
+                        payload=collection.payloads[row] if with_payload else None,
+                        vector=collection.matrix[row].tolist() if with_vectors else None,
+                    ))
+            return records
+
+    def _scored_points(
+        self, collection: LocalCollection, rows, scores, offset: int, with_payload, with_vectors, score_threshold
+    ) -> List[ScoredPoint]:
+        points = []
+        for row, score in list(zip(rows.tolist(), scores.tolist()))[offset:]:
+            if score_threshold is not None and score < score_threshold:
+                break
+            points.append(ScoredPoint(
+                id=collection.ids[row],
+                version=0,
+                score=score,
+                payload=collection.payloads[row] if with_payload else None,
+                vector=collection.matrix[row].tolist() if with_vectors else None,
+            ))
+        return points
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector,
+        query_filter=None,
+        search_params=None,
+        limit: int = 10,
+        offset: int = 0,
+        with_payload=True,
+        with_vectors=False,
+        score_threshold: float = None,
+        **kwargs,
+    ) -> List[ScoredPoint]:
+        with self._lock.read():
+            collection = self._collection(collection_name)
+            rows, scores = collection.search(query_vector, limit + (offset or 0), query_filter)[0]
+            return self._scored_points(
+                collection, rows, scores, offset or 0, with_payload, with_vectors, score_threshold
+            )
+
+    def search_batch(self, collection_name: str, requests, **kwargs) -> List[List[ScoredPoint]]:
+        """Requests sharing a filter and limit are answered from one matrix pass"""
+        with self._lock.read():
+            collection = self._collection(collection_name)
+            groups: Dict[tuple, List[int]] = {}
+            for i, request in enumerate(requests):
+                key = (repr(request.filter), request.limit + (getattr(request, "offset", None) or 0))
+                groups.setdefault(key, []).append(i)
+
+            results: List[List[ScoredPoint]] = [[] for _ in requests]
+            for (_, limit), members in groups.items():
+                first = requests[members[0]]
+                found = collection.search(
+                    [requests[i].vector for i in members], limit, first.filter
+                )
+                for i, (rows, scores) in zip(members, found):
+                    request = requests[i]
+                    results[i] = self._scored_points(
+                        collection,
+                        rows,
+                        scores,
+                        getattr(request, "offset", None) or 0,
+                        getattr(request, "with_payload", True),
+                        getattr(request, "with_vector", False),
+                        getattr(request, "score_threshold", None),
+                    )
+            return results
+
+    def save(self) -> None:
+        """Persist collections changed since the last save"""
+        if self.read_only:
+            return
+        with self._lock.write():
+            for collection in self._collections.values():
+                collection.save()
+
+    def close(self, **kwargs) -> None:
+        self.save()
+
+
+class AsyncLocalVectorStore:
+    """
+    AsyncQdrantClient-shaped facade over a LocalVectorStore. Calls run on
+    the inference pool: an exact scan of tens of thousands of 1024-d rows
+    takes tens of ms, too long to hold the event loop. Searches share the
+    store lock, so they run in parallel.
+    """
+
+    def __init__(self, store: LocalVectorStore):
+        self.store = store
+
+    def __getattr__(self, name: str):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return await run_in_executor(method, *args, **kwargs)
+
+        return call
+
+
+_local_store: Optional[LocalVectorStore] = None
+
+
+def get_local_vector_store(read_only: bool = False) -> LocalVectorStore:
+    """The process-wide local store (shared by the sync and async clients; the first call sets the mode)"""
+    global _local_store
+    if _local_store is None:
+        _local_store = LocalVectorStore(read_only=read_only)
+    return _local_store
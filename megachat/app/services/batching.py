@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.executor import run_in_executor
+from app.core.metrics import get_histogram
+
+
+class MicroBatcher:
+    """
+    Micro-batching scheduler for a model's predict function.
+
+    Concurrent callers submit their inputs; a single worker task collects
+    jobs for up to max_wait_ms (or until max_batch inputs are queued),
+    runs one predict call over the concatenation on the inference
+    executor, and hands each caller back its slice of the scores. A job
+    larger than max_batch runs alone.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[List[Any]], Sequence[float]],
+        max_batch: int,
+        max_wait_ms: float,
+        name: str = "batcher",
+    ):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._carry: Optional[Tuple[List[Any], asyncio.Future, float]] = None
+
+        self.jobs = 0
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, inputs: List[Any]) -> np.ndarray:
+        """Queue inputs for the next batch and await their scores"""
+        if not inputs:
+            return np.zeros(0, dtype=np.float32)
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((inputs, future, time.perf_counter()))
+        return await future
+
+    async def _next_job(self, timeout: float = None):
+        if self._carry is not None:
+            job, self._carry = self._carry, None
+            return job
+        if timeout is None:
+            return await self._queue.get()
+        return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+
+    async def _collect(self) -> List[Tuple[List[Any], asyncio.Future, float]]:
+        """Wait for a first job, then gather more until full or max_wait passes"""
+        batch = [await self._next_job()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = await self._next_job(remaining)
+            except asyncio.TimeoutError:
+                break
+            if size + len(job[0]) > self.max_batch:
+                self._carry = job
+                break
+            batch.append(job)
+            size += len(job[0])
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            inputs = [item for job_inputs, _, _ in batch for item in job_inputs]
+
+            now = time.perf_counter()
+            wait_histogram = get_histogram(f"{self.name}.queue_wait")
+            for _, _, queued_at in batch:
+                wait_histogram.observe((now - queued_at) * 1000)
+
+            try:
+                scores = await run_in_executor(self.predict, inputs)
+                scores = np.asarray(scores, dtype=np.float32)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            elapsed = time.perf_counter() - now
+            get_histogram(f"{self.name}.batch").observe(elapsed * 1000)
+            self.jobs += len(batch)
+            self.batches += 1
+            self.items += len(inputs)
+            self.busy_seconds += elapsed
+
+            offset = 0
+            for job_inputs, future, _ in batch:
+                if not future.done():
+                    future.set_result(scores[offset:offset + len(job_inputs)])
+                offset += len(job_inputs)
+
+    async def close(self) -> None:
+        """Stop the worker task"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch sizes and model throughput"""
+        batches = max(self.batches, 1)
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_jobs_per_batch": round(self.jobs / batches, 2),
+            "mean_batch_size": round(self.items / batches, 2),
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
@@ -1,8 +1,18 @@
+import time
 import hashlib
 import json
-from typing import Optional, Any
+import threading
+from collections import OrderedDict
+from typing import Optional, Any, List, Dict, Sequence
+import numpy as np
 from redis.asyncio import Redis
 from app.core.config import get_settings
+from app.services.vector_codec import (
+    CODEC_VERSION,
+    encode_vector,
+    decode_vector,
+    decode_legacy_vector,
+)
 
 settings = get_settings()
 
@@ -10,8 +20,16 @@ settings = get_settings()
 class CacheService:
     """Redis cache service for responses, embeddings, products, and sessions"""
 
-    def __init__(self, redis_client: Redis):
+    def __init__(self, redis_client: Redis, binary_redis_client: Redis = None):
         self.redis = redis_client
+        # Embeddings are stored as raw bytes, so they need a non-decoding client
+        self.binary_redis = binary_redis_client
+        # No legacy entries are written any more, so all have expired after one TTL
+        self._legacy_deadline = (
+            time.monotonic() + settings.CACHE_EMBEDDING_TTL
+            if settings.EMBEDDING_CACHE_MIGRATE_LEGACY
+            else 0.0
+        )
 
     @staticmethod
     def hash_query(text: str) -> str:
@@ -34,23 +52,132 @@ class CacheService:
         ttl = ttl or settings.CACHE_RESPONSE_TTL
         await self.redis.setex(key, ttl, response)
 
-    async def get_cached_embedding(self, query: str) -> Optional[list]:
+    @staticmethod
+    def _embedding_hash(text: str, model_name: str = None) -> str:
+        model_name = model_name or settings.EMBEDDING_MODEL
+        normalized = " ".join(text.split())
+        return CacheService.hash_query(f"{model_name}:{normalized}")
+
+    @staticmethod
+    def inference_backend() -> str:
+        """INFERENCE_BACKEND, with int8 quantisation (its outputs differ slightly)"""
+        backend = settings.INFERENCE_BACKEND
+        if backend == "onnx" and settings.ONNX_QUANTIZE:
+            backend = "onnx-int8"
+        return backend
+
+    @staticmethod
+    def embedding_key(text: str, model_name: str = None) -> str:
+        """Embedding cache key: codec version + model name + inference backend + normalised text"""
+        model_name = f"{model_name or settings.EMBEDDING_MODEL}:{CacheService.inference_backend()}"
+        return f"embedding:v{CODEC_VERSION}:{CacheService._embedding_hash(text, model_name)}"
+
+    @staticmethod
+    def legacy_embedding_keys(text: str, model_name: str = None) -> List[str]:
+        """Keys used before the versioned codec (raw float32, then JSON by query hash)"""
+        return [
+            f"embedding:{CacheService._embedding_hash(text, model_name)}",
+            f"embedding:{CacheService.hash_query(text)}",
+        ]
+
+    async def get_cached_embeddings(
+        self, texts: List[str], model_name: str = None, dim: int = None
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Get cached embeddings for several texts in one round trip (dim: the
+        model's vector size, checked on legacy entries)
+        """
+        keys = [self.embedding_key(text, model_name) for text in texts]
+        cached = await self.binary_redis.mget(keys)
+        results = [decode_vector(value) if value else None for value in cached]
+
+        missing = [i for i, embedding in enumerate(results) if embedding is None]
+        if missing and time.monotonic() < self._legacy_deadline:
+            migrated = await self._migrate_legacy_embeddings(
+                [texts[i] for i in missing], model_name, dim
+            )
+            for i, embedding in zip(missing, migrated):
+                results[i] = embedding
+
+        return results
+
+    async def _migrate_legacy_embeddings(
+        self, texts: List[str], model_name: str = None, dim: int = None
+    ) -> List[Optional[np.ndarray]]:
+        """Lazily rewrite pre-versioned entries under the current codec (others of dim are dropped)"""
+        legacy_keys = [self.legacy_embedding_keys(text, model_name) for text in texts]
+        flat_keys = [key for keys in legacy_keys for key in keys]
+        cached = await self.binary_redis.mget(flat_keys)
+
+        results = []
+        migrated_texts, migrated_embeddings, stale_keys = [], [], []
+        for i, text in enumerate(texts):
+            embedding = None
+            for key, value in zip(legacy_keys[i], cached[2 * i:2 * i + 2]):
+                if value and embedding is None:
+                    try:
+                        embedding = decode_legacy_vector(value, dim)
+                    except Exception as e:
+                        print(f"Dropping undecodable legacy embedding {key}: {e}")
+                if value:
+                    stale_keys.append(key)
+            if embedding is not None:
+                migrated_texts.append(text)
+                migrated_embeddings.append(embedding)
+            results.append(embedding)
+
+        if migrated_texts:
+            await self.set_cached_embeddings(migrated_texts, migrated_embeddings, model_name)
+        if stale_keys:
+            await self.binary_redis.delete(*stale_keys)
+
+        return results
+
+    async def set_cached_embeddings(
+        self,
+        texts: List[str],
+        embeddings: np.ndarray,
+        model_name: str = None,
+        ttl: Optional[int] = None,
+    ) -> None:
+        """Cache embeddings in the configured binary codec"""
+        ttl = ttl or settings.CACHE_EMBEDDING_TTL
+        async with self.binary_redis.pipeline(transaction=False) as pipe:
+            for text, embedding in zip(texts, embeddings):
+                key = self.embedding_key(text, model_name)
+                pipe.setex(key, ttl, encode_vector(embedding, settings.EMBEDDING_CACHE_CODEC))
+            await pipe.execute()
+
+    async def get_cached_embedding(
+        self, query: str, model_name: str = None
+    ) -> Optional[np.ndarray]:
         """Get cached embedding for a query"""
-        query_hash = self.hash_query(query)
-        key = f"embedding:{query_hash}"
-        cached = await self.redis.get(key)
-        if cached:
-            return json.loads(cached)
-        return None
+        return (await self.get_cached_embeddings([query], model_name))[0]
 
     async def set_cached_embedding(
-        self, query: str, embedding: list, ttl: Optional[int] = None
+        self,
+        query: str,
+        embedding: np.ndarray,
+        model_name: str = None,
+        ttl: Optional[int] = None,
     ) -> None:
         """Cache an embedding for a query"""
-        query_hash = self.hash_query(query)
-        key = f"embedding:{query_hash}"
-        ttl = ttl or settings.CACHE_EMBEDDING_TTL
-        await self.redis.setex(key, ttl, json.dumps(embedding))
+        await self.set_cached_embeddings([query], [embedding], model_name, ttl)
+
+    async def get_cached_scores(self, keys: List[str]) -> List[Optional[float]]:
+        """Get cached rerank pair scores in one round trip"""
+        cached = await self.redis.mget(keys)
+        return [float(value) if value is not None else None for value in cached]
+
+    async def set_cached_scores(
+        self, keys: List[str], scores: Sequence[float], ttl: Optional[int] = None
+    ) -> None:
+        """Cache rerank pair scores"""
+        ttl = ttl or settings.CACHE_RERANK_TTL
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, score in zip(keys, scores):
+                pipe.setex(key, ttl, repr(float(score)))
+            await pipe.execute()
 
     async def get_product(self, product_id: str) -> Optional[dict]:
         """Get cached product by ID"""
@@ -104,3 +231,209 @@ class CacheService:
     async def clear_all(self) -> None:
         """Clear all cache (use with caution)"""
         await self.redis.flushdb()
+
+
+class LRUCache:
+    """Bounded, thread-safe in-process LRU map"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: in-process LRU (L1) in front of Redis (L2).
+
+    The L1 tier is usable from sync code (e.g. inside the inference
+    executor); the L2 tier is async and shared across workers.
+    """
+
+    def __init__(
+        self,
+        cache_service: CacheService = None,
+        model_name: str = None,
+        max_size: int = None,
+        dim: int = None,
+    ):
+        self.cache_service = cache_service
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        # Vector size of the model (legacy Redis entries of another size are dropped)
+        self.dim = dim
+        self.local = LRUCache(max_size or settings.EMBEDDING_CACHE_SIZE)
+
+        self.lookups = 0
+        self.l1_hits = 0
+        self.l2_hits = 0
+
+    def _key(self, text: str) -> str:
+        return CacheService.embedding_key(text, self.model_name)
+
+    def get_local(self, text: str) -> Optional[np.ndarray]:
+        """L1 lookup only"""
+        self.lookups += 1
+        embedding = self.local.get(self._key(text))
+        if embedding is not None:
+            self.l1_hits += 1
+        return embedding
+
+    def set_local(self, text: str, embedding: np.ndarray) -> None:
+        """Store in L1 only"""
+        self.local.set(self._key(text), np.asarray(embedding, dtype=np.float32))
+
+    async def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up texts in L1, then the L1 misses in L2 (promoting L2 hits)"""
+        results = [self.get_local(text) for text in texts]
+        missing = [i for i, embedding in enumerate(results) if embedding is None]
+
+        if missing and self.cache_service is not None:
+            try:
+                cached = await self.cache_service.get_cached_embeddings(
+                    [texts[i] for i in missing], self.model_name, self.dim
+                )
+            except Exception as e:
+                print(f"Error reading embedding cache: {e}")
+                cached = [None] * len(missing)
+
+            for i, embedding in zip(missing, cached):
+                if embedding is not None:
+                    self.l2_hits += 1
+                    self.set_local(texts[i], embedding)
+                    results[i] = embedding
+
+        return results
+
+    async def set_many(self, texts: List[str], embeddings: np.ndarray) -> None:
+        """Store embeddings in both tiers"""
+        for text, embedding in zip(texts, embeddings):
+            self.set_local(text, embedding)
+
+        if self.cache_service is not None:
+            try:
+                await self.cache_service.set_cached_embeddings(texts, embeddings, self.model_name)
+            except Exception as e:
+                print(f"Error writing embedding cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters and hit rate per tier"""
+        lookups = max(self.lookups, 1)
+        return {
+            "lookups": self.lookups,
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.lookups - self.l1_hits - self.l2_hits,
+            "l1_hit_rate": round(self.l1_hits / lookups, 3),
+            "l2_hit_rate": round(self.l2_hits / lookups, 3),
+            "l1_size": len(self.local),
+        }
+
+
+class RerankScoreCache:
+    """
+    Two-tier cross-encoder pair-score cache: in-process LRU (L1) in front
+    of Redis (L2, optional).
+
+    Keyed on reranker model + normalised query hash + product id + a hash
+    of the product text that was scored, so an edited product or a
+    different model/backend never reuses a stale score.
+    """
+
+    def __init__(
+        self,
+        cache_service: CacheService = None,
+        model_name: str = None,
+        max_size: int = None,
+    ):
+        self.cache_service = cache_service
+        self.model_name = model_name or self.default_model_name()
+        self.local = LRUCache(max_size or settings.RERANK_CACHE_SIZE)
+
+        self.lookups = 0
+        self.l1_hits = 0
+        self.l2_hits = 0
+
+    @staticmethod
+    def default_model_name() -> str:
+        """Reranker model + inference backend (quantised scores differ slightly)"""
+        return f"{settings.RERANKER_MODEL}:{CacheService.inference_backend()}"
+
+    @staticmethod
+    def content_version(text: str) -> str:
+        """Short hash of the scored product text"""
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+    def key(self, query: str, product_id: str, text: str) -> str:
+        query_hash = CacheService.hash_query(f"{self.model_name}:{' '.join(query.split())}")
+        return f"rerank:{query_hash[:32]}:{product_id}:{self.content_version(text)}"
+
+    def get_local(self, keys: List[str]) -> List[Optional[float]]:
+        """L1 lookup only"""
+        self.lookups += len(keys)
+        scores = [self.local.get(key) for key in keys]
+        self.l1_hits += sum(score is not None for score in scores)
+        return scores
+
+    async def get_many(self, keys: List[str]) -> List[Optional[float]]:
+        """Look up keys in L1, then the L1 misses in L2 (promoting L2 hits)"""
+        scores = self.get_local(keys)
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing and self.cache_service is not None:
+            try:
+                cached = await self.cache_service.get_cached_scores([keys[i] for i in missing])
+            except Exception as e:
+                print(f"Error reading rerank cache: {e}")
+                cached = [None] * len(missing)
+
+            for i, score in zip(missing, cached):
+                if score is not None:
+                    self.l2_hits += 1
+                    self.local.set(keys[i], score)
+                    scores[i] = score
+
+        return scores
+
+    def set_local(self, keys: List[str], scores: Sequence[float]) -> None:
+        """Store in L1 only"""
+        for key, score in zip(keys, scores):
+            self.local.set(key, float(score))
+
+    async def set_many(self, keys: List[str], scores: Sequence[float]) -> None:
+        """Store scores in both tiers"""
+        self.set_local(keys, scores)
+
+        if self.cache_service is not None:
+            try:
+                await self.cache_service.set_cached_scores(keys, scores)
+            except Exception as e:
+                print(f"Error writing rerank cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters and hit rate per tier"""
+        lookups = max(self.lookups, 1)
+        return {
+            "lookups": self.lookups,
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.lookups - self.l1_hits - self.l2_hits,
+            "hit_rate": round((self.l1_hits + self.l2_hits) / lookups, 3),
+            "l1_size": len(self.local),
+        }
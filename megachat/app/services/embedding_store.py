@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import get_settings
+
+settings = get_settings()
+
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def embedding_version() -> str:
+    """Identity of the vectors ingestion produces (model and backend)"""
+    backend = settings.INFERENCE_BACKEND
+    if backend == "onnx" and settings.ONNX_QUANTIZE:
+        backend += "-int8"
+    return f"{settings.EMBEDDING_MODEL}:{backend}"
+
+
+class EmbeddingStore:
+    """
+    Persistent product embeddings: an append-only matrix file, memory-mapped
+    for reads, with a JSON index alongside.
+
+    One directory per embedding version under EMBEDDING_STORE_DIR holds
+        vectors.<dtype>  rows of `dim` values (float32 or float16)
+        index.json       text hash -> row, product id -> row
+    Rows are keyed by a hash of the embedded text, so identical posts share
+    a row and an edited post gets a new one. Ingestion reads vectors from
+    here before encoding, so collections can be rebuilt, migrated or loaded
+    into a local index without re-running the model.
+    """
+
+    def __init__(self, directory: str = None, version: str = None, dtype: str = None):
+        self.version = version or embedding_version()
+        slug = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.version)
+        self.directory = Path(directory or settings.EMBEDDING_STORE_DIR) / slug
+        self.index_path = self.directory / "index.json"
+
+        self.dtype_name = dtype or settings.EMBEDDING_STORE_DTYPE
+        self.dim: Optional[int] = None
+        self.rows = 0
+        self.texts: Dict[str, int] = {}
+        self.products: Dict[str, int] = {}
+
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            # An existing store keeps the dtype it was written with
+            self.dtype_name = index["dtype"]
+            self.dim = index["dim"]
+            self.rows = index["rows"]
+            self.texts = index["texts"]
+            self.products = index["products"]
+
+        if self.dtype_name not in DTYPES:
+            raise ValueError(f"Unsupported embedding store dtype: {self.dtype_name}")
+        self.dtype = DTYPES[self.dtype_name]
+        self.vectors_path = self.directory / f"vectors.{self.dtype_name}"
+        self._matrix: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=16).hexdigest()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read-only memory map of the stored rows"""
+        if self._matrix is None:
+            if not self.rows:
+                return np.zeros((0, self.dim or 0), dtype=self.dtype)
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=self.dtype, mode="r", shape=(self.rows, self.dim)
+            )
+        return self._matrix
+
+    def lookup(self, texts: Sequence[str]) -> List[Optional[int]]:
+        """Row of each text, or None when it was never embedded"""
+        return [self.texts.get(self.text_hash(text)) for text in texts]
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """float32 copies of the given rows"""
+        return np.asarray(self.matrix[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Stored embedding of each text, or None"""
+        rows = self.lookup(texts)
+        found = [row for row in rows if row is not None]
+        vectors = iter(self.vectors(found)) if found else iter(())
+        return [next(vectors) if row is not None else None for row in rows]
+
+    def put_many(self, texts: Sequence[str], embeddings: np.ndarray) -> None:
+        """Append embeddings of texts not stored yet"""
+        embeddings = np.asarray(embeddings)
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding size {embeddings.shape[1]} does not match store ({self.dim})")
+
+        new_rows = []
+        for text, embedding in zip(texts, embeddings):
+            key = self.text_hash(text)
+            if key not in self.texts:
+                self.texts[key] = self.rows + len(new_rows)
+                new_rows.append(embedding)
+
+        if new_rows:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            row_bytes = self.dim * np.dtype(self.dtype).itemsize
+            with open(self.vectors_path, "ab") as f:
+                # Drop rows written after the last index save (interrupted run)
+                f.truncate(self.rows * row_bytes)
+                f.write(np.ascontiguousarray(new_rows, dtype=self.dtype).tobytes())
+            self.rows += len(new_rows)
+            self._matrix = None
+
+    def map_products(self, product_ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Point products at the stored rows of their texts (texts must be stored)"""
+        for product_id, row in zip(product_ids, self.lookup(texts)):
+            if row is not None:
+                self.products[product_id] = row
+
+    def forget(self, product_ids: Sequence[str]) -> None:
+        """Drop products from the index (their rows stay for identical texts)"""
+        for product_id in product_ids:
+            self.products.pop(product_id, None)
+
+    def flush(self) -> None:
+        """Write the index (atomically); vectors are already on disk"""
+        if self.dim is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "dtype": self.dtype_name,
+                    "dim": self.dim,
+                    "rows": self.rows,
+                    "texts": self.texts,
+                    "products": self.products,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.index_path)
+
+    def iter_products(self, batch_size: int = 1024) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """Stream (product ids, float32 matrix) batches from disk"""
+        product_ids = list(self.products)
+        for start in range(0, len(product_ids), batch_size):
+            ids = product_ids[start:start + batch_size]
+            yield ids, self.vectors([self.products[product_id] for product_id in ids])
@@ -0,0 +1,231 @@
+import json
+from typing import Awaitable, Callable, Dict, List, Optional
+from redis.asyncio import Redis
+from app.models.schemas import IntentType
+from app.services.cache import LRUCache
+from app.services.preprocessor import canonicalize
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class LocalExpander:
+    """
+    Synonym/template-based query expander for Persian product questions.
+
+    Runs in-process in microseconds: colloquial/formal word swaps and
+    product-vocabulary synonyms produce paraphrases, and an intent
+    template produces a keyword-style variation without question words.
+    """
+
+    name = "local"
+
+    SYNONYMS = {
+        "قیمت": ["هزینه", "نرخ"],
+        "چنده": ["چند است", "قیمت"],
+        "ارزون": ["ارزان", "اقتصادی"],
+        "ارزان": ["اقتصادی", "مقرون به صرفه"],
+        "موجوده": ["موجود است", "موجودی"],
+        "دارین": ["دارید", "موجود"],
+        "میخوام": ["می خواهم", "خرید"],
+        "گوشی": ["موبایل", "تلفن همراه"],
+        "موبایل": ["گوشی"],
+        "تلویزیون": ["تی وی", "تلوزیون"],
+        "یخچال": ["یخچال فریزر"],
+        "دوقلو": ["یخچال فریزر دوقلو"],
+        "لباسشویی": ["ماشین لباسشویی"],
+        "ظرفشویی": ["ماشین ظرفشویی"],
+        "کولر": ["کولر گازی", "اسپلیت"],
+        "اسپلیت": ["کولر گازی"],
+        "سرخکن": ["هواپز", "سرخ کن"],
+        "تیشرت": ["تی شرت", "تیشرت مردانه"],
+        "پیرهن": ["پیراهن"],
+        "پیراهن": ["پیرهن"],
+        "کفش": ["کتانی"],
+        "کتونی": ["کتانی", "کفش اسپرت"],
+        "ارسال": ["تحویل", "پست"],
+        "گارانتی": ["ضمانت", "خدمات پس از فروش"],
+        "جنس": ["متریال", "پارچه"],
+        "سایز": ["اندازه", "سایزبندی"],
+        "تخفیف": ["حراج", "آف"],
+    }
+
+    STOPWORDS = {
+        "سلام", "الان", "هنوز", "آیا", "لطفا", "ممنون", "مرسی", "دیگه", "درسته", "نه",
+        "هست", "هستن", "است", "چطوره", "چیه", "کدوم", "کدومو", "چند", "چنده",
+        "میشه", "میدین", "دارین", "دارید", "رو", "را", "یا", "هم",
+    }
+
+    TEMPLATES = {
+        IntentType.PRICE_CHECK: "قیمت {core}",
+        IntentType.AVAILABILITY: "{core} موجود",
+        IntentType.FEATURE_INQUIRY: "مشخصات {core}",
+        IntentType.SHIPPING: "ارسال {core}",
+        IntentType.PURCHASE: "خرید {core}",
+        IntentType.COMPARISON: "مقایسه {core}",
+    }
+
+    def __init__(self):
+        self.synonyms = {
+            canonicalize(word): [canonicalize(s) for s in alternatives]
+            for word, alternatives in self.SYNONYMS.items()
+        }
+        self.stopwords = {canonicalize(word) for word in self.STOPWORDS}
+
+    def expand(
+        self, query: str, num_variations: int = None, intent: IntentType = None
+    ) -> List[str]:
+        """Return original query + up to num_variations - 1 local paraphrases"""
+        num_variations = num_variations or settings.QUERY_VARIATIONS
+        tokens = canonicalize(query).split()
+
+        candidates = []
+
+        template = self.TEMPLATES.get(intent)
+        core = " ".join(t for t in tokens if t not in self.stopwords)
+        if template and core:
+            candidates.append(template.format(core=core))
+
+        for i, token in enumerate(tokens):
+            for alternative in self.synonyms.get(token, []):
+                candidates.append(" ".join(tokens[:i] + [alternative] + tokens[i + 1:]))
+
+        variations = [query]
+        seen = {" ".join(tokens)}
+        for candidate in candidates:
+            # Collapse repeats such as "کولر گازی" + "گازی"
+            words = candidate.split()
+            candidate = " ".join(
+                w for i, w in enumerate(words) if i == 0 or w != words[i - 1]
+            )
+            if candidate not in seen:
+                seen.add(candidate)
+                variations.append(candidate)
+            if len(variations) >= num_variations:
+                break
+
+        return variations
+
+
+class ExpansionCache:
+    """
+    Persistent expansion cache: canonical query -> variations.
+
+    An in-process LRU sits in front of a Redis hash without TTL, which the
+    offline precompute job (scripts/precompute_expansions.py) fills ahead
+    of time. Misses are appended to a capped history list that the job
+    replays later.
+    """
+
+    HASH_KEY = "expansion:cache"
+    HISTORY_KEY = "expansion:history"
+    HISTORY_SIZE = 50000
+
+    def __init__(self, redis_client: Redis = None, max_size: int = None):
+        self.redis = redis_client
+        self.local = LRUCache(max_size or settings.EXPANSION_CACHE_SIZE)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, query: str) -> Optional[List[str]]:
+        key = canonicalize(query)
+        variations = self.local.get(key)
+
+        if variations is None and self.redis is not None:
+            try:
+                cached = await self.redis.hget(self.HASH_KEY, key)
+            except Exception as e:
+                print(f"Error reading expansion cache: {e}")
+                cached = None
+            if cached:
+                variations = json.loads(cached)
+                self.local.set(key, variations)
+
+        if variations is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return variations
+
+    async def set(self, query: str, variations: List[str]) -> None:
+        key = canonicalize(query)
+        self.local.set(key, variations)
+
+        if self.redis is not None:
+            try:
+                await self.redis.hset(
+                    self.HASH_KEY, key, json.dumps(variations, ensure_ascii=False)
+                )
+            except Exception as e:
+                print(f"Error writing expansion cache: {e}")
+
+    async def record_query(self, query: str) -> None:
+        """Remember a query that needed a live LLM expansion"""
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.lpush(self.HISTORY_KEY, query)
+                pipe.ltrim(self.HISTORY_KEY, 0, self.HISTORY_SIZE - 1)
+                await pipe.execute()
+        except Exception as e:
+            print(f"Error recording expansion history: {e}")
+
+
+class QueryExpansionService:
+    """
+    Query expansion with a backend selected per intent.
+
+    Backends (EXPANSION_BACKENDS, keyed by intent value or "default"):
+    - none:  original query only
+    - local: LocalExpander, no network
+    - llm:   expansion cache first, live LLM call only on a miss
+    """
+
+    def __init__(
+        self,
+        llm_expand: Callable[[str, int], Awaitable[List[str]]],
+        cache: ExpansionCache = None,
+    ):
+        self.llm_expand = llm_expand
+        self.cache = cache or ExpansionCache()
+        self.local = LocalExpander()
+        self.backend_counts: Dict[str, int] = {}
+
+    @staticmethod
+    def backend_for(intent: IntentType = None) -> str:
+        backends = settings.EXPANSION_BACKENDS
+        intent_value = getattr(intent, "value", intent)
+        return backends.get(intent_value, backends.get("default", "llm"))
+
+    async def expand(
+        self, query: str, intent: IntentType = None, num_variations: int = None
+    ) -> List[str]:
+        """Return original query + variations"""
+        num_variations = num_variations or settings.QUERY_VARIATIONS
+        backend = self.backend_for(intent)
+        self.backend_counts[backend] = self.backend_counts.get(backend, 0) + 1
+
+        if backend == "none" or num_variations <= 1:
+            return [query]
+
+        if backend == "local":
+            return self.local.expand(query, num_variations, intent)
+
+        cached = await self.cache.get(query)
+        if cached is not None:
+            return ([query] + [v for v in cached if v != query])[:num_variations]
+
+        await self.cache.record_query(query)
+        variations = await self.llm_expand(query, num_variations)
+        if len(variations) > 1:
+            await self.cache.set(query, variations)
+        return variations
+
+    def stats(self) -> Dict[str, int]:
+        """Backend usage and expansion cache hit counters"""
+        return {
+            **{f"backend_{name}": count for name, count in self.backend_counts.items()},
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
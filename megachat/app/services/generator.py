@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, AsyncIterator
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from app.models.schemas import IntentType, RetrievedDocument
@@ -6,14 +6,17 @@ from app.core.config import get_settings
 
 settings = get_settings()
 
+# Returned when the LLM call fails
+FALLBACK_RESPONSE = "E*#3A'FG /1 -'D -'61 FE*H'FE (G 3H'D 4E' ~'3. /GE. D7A'K /H('1G *D'4 F/."
+
 
 class ResponseGenerator:
     """
     Generate Persian responses using LLM with retrieved context.
     """
 
-    def __init__(self):
-        self.llm = ChatOpenAI(
+    def __init__(self, llm: ChatOpenAI = None):
+        self.llm = llm or ChatOpenAI(
             model=settings.LLM_MODEL,
             temperature=settings.LLM_TEMPERATURE,
             max_tokens=settings.LLM_MAX_TOKENS,
@@ -140,23 +143,13 @@ D7A'K (G*1
 
         return "\n\n".join(context_parts)
 
-    def generate(
+    def build_prompt(
         self,
         query: str,
         intent: IntentType,
         documents: List[RetrievedDocument]
     ) -> str:
-        """
-        Generate response using LLM.
-
-        Args:
-            query: User query
-            intent: Detected intent
-            documents: Retrieved and reranked documents
-
-        Returns:
-            Generated response in Persian
-        """
+        """Build the intent-specific prompt with retrieved context"""
         # Get appropriate template
         template_str = self.templates.get(intent, self.templates[IntentType.GENERAL])
 
@@ -169,7 +162,26 @@ D7A'K (G*1
             template=template_str
         )
 
-        formatted_prompt = prompt.format(query=query, context=context)
+        return prompt.format(query=query, context=context)
+
+    def generate(
+        self,
+        query: str,
+        intent: IntentType,
+        documents: List[RetrievedDocument]
+    ) -> str:
+        """
+        Generate response using LLM.
+
+        Args:
+            query: User query
+            intent: Detected intent
+            documents: Retrieved and reranked documents
+
+        Returns:
+            Generated response in Persian
+        """
+        formatted_prompt = self.build_prompt(query, intent, documents)
 
         # Generate response
         try:
@@ -177,4 +189,42 @@ D7A'K (G*1
             return response.content.strip()
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "E*#3A'FG /1 -'D -'61 FE*H'FE (G 3H'D 4E' ~'3. /GE. D7A'K /H('1G *D'4 F/."
+            return FALLBACK_RESPONSE
+
+    async def agenerate(
+        self,
+        query: str,
+        intent: IntentType,
+        documents: List[RetrievedDocument]
+    ) -> str:
+        """Async variant of generate (awaits the LLM call)"""
+        formatted_prompt = self.build_prompt(query, intent, documents)
+
+        try:
+            response = await self.llm.ainvoke(formatted_prompt)
+            return response.content.strip()
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return FALLBACK_RESPONSE
+
+    async def astream(
+        self,
+        query: str,
+        intent: IntentType,
+        documents: List[RetrievedDocument]
+    ) -> AsyncIterator[str]:
+        """Stream the response as text chunks while the LLM generates it"""
+        formatted_prompt = self.build_prompt(query, intent, documents)
+
+        streamed = False
+        try:
+            async for chunk in self.llm.astream(formatted_prompt):
+                if chunk.content:
+                    streamed = True
+                    yield chunk.content
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            if not streamed:
+                yield FALLBACK_RESPONSE
+            # Callers must not treat a cut-off stream as a complete response
+            raise
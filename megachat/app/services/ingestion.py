@@ -0,0 +1,604 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from queue import Queue, Full
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+from qdrant_client.models import OverwritePayloadOperation, PointIdsList, SetPayload
+from app.models.schemas import Product
+from app.core.vector_store import VectorStore
+from app.core.config import get_settings
+from app.services.retriever import MultiQueryRetriever
+from app.services.embedding_store import EmbeddingStore, embedding_version
+from app.services.search_text import (
+    with_search_text,
+    search_text,
+    build_search_text,
+    SEARCH_TEXT_KEY,
+    RERANK_TEXT_KEY,
+    SEARCH_TOKEN_IDS_KEY,
+)
+
+settings = get_settings()
+
+# Embedding model of an ingestion worker process (set by _init_worker)
+_worker_model = None
+
+
+def load_embedding_model():
+    """Embedding model for the configured INFERENCE_BACKEND"""
+    if settings.INFERENCE_BACKEND == "onnx":
+        from app.core.onnx_backend import OnnxEmbedder
+
+        return OnnxEmbedder(settings.EMBEDDING_MODEL)
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(settings.EMBEDDING_MODEL)
+
+
+def encode(model, texts: List[str]) -> np.ndarray:
+    """Embed product texts (same e5 prefix as MultiQueryRetriever._encode)"""
+    embeddings = model.encode([f"query: {text}" for text in texts], convert_to_numpy=True)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def _init_worker(threads: int) -> None:
+    """Load the embedding model once per worker process"""
+    global _worker_model
+    if settings.INFERENCE_BACKEND == "torch":
+        import torch
+
+        torch.set_num_threads(threads)
+    _worker_model = load_embedding_model()
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return encode(_worker_model, texts)
+
+
+# Characters that can continue a JSON number
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+def iter_json_array(path: Path, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Stream the elements of a top-level JSON array file one at a time.
+
+    Reads chunk_size characters at a time and decodes complete elements
+    off the buffer, so memory stays at about one element plus one chunk
+    however large the file is.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        while not buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer = chunk.lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        pos = 1
+        # At the start or after a comma an element is due, otherwise "," or "]"
+        expect_element, first = True, True
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"{path}: unexpected end of file inside the array")
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+
+            if not expect_element:
+                if buffer[pos] == "]":
+                    return
+                if buffer[pos] != ",":
+                    raise ValueError(f"{path}: expected ',' or ']' between array elements")
+                pos += 1
+                expect_element = True
+                continue
+
+            if first and buffer[pos] == "]":
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element cut off at the chunk boundary: read on (fails on a truncated file)
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+
+            # A number ending at the buffer end may continue in the next chunk,
+            # also past a cut "." or exponent ("-1" of "-1.5e3" decodes on its
+            # own): only accept it once a separator or EOF follows
+            tail = buffer[end:]
+            if not tail.strip(" \t\r\n") or (
+                isinstance(item, (int, float)) and not tail.strip(_NUMBER_CHARS)
+            ):
+                chunk = f.read(chunk_size)
+                if chunk:
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    continue
+
+            yield item
+            pos = end
+            expect_element, first = False, False
+
+
+class _StageError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_STAGE_END = object()
+
+
+def prefetch(items: Iterable, maxsize: int = None, name: str = "stage") -> Iterator:
+    """
+    Run an iterator in a background thread, handing its items over through
+    a bounded queue: the producer blocks while maxsize items wait, so a
+    fast stage never runs ahead of a slow one by more than that.
+    Exceptions are re-raised in the consumer.
+    """
+    queue = Queue(maxsize=maxsize or settings.INGEST_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_StageError(e))
+            return
+        put(_STAGE_END)
+
+    threading.Thread(target=produce, name=f"ingest-{name}", daemon=True).start()
+    try:
+        while True:
+            item = queue.get()
+            if item is _STAGE_END:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Consumer finished or failed: let the producer thread exit
+        stop.set()
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Consecutive lists of up to `size` items"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@dataclass
+class IngestStats:
+    """Counters of one ingestion run"""
+
+    products: int = 0
+    failed: int = 0
+    stored: int = 0  # embeddings read from the embedding store instead of encoded
+    embed_wait: float = 0.0  # seconds spent waiting for embeddings
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.products / max(self.elapsed, 1e-9)
+
+    def report(self) -> str:
+        return (
+            f"{self.products} products in {self.elapsed:.1f}s "
+            f"({self.docs_per_second:.1f} docs/s, {self.embed_wait:.1f}s waiting on embeddings, "
+            f"{self.stored} from the embedding store), {self.failed} failed"
+        )
+
+
+class BulkIngestor:
+    """
+    Bulk product ingestion into Qdrant.
+
+    Products are embedded in batches of INGEST_EMBED_BATCH, in this process
+    or across INGEST_WORKERS processes, and upserted in chunks of
+    INGEST_UPSERT_BATCH with up to INGEST_PARALLEL_UPSERTS requests in
+    flight. The stages overlap: upserts of one batch run on I/O threads
+    while the next batch is embedding. With an EmbeddingStore, stored
+    vectors are reused and only new texts are encoded (and then stored).
+    """
+
+    def __init__(
+        self,
+        qdrant_client: VectorStore,
+        embedding_model=None,
+        collection_name: str = None,
+        embed_batch: int = None,
+        upsert_batch: int = None,
+        parallel_upserts: int = None,
+        workers: int = None,
+        on_upserted: Optional[Callable[[List[Product]], None]] = None,
+        store: EmbeddingStore = None,
+    ):
+        self.qdrant = qdrant_client
+        self.store = store
+        # Called with the products of every write Qdrant acknowledged
+        self.on_upserted = on_upserted
+        self.collection_name = collection_name or settings.QDRANT_COLLECTION_NAME
+        self.embed_batch = embed_batch or settings.INGEST_EMBED_BATCH
+        self.upsert_batch = upsert_batch or settings.INGEST_UPSERT_BATCH
+        self.parallel_upserts = parallel_upserts or settings.INGEST_PARALLEL_UPSERTS
+        self.workers = settings.INGEST_WORKERS if workers is None else workers
+
+        self.embedding_model = None
+        self._process_pool = None
+        if self.workers > 0:
+            # Spawned, not forked: the parent may already hold a model and torch threads
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,),
+            )
+        else:
+            self.embedding_model = embedding_model or load_embedding_model()
+
+        self._upsert_pool = ThreadPoolExecutor(
+            max_workers=self.parallel_upserts, thread_name_prefix="upsert"
+        )
+        self._in_flight: deque = deque()
+        self._unflushed = 0  # products mapped in the store since its last flush
+        self.stats = IngestStats()
+
+    def __enter__(self) -> "BulkIngestor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _embed(self, texts: List[str]) -> Future:
+        if not texts:
+            future = Future()
+            future.set_result(None)
+            return future
+        if self._process_pool is not None:
+            return self._process_pool.submit(_encode_in_worker, texts)
+
+        future = Future()
+        future.set_result(encode(self.embedding_model, texts))
+        return future
+
+    def vector_size(self) -> int:
+        """Embedding size, from the store or a sample encoding (in a worker when pooled)"""
+        if self.store is not None and self.store.dim:
+            return self.store.dim
+        return len(self._embed(["test"]).result()[0])
+
+    def _upsert_chunk(self, points) -> None:
+        self.qdrant.upsert(collection_name=self.collection_name, points=points, wait=True)
+
+    def _overwrite_payloads(self, products: List[Product]) -> None:
+        # One request per chunk: a payload per point needs one operation each
+        self.qdrant.batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=[
+                OverwritePayloadOperation(
+                    overwrite_payload=SetPayload(
+                        payload=product.model_dump(mode="json"), points=[product.id]
+                    )
+                )
+                for product in products
+            ],
+            wait=True,
+        )
+
+    def _collect(self) -> None:
+        """Wait for the oldest in-flight write"""
+        products, future = self._in_flight.popleft()
+        try:
+            future.result()
+        except Exception as e:
+            print(f"  Error upserting {len(products)} products: {e}")
+            self.stats.failed += len(products)
+            return
+
+        self.stats.products += len(products)
+        if self.on_upserted is not None:
+            self.on_upserted(products)
+
+    def _submit(self, products: List[Product], write: Callable, *args) -> None:
+        while len(self._in_flight) >= self.parallel_upserts:
+            self._collect()
+        self._in_flight.append((products, self._upsert_pool.submit(write, *args)))
+
+    def _upsert(self, products: List[Product], embeddings: np.ndarray) -> None:
+        points = [
+            MultiQueryRetriever._product_point(product, embedding.tolist())
+            for product, embedding in zip(products, embeddings)
+        ]
+        for start in range(0, len(points), self.upsert_batch):
+            chunk = points[start:start + self.upsert_batch]
+            self._submit(products[start:start + self.upsert_batch], self._upsert_chunk, chunk)
+
+    def update_payloads(self, products: List[Product]) -> None:
+        """Replace stored payloads without re-embedding (text unchanged)"""
+        products = [
+            product if SEARCH_TEXT_KEY in (product.metadata or {}) else with_search_text(product)
+            for product in products
+        ]
+        for chunk in batched(products, self.upsert_batch):
+            self._submit(chunk, self._overwrite_payloads, chunk)
+
+    def delete(self, product_ids: List[str]) -> None:
+        """Delete products from the collection (waits for Qdrant)"""
+        if self.store is not None:
+            self.store.forget(product_ids)
+        for chunk in batched(product_ids, self.upsert_batch):
+            self.qdrant.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=chunk),
+                wait=True,
+            )
+
+    def _finish_batch(self, products: List[Product], texts: List[str], to_encode: List[str], future: Future) -> None:
+        start = time.perf_counter()
+        try:
+            computed = future.result()
+        except Exception as e:
+            print(f"  Error embedding {len(products)} products: {e}")
+            self.stats.failed += len(products)
+            return
+        finally:
+            self.stats.embed_wait += time.perf_counter() - start
+
+        encoded = dict(zip(to_encode, computed)) if to_encode else {}
+        if self.store is not None:
+            if to_encode:
+                self.store.put_many(to_encode, computed)
+            self.store.map_products([product.id for product in products], texts)
+            # The index is rewritten whole, so only on the checkpoint cadence (and in close);
+            # vectors appended after the last flush are truncated away on the next run
+            self._unflushed += len(products)
+            if self._unflushed >= settings.INGEST_CHECKPOINT_EVERY:
+                self.store.flush()
+                self._unflushed = 0
+
+            stored = [i for i, text in enumerate(texts) if text not in encoded]
+            if stored:
+                rows = self.store.lookup([texts[i] for i in stored])
+                encoded.update(zip((texts[i] for i in stored), self.store.vectors(rows)))
+            self.stats.stored += len(stored)
+
+        embeddings = np.stack([encoded[text] for text in texts])
+        self._upsert(products, embeddings)
+        print(f"  {self.stats.report()}")
+
+    def ingest(self, products: Iterable[Product]) -> IngestStats:
+        """Embed and upsert a stream of products; returns the run's stats"""
+        # Embedding batches kept in flight (enough to keep every worker busy)
+        window = 2 * self.workers if self._process_pool is not None else 1
+        pending = deque()
+
+        for batch in batched(products, self.embed_batch):
+            # Search text is computed once and stored with the product (earlier
+            # pipeline stages may already have done it)
+            batch = [
+                product if SEARCH_TEXT_KEY in (product.metadata or {}) else with_search_text(product)
+                for product in batch
+            ]
+            texts = [search_text(product) for product in batch]
+            # Each distinct text is encoded once, and not at all when already stored
+            to_encode = list(dict.fromkeys(texts))
+            if self.store is not None:
+                to_encode = [text for text, row in zip(to_encode, self.store.lookup(to_encode)) if row is None]
+            pending.append((batch, texts, to_encode, self._embed(to_encode)))
+            while len(pending) >= window:
+                self._finish_batch(*pending.popleft())
+
+        while pending:
+            self._finish_batch(*pending.popleft())
+        while self._in_flight:
+            self._collect()
+
+        return self.stats
+
+    def close(self) -> None:
+        while self._in_flight:
+            self._collect()
+        self._upsert_pool.shutdown(wait=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+        if self.store is not None:
+            self.store.flush()
+
+
+def vector_store_target() -> str:
+    """Backend and location ingested points are written to"""
+    if settings.VECTOR_STORE == "local":
+        return f"local:{Path(settings.LOCAL_VECTOR_STORE_PATH).resolve()}"
+    return f"qdrant:{settings.QDRANT_HOST}:{settings.QDRANT_PORT}"
+
+
+class IngestManifest:
+    """
+    Per-channel record of ingested posts for incremental re-ingestion.
+
+    One JSON file per channel under INGEST_MANIFEST_DIR maps product id to
+    [search text hash, payload hash], stamped with the vector store, the
+    collection and the embedding version (a different version means the
+    channel is re-ingested).
+    Entries are only recorded once Qdrant acknowledged the write, and saved
+    every INGEST_CHECKPOINT_EVERY products, so an interrupted run resumes
+    with the posts it had not finished. A store that only persists on
+    demand (LocalVectorStore) is passed as flush and saved before every
+    checkpoint, so a checkpoint never records writes that are not on disk.
+    """
+
+    ADD = "add"
+    UPDATE = "update"  # search text changed: re-embed
+    PAYLOAD = "payload"  # only payload fields changed: overwrite payload
+    UNCHANGED = "unchanged"
+
+    def __init__(
+        self,
+        directory: str = None,
+        version: str = None,
+        checkpoint_every: int = None,
+        flush: Optional[Callable[[], None]] = None,
+    ):
+        self.directory = Path(directory or settings.INGEST_MANIFEST_DIR)
+        self.version = version or (
+            f"{vector_store_target()}|{settings.QDRANT_COLLECTION_NAME}|{embedding_version()}"
+        )
+        self.checkpoint_every = checkpoint_every or settings.INGEST_CHECKPOINT_EVERY
+        self.flush = flush
+
+        self.channels: Dict[str, Dict[str, List[str]]] = {}
+        # product id -> (channel, hashes) of writes not yet acknowledged
+        self._pending: Dict[str, tuple] = {}
+        self._dirty = set()
+        self._dropped = set()
+        self._unsaved = 0
+
+    def _path(self, channel: str) -> Path:
+        return self.directory / f"{channel}.json"
+
+    def channel(self, channel: str) -> Dict[str, List[str]]:
+        """Entries of a channel (loaded on first use)"""
+        if channel not in self.channels:
+            entries = {}
+            path = self._path(channel)
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.version:
+                    entries = data.get("posts", {})
+                else:
+                    print(f"  Manifest of {channel} is for {data.get('version')}; re-ingesting the channel")
+            self.channels[channel] = entries
+        return self.channels[channel]
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+    @classmethod
+    def hashes(cls, product: Product) -> List[str]:
+        """[search text hash, payload hash]; ingestion timestamps and stored search text are ignored"""
+        payload = product.model_dump(mode="json", exclude={"created_at", "updated_at"})
+        payload["metadata"] = {
+            key: value
+            for key, value in (payload.get("metadata") or {}).items()
+            if key not in (SEARCH_TEXT_KEY, RERANK_TEXT_KEY, SEARCH_TOKEN_IDS_KEY)
+        }
+        return [
+            cls._digest(build_search_text(product)),
+            cls._digest(json.dumps(payload, sort_keys=True, ensure_ascii=False)),
+        ]
+
+    def classify(self, channel: str, product: Product) -> str:
+        """Change kind of a post against the manifest"""
+        hashes = self.hashes(product)
+        stored = self.channel(channel).get(product.id)
+
+        if stored is None:
+            change = self.ADD
+        elif stored[0] != hashes[0]:
+            change = self.UPDATE
+        elif stored[1] != hashes[1]:
+            change = self.PAYLOAD
+        else:
+            return self.UNCHANGED
+
+        self._pending[product.id] = (channel, hashes)
+        return change
+
+    def vanished(self, channel: str, seen_ids: set) -> List[str]:
+        """Recorded products of a channel that are no longer in its posts"""
+        return [product_id for product_id in self.channel(channel) if product_id not in seen_ids]
+
+    def confirm(self, products: List[Product]) -> None:
+        """Record acknowledged writes; checkpoint every INGEST_CHECKPOINT_EVERY products"""
+        for product in products:
+            channel, hashes = self._pending.pop(product.id, (None, None))
+            if channel is None:
+                continue
+            self.channels[channel][product.id] = hashes
+            self._dirty.add(channel)
+            self._unsaved += 1
+
+        if self._unsaved >= self.checkpoint_every:
+            self.save()
+
+    def removed_channels(self, present: set) -> Dict[str, List[str]]:
+        """Recorded product ids of channels whose file is no longer in the dataset"""
+        removed = {}
+        if not self.directory.exists():
+            return removed
+        for path in sorted(self.directory.glob("*.json")):
+            if path.stem in present or path.stem in self._dropped:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Whatever version it was written for: deleting absent points is harmless
+            removed[path.stem] = list(data.get("posts", {}))
+        return removed
+
+    def drop(self, channel: str) -> None:
+        """Forget a removed channel; its file is deleted on the next save"""
+        self.channels.pop(channel, None)
+        self._dirty.discard(channel)
+        self._dropped.add(channel)
+
+    def forget(self, channel: str, product_ids: List[str]) -> None:
+        entries = self.channel(channel)
+        for product_id in product_ids:
+            entries.pop(product_id, None)
+        self._dirty.add(channel)
+
+    def save(self) -> None:
+        """Write changed channel files (atomically), after flushing the vector store"""
+        if (self._dirty or self._dropped) and self.flush is not None:
+            self.flush()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for channel in self._dirty:
+            path = self._path(channel)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "posts": self.channels[channel]}, f)
+            os.replace(tmp_path, path)
+        for channel in self._dropped:
+            if self._path(channel).exists():
+                os.remove(self._path(channel))
+        self._dirty = set()
+        self._dropped = set()
+        self._unsaved = 0
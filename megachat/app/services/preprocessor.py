@@ -2,6 +2,44 @@ from hazm import Normalizer, word_tokenize
 from typing import List
 
 
+def _build_canonical_table() -> dict:
+    """Single-pass str.translate table for canonicalize()"""
+    table = {
+        0x064A: "\u06cc",  # Arabic yeh -> Persian yeh
+        0x0649: "\u06cc",  # Alef maksura -> Persian yeh
+        0x0643: "\u06a9",  # Arabic kaf -> Persian keheh
+        0x200C: " ",        # ZWNJ folds to a space
+        0x00A0: " ",        # No-break space
+    }
+    # Arabic-Indic and Persian digits -> ASCII digits
+    for i in range(10):
+        table[0x0660 + i] = str(i)
+        table[0x06F0 + i] = str(i)
+    # Drop diacritics, tatweel, directional marks and other invisible joiners
+    for code in [*range(0x064B, 0x0653), 0x0670, 0x0640, 0x200D, 0x200E, 0x200F, 0xFEFF]:
+        table[code] = None
+    # Drop punctuation that does not change the question ("." is kept for decimals)
+    for char in "?!,:;\u061f\u060c\u061b\u00ab\u00bb\"'":
+        table[ord(char)] = None
+    return table
+
+
+_CANONICAL_TABLE = _build_canonical_table()
+
+
+def canonicalize(text: str) -> str:
+    """
+    Cheap canonical form of a query for cache keys.
+
+    Folds the variants Hazm's Normalizer would collapse (Arabic/Persian
+    characters, digits, ZWNJ and whitespace, diacritics, punctuation)
+    using one translate pass and one split/join, without running Hazm.
+    """
+    if not text:
+        return ""
+    return " ".join(text.translate(_CANONICAL_TABLE).lower().split()).rstrip(". ")
+
+
 class PersianPreprocessor:
     """Persian text preprocessor using Hazm"""
 
@@ -1,7 +1,13 @@
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
 from sentence_transformers import CrossEncoder
 from app.models.schemas import RetrievedDocument
 from app.core.config import get_settings
+from app.core.executor import run_in_executor
+from app.services.batching import MicroBatcher
+from app.services.cache import RerankScoreCache
+from app.services.search_text import rerank_text, search_text, search_token_ids
+from app.services.preprocessor import canonicalize
 
 settings = get_settings()
 
@@ -10,11 +16,155 @@ class RerankerService:
     """
     Rerank retrieved documents using cross-encoder.
     Uses cross-encoder/ms-marco-multilingual-MiniLM-L12-v2.
+
+    Reranking is a two-stage cascade (RERANK_CASCADE): a cheap first stage
+    (vector score + lexical overlap) keeps only the ambiguous head for the
+    cross-encoder, and the cross-encoder is skipped entirely when the
+    vector scores already separate the top results by a clear margin.
+    The margin is a fraction of the candidates' score spread, so it holds
+    for cosine and RRF scores alike. Skipped results keep their retrieval
+    scores; arerank reports them as skipped.
+
+    Pair scores are cached (RerankScoreCache), so only unseen
+    query-product pairs reach the model. Async reranks from concurrent
+    requests are micro-batched into one cross-encoder call (RERANK_BATCHING).
     """
 
-    def __init__(self):
-        # Load cross-encoder model
-        self.model = CrossEncoder(settings.RERANKER_MODEL)
+    def __init__(self, model: CrossEncoder = None, score_cache: RerankScoreCache = None):
+        # Load cross-encoder model (reuse a preloaded one when given)
+        self.model = model or CrossEncoder(settings.RERANKER_MODEL)
+        self.score_cache = score_cache or RerankScoreCache()
+        self.cascade_counts = {"requests": 0, "skipped": 0, "candidates": 0, "scored": 0}
+        self.batcher = MicroBatcher(
+            self._predict,
+            max_batch=settings.RERANK_MAX_BATCH,
+            max_wait_ms=settings.RERANK_MAX_WAIT_MS,
+            name="rerank",
+        )
+
+    def _predict(self, pairs: List[list]) -> Sequence[float]:
+        """Score all pairs in a single padded forward pass"""
+        return self.model.predict(pairs, batch_size=max(len(pairs), 1))
+
+    def _pairs(self, query: str, documents: List[RetrievedDocument]) -> List[list]:
+        """
+        Build query-document pairs from the reranker text stored at ingestion.
+
+        Models that accept pre-tokenised documents also get the stored
+        token ids as a third element.
+        """
+        with_ids = getattr(self.model, "accepts_token_ids", False)
+        pairs = []
+        for doc in documents:
+            pair = [query, rerank_text(doc.product)]
+            token_ids = search_token_ids(doc.product) if with_ids else None
+            if token_ids:
+                pair.append(token_ids)
+            pairs.append(pair)
+        return pairs
+
+    def _cache_keys(
+        self, query: str, documents: List[RetrievedDocument], pairs: List[list]
+    ) -> List[str]:
+        return [
+            self.score_cache.key(query, doc.product.id, pair[1])
+            for doc, pair in zip(documents, pairs)
+        ]
+
+    @staticmethod
+    def _cache_report(pairs: int, cached: int) -> Dict[str, float]:
+        return {
+            "pairs": pairs,
+            "cached": cached,
+            "hit_ratio": round(cached / pairs, 3) if pairs else 0.0,
+        }
+
+    @staticmethod
+    def _first_stage(query: str, documents: List[RetrievedDocument]) -> np.ndarray:
+        """Cheap score: min-max normalised vector score blended with query term coverage"""
+        vector = np.asarray([doc.score for doc in documents], dtype=np.float64)
+        span = vector.max() - vector.min()
+        vector = (vector - vector.min()) / span if span > 0 else np.ones_like(vector)
+
+        query_terms = {term for term in canonicalize(query).split() if len(term) > 1}
+        if not query_terms:
+            return vector
+
+        overlap = np.asarray([
+            len(query_terms & set(canonicalize(search_text(doc.product)).split())) / len(query_terms)
+            for doc in documents
+        ])
+        weight = settings.RERANK_CASCADE_LEXICAL_WEIGHT
+        return (1 - weight) * vector + weight * overlap
+
+    def _cascade(
+        self, query: str, documents: List[RetrievedDocument], top_k: int
+    ) -> Tuple[List[RetrievedDocument], bool]:
+        """
+        First cascade stage.
+
+        Returns (candidates, decided): when decided, candidates are the
+        final top_k without a cross-encoder pass; otherwise they are the
+        head to score with the cross-encoder.
+        """
+        if not settings.RERANK_CASCADE or len(documents) <= top_k:
+            return documents, False
+
+        self.cascade_counts["requests"] += 1
+        self.cascade_counts["candidates"] += len(documents)
+        first = self._first_stage(query, documents)
+
+        # Clear margin after the top_k vector scores, relative to their spread
+        # (cosine or RRF alike): the result set is settled
+        vector = sorted((doc.score for doc in documents), reverse=True)
+        span = vector[0] - vector[-1]
+        gap = (vector[top_k - 1] - vector[top_k]) / span if span > 0 else 0.0
+        if gap >= settings.RERANK_CASCADE_SKIP_MARGIN:
+            self.cascade_counts["skipped"] += 1
+            threshold = vector[top_k - 1]
+            settled = [i for i, doc in enumerate(documents) if doc.score >= threshold]
+            settled.sort(key=lambda i: -first[i])
+            decided = [documents[i] for i in settled[:top_k]]
+            for rank, doc in enumerate(decided, 1):
+                doc.rank = rank
+            return decided, True
+
+        head_size = max(settings.RERANK_CASCADE_HEAD, top_k)
+        order = np.argsort(-first, kind="stable")[:head_size]
+        self.cascade_counts["scored"] += len(order)
+        return [documents[i] for i in order], False
+
+    def cascade_stats(self) -> Dict[str, float]:
+        """How much cross-encoder work the cascade avoided"""
+        counts = dict(self.cascade_counts)
+        requests = max(counts["requests"], 1)
+        candidates = max(counts["candidates"], 1)
+        return {
+            **counts,
+            "skip_rate": round(counts["skipped"] / requests, 3),
+            "scored_fraction": round(counts["scored"] / candidates, 3),
+        }
+
+    @staticmethod
+    def _apply_scores(
+        documents: List[RetrievedDocument], scores: Sequence[float], top_k: int
+    ) -> List[RetrievedDocument]:
+        """Set cross-encoder scores, sort and keep top_k"""
+        # Update scores in documents
+        for i, doc in enumerate(documents):
+            doc.score = float(scores[i])
+
+        # Sort by new scores
+        reranked = sorted(documents, key=lambda x: x.score, reverse=True)
+
+        # Take top_k
+        reranked = reranked[:top_k]
+
+        # Update ranks
+        for i, doc in enumerate(reranked):
+            doc.rank = i + 1
+
+        return reranked
 
     def rerank(
         self,
@@ -38,33 +188,73 @@ class RerankerService:
 
         top_k = top_k or settings.RERANK_TOP_K
 
+        # First stage: prune to the ambiguous head, or settle without the cross-encoder
+        documents, decided = self._cascade(query, documents, top_k)
+        if decided:
+            return documents
+
         # Prepare query-document pairs
-        pairs = []
-        for doc in documents:
-            # Create document text from product
-            doc_text = f"{doc.product.name}"
-            if doc.product.description:
-                doc_text += f" {doc.product.description}"
-            if doc.product.brand:
-                doc_text += f" {doc.product.brand}"
+        pairs = self._pairs(query, documents)
 
-            pairs.append([query, doc_text])
+        # Score unseen pairs with cross-encoder (in-process cache tier only)
+        keys = self._cache_keys(query, documents, pairs)
+        scores = self.score_cache.get_local(keys)
+        missing = [i for i, score in enumerate(scores) if score is None]
 
-        # Score pairs with cross-encoder
-        scores = self.model.predict(pairs)
+        if missing:
+            computed = self._predict([pairs[i] for i in missing])
+            self.score_cache.set_local([keys[i] for i in missing], computed)
+            for i, score in zip(missing, computed):
+                scores[i] = float(score)
 
-        # Update scores in documents
-        for i, doc in enumerate(documents):
-            doc.score = float(scores[i])
+        return self._apply_scores(documents, scores, top_k)
 
-        # Sort by new scores
-        reranked = sorted(documents, key=lambda x: x.score, reverse=True)
+    async def arerank(
+        self,
+        query: str,
+        documents: List[RetrievedDocument],
+        top_k: int = None,
+        stats: Optional[Dict[str, float]] = None,
+    ) -> List[RetrievedDocument]:
+        """
+        Async variant of rerank using both score cache tiers.
 
-        # Take top_k
-        reranked = reranked[:top_k]
+        Uncached pairs join the micro-batcher's next cross-encoder call
+        (RERANK_BATCHING) or run on the inference executor. When given,
+        `stats` receives this request's candidate/pair counts and cache hit
+        ratio.
+        """
+        if not documents:
+            return []
 
-        # Update ranks
-        for i, doc in enumerate(reranked):
-            doc.rank = i + 1
+        top_k = top_k or settings.RERANK_TOP_K
+        candidates = len(documents)
+        documents, decided = self._cascade(query, documents, top_k)
+        if decided:
+            if stats is not None:
+                stats.update(self._cache_report(0, 0), candidates=candidates, skipped=True)
+            return documents
 
-        return reranked
+        pairs = self._pairs(query, documents)
+        keys = self._cache_keys(query, documents, pairs)
+        scores = await self.score_cache.get_many(keys)
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing:
+            missing_pairs = [pairs[i] for i in missing]
+            if settings.RERANK_BATCHING:
+                computed = await self.batcher.submit(missing_pairs)
+            else:
+                computed = await run_in_executor(self._predict, missing_pairs)
+            await self.score_cache.set_many([keys[i] for i in missing], computed)
+            for i, score in zip(missing, computed):
+                scores[i] = float(score)
+
+        if stats is not None:
+            stats.update(
+                self._cache_report(len(pairs), len(pairs) - len(missing)),
+                candidates=candidates,
+                skipped=False,
+            )
+
+        return self._apply_scores(documents, scores, top_k)
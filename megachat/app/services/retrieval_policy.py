@@ -0,0 +1,153 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List
+from app.models.schemas import IntentType, Slots, RetrievedDocument
+from app.core.config import get_settings
+from app.core.metrics import get_histogram
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class RetrievalBudget:
+    """How much retrieval work a request is allowed"""
+
+    name: str
+    variations: int  # searched queries, including the original (1 = no expansion)
+    top_k: int  # vector search depth (0 = skip retrieval)
+    rerank: bool  # run the cross-encoder
+
+
+class RetrievalPolicy:
+    """
+    Intent-aware retrieval budgets.
+
+    Picks a budget from the detected intent, the intent detector's
+    confidence and the extracted slots:
+    - none:     greetings, no retrieval
+    - lookup:   confident price/availability check naming a product or
+                brand; one vector search, no expansion, no reranking
+    - focused:  confident intent with slots; fewer variations
+    - broad:    comparisons; full expansion, deeper search
+    - standard: everything else (previous behaviour)
+
+    Latency and result quality are tracked per budget so the cut in work
+    can be weighed against what it returns. The mean top score of a
+    reranking budget only covers cross-encoder scores: results the rerank
+    cascade settled on retrieval scores are counted apart.
+    """
+
+    LOOKUP_INTENTS = (IntentType.PRICE_CHECK, IntentType.AVAILABILITY)
+
+    def __init__(self, confidence_threshold: float = None):
+        self.confidence_threshold = confidence_threshold or settings.RETRIEVAL_POLICY_CONFIDENCE
+        self.budgets = {
+            "none": RetrievalBudget("none", variations=0, top_k=0, rerank=False),
+            "lookup": RetrievalBudget(
+                "lookup", variations=1, top_k=settings.RERANK_TOP_K, rerank=False
+            ),
+            "focused": RetrievalBudget(
+                "focused",
+                variations=min(2, settings.QUERY_VARIATIONS),
+                top_k=settings.RETRIEVAL_TOP_K,
+                rerank=True,
+            ),
+            "broad": RetrievalBudget(
+                "broad",
+                variations=settings.QUERY_VARIATIONS,
+                top_k=settings.RETRIEVAL_TOP_K * 2,
+                rerank=True,
+            ),
+            "standard": RetrievalBudget(
+                "standard",
+                variations=settings.QUERY_VARIATIONS,
+                top_k=settings.RETRIEVAL_TOP_K,
+                rerank=True,
+            ),
+        }
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def select(
+        self, intent: IntentType, slots: Slots = None, confidence: float = 0.0
+    ) -> RetrievalBudget:
+        """Choose the retrieval budget for a parsed query"""
+        if not settings.RETRIEVAL_POLICY_ENABLED:
+            return self.budgets["none" if intent == IntentType.GREETING else "standard"]
+
+        if intent == IntentType.GREETING:
+            return self.budgets["none"]
+
+        if intent == IntentType.COMPARISON:
+            return self.budgets["broad"]
+
+        confident = confidence >= self.confidence_threshold
+        names_product = bool(slots and (slots.brand or slots.product_name))
+
+        if confident and names_product and intent in self.LOOKUP_INTENTS:
+            return self.budgets["lookup"]
+
+        if confident and intent != IntentType.GENERAL:
+            return self.budgets["focused"]
+
+        return self.budgets["standard"]
+
+    def record(
+        self,
+        budget: RetrievalBudget,
+        latency_ms: float,
+        documents: List[RetrievedDocument],
+        rerank_skipped: bool = False,
+    ) -> None:
+        """
+        Record latency and result quality for one request under a budget
+        (rerank_skipped: the cascade kept retrieval scores)
+        """
+        get_histogram(f"policy.{budget.name}").observe(latency_ms)
+
+        with self._lock:
+            stats = self._stats.setdefault(
+                budget.name,
+                {
+                    "requests": 0,
+                    "searches": 0,
+                    "reranked": 0,
+                    "rerank_skipped": 0,
+                    "empty": 0,
+                    "scored": 0,
+                    "top_score_sum": 0.0,
+                },
+            )
+            stats["requests"] += 1
+            stats["searches"] += budget.variations
+            stats["reranked"] += int(budget.rerank and not rerank_skipped)
+            stats["rerank_skipped"] += int(budget.rerank and rerank_skipped)
+            if not documents:
+                stats["empty"] += 1
+            elif not (budget.rerank and rerank_skipped):
+                # Scores on the budget's own scale (cross-encoder, or retrieval without reranking)
+                stats["scored"] += 1
+                stats["top_score_sum"] += documents[0].score
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-budget request counts, work done, latency and result quality"""
+        with self._lock:
+            snapshot = {name: dict(stats) for name, stats in self._stats.items()}
+
+        report = {}
+        for name, stats in snapshot.items():
+            requests = stats["requests"]
+            scored = stats["scored"]
+            latency = get_histogram(f"policy.{name}").snapshot()
+            report[name] = {
+                "budget": vars(self.budgets[name]),
+                "requests": requests,
+                "searches_per_request": round(stats["searches"] / requests, 2),
+                "rerank_rate": round(stats["reranked"] / requests, 3),
+                "rerank_skip_rate": round(stats["rerank_skipped"] / requests, 3),
+                "empty_rate": round(stats["empty"] / requests, 3),
+                "mean_top_score": round(stats["top_score_sum"] / scored, 4) if scored else None,
+                "mean_ms": latency["mean_ms"],
+                "p95_ms": latency["p95_ms"],
+            }
+        return report
@@ -1,14 +1,45 @@
-from typing import List
+import asyncio
+import time
+from typing import Callable, List, Optional
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    MatchAny,
+    Range,
+    IsEmptyCondition,
+    PayloadField,
+    PayloadSchemaType,
+    SearchRequest,
+)
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from app.models.schemas import Product, RetrievedDocument, IntentType, Slots
+from app.core.vector_store import VectorStore, AsyncVectorStore
 from app.core.config import get_settings
+from app.core.executor import run_in_executor
+from app.core.metrics import get_histogram, record_latency
+from app.services.cache import EmbeddingCache
+from app.services.expansion import ExpansionCache, QueryExpansionService
+from app.services.search_text import with_search_text, search_text
+from app.services.sparse_index import BM25Index
 
 settings = get_settings()
 
+# Payload fields filtered on (see _slot_filters), indexed in Qdrant
+PAYLOAD_INDEXES = {
+    "price": PayloadSchemaType.FLOAT,
+    "availability": PayloadSchemaType.BOOL,
+    "brand": PayloadSchemaType.KEYWORD,
+    "color": PayloadSchemaType.KEYWORD,
+    "metadata.channel": PayloadSchemaType.KEYWORD,
+}
+
 
 class MultiQueryRetriever:
     """
@@ -16,51 +47,84 @@ class MultiQueryRetriever:
     Uses multilingual-e5-large for embeddings.
     """
 
-    def __init__(self, qdrant_client: QdrantClient):
+    def __init__(
+        self,
+        qdrant_client: VectorStore,
+        embedding_model: SentenceTransformer = None,
+        llm: ChatOpenAI = None,
+        async_qdrant_client: AsyncVectorStore = None,
+        embedding_cache: EmbeddingCache = None,
+        expansion_cache: ExpansionCache = None,
+        sparse_index: BM25Index = None,
+    ):
         self.qdrant = qdrant_client
+        self.async_qdrant = async_qdrant_client
+        self.embedding_cache = embedding_cache
+        # BM25 index for hybrid retrieval (None = dense only)
+        self.sparse_index = sparse_index
         self.collection_name = settings.QDRANT_COLLECTION_NAME
 
-        # Load embedding model
-        self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        # Load embedding model (reuse a preloaded one when given)
+        self.embedding_model = embedding_model or SentenceTransformer(settings.EMBEDDING_MODEL)
 
         # LLM for query expansion
-        self.llm = ChatOpenAI(
+        self.llm = llm or ChatOpenAI(
             model=settings.LLM_MODEL,
             temperature=0.3,
             api_key=settings.OPENAI_API_KEY,
         )
 
+        # Per-intent expansion backends in front of the LLM
+        self.expansion = QueryExpansionService(self.agenerate_query_variations, expansion_cache)
+
         # Initialize collection if needed
         self._ensure_collection_exists()
 
     def _ensure_collection_exists(self):
         """Ensure Qdrant collection exists"""
+        self.ensure_collection(
+            self.qdrant,
+            lambda: len(self.embedding_model.encode("test")),
+            self.collection_name,
+        )
+
+    @staticmethod
+    def ensure_collection(
+        qdrant_client: VectorStore,
+        vector_size: Callable[[], int],
+        collection_name: str = None,
+    ) -> None:
+        """
+        Create the collection (vector_size is only called when it is missing)
+        and any payload indexes for filtered fields it lacks
+        """
+        collection_name = collection_name or settings.QDRANT_COLLECTION_NAME
         try:
-            collections = self.qdrant.get_collections().collections
+            collections = qdrant_client.get_collections().collections
             collection_names = [col.name for col in collections]
 
-            if self.collection_name not in collection_names:
-                # Get embedding dimension
-                sample_embedding = self.embedding_model.encode("test")
-                vector_size = len(sample_embedding)
-
-                self.qdrant.create_collection(
-                    collection_name=self.collection_name,
+            if collection_name not in collection_names:
+                qdrant_client.create_collection(
+                    collection_name=collection_name,
                     vectors_config=VectorParams(
-                        size=vector_size,
+                        size=vector_size(),
                         distance=Distance.COSINE
                     ),
                 )
+
+            existing = qdrant_client.get_collection(collection_name).payload_schema or {}
+            for field_name, schema in PAYLOAD_INDEXES.items():
+                if field_name not in existing:
+                    qdrant_client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=field_name,
+                        field_schema=schema,
+                    )
         except Exception as e:
             print(f"Error ensuring collection exists: {e}")
 
-    def generate_query_variations(self, query: str, num_variations: int = None) -> List[str]:
-        """
-        Generate query variations using LLM.
-        Returns original query + variations.
-        """
-        num_variations = num_variations or settings.QUERY_VARIATIONS
-
+    def _expansion_prompt(self, query: str, num_variations: int) -> str:
+        """Build the query expansion prompt"""
         prompt_template = PromptTemplate(
             input_variables=["query", "num"],
             template="""4E' ̩ /3*'1 GH4EF/ G3*/. ̩ 3H'D A'13 /1'A* EF/ H ('/ {num} F3.G E*A'H* '2 "F 3H'D 1' (3'2/ G GE'F E9F 1' /'4*G ('4F/ 'E' (' DE'* E*A'H* ('F 4HF/.
@@ -71,104 +135,333 @@ D7A'K {num} F3.G E*A'H* '2 '
 """
         )
 
+        return prompt_template.format(query=query, num=num_variations - 1)
+
+    def _parse_variations(self, query: str, content: str, num_variations: int) -> List[str]:
+        """Parse LLM output into original query + variations"""
+        variations = [query]  # Always include original
+        lines = content.strip().split("\n")
+
+        for line in lines:
+            line = line.strip()
+            # Remove numbering (1., 2., -, etc.)
+            if line and (line[0].isdigit() or line[0] in ["-", """, "*"]):
+                # Extract text after numbering
+                parts = line.split(".", 1) if "." in line else line.split(")", 1) if ")" in line else [line]
+                if len(parts) > 1:
+                    variation = parts[1].strip()
+                else:
+                    variation = parts[0].strip().lstrip("-"* ")
+
+                if variation and variation != query:
+                    variations.append(variation)
+
+        return variations[:num_variations]
+
+    def generate_query_variations(self, query: str, num_variations: int = None) -> List[str]:
+        """
+        Generate query variations using LLM.
+        Returns original query + variations.
+        """
+        num_variations = num_variations or settings.QUERY_VARIATIONS
+
         try:
-            prompt = prompt_template.format(query=query, num=num_variations - 1)
+            prompt = self._expansion_prompt(query, num_variations)
             response = self.llm.invoke(prompt)
+            return self._parse_variations(query, response.content, num_variations)
 
-            # Parse variations from response
-            variations = [query]  # Always include original
-            lines = response.content.strip().split("\n")
-
-            for line in lines:
-                line = line.strip()
-                # Remove numbering (1., 2., -, etc.)
-                if line and (line[0].isdigit() or line[0] in ["-", """, "*"]):
-                    # Extract text after numbering
-                    parts = line.split(".", 1) if "." in line else line.split(")", 1) if ")" in line else [line]
-                    if len(parts) > 1:
-                        variation = parts[1].strip()
-                    else:
-                        variation = parts[0].strip().lstrip("-"* ")
+        except Exception as e:
+            print(f"Error generating query variations: {e}")
+            return [query]
 
-                    if variation and variation != query:
-                        variations.append(variation)
+    async def agenerate_query_variations(self, query: str, num_variations: int = None) -> List[str]:
+        """Async variant of generate_query_variations (awaits the LLM call)"""
+        num_variations = num_variations or settings.QUERY_VARIATIONS
 
-            return variations[:num_variations]
+        try:
+            prompt = self._expansion_prompt(query, num_variations)
+            response = await self.llm.ainvoke(prompt)
+            return self._parse_variations(query, response.content, num_variations)
 
         except Exception as e:
             print(f"Error generating query variations: {e}")
             return [query]
 
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Run the embedding model on texts in a single batched forward pass"""
+        # Add prefix for e5 model
+        prefixed_texts = [f"query: {text}" for text in texts]
+        embeddings = self.embedding_model.encode(
+            prefixed_texts,
+            batch_size=max(len(prefixed_texts), 1),
+            convert_to_numpy=True,
+        )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed several texts in a single batched forward pass.
+
+        Uses the in-process embedding cache tier when configured.
+        Returns a C-contiguous float32 matrix of shape (len(texts), dim).
+        """
+        if self.embedding_cache is None:
+            return self._encode(texts)
+
+        embeddings = [self.embedding_cache.get_local(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            computed = self._encode([texts[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                self.embedding_cache.set_local(texts[i], embedding)
+                embeddings[i] = embedding
+
+        return np.ascontiguousarray(np.vstack(embeddings), dtype=np.float32)
+
+    async def aembed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Async variant of embed_texts using both embedding cache tiers.
+
+        Only texts missing from the in-process and Redis tiers are encoded
+        (on the inference executor); new vectors are written back to both.
+        """
+        if self.embedding_cache is None:
+            return await run_in_executor(self._encode, texts)
+
+        embeddings = await self.embedding_cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = await run_in_executor(self._encode, missing_texts)
+            await self.embedding_cache.set_many(missing_texts, computed)
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+
+        return np.ascontiguousarray(np.vstack(embeddings), dtype=np.float32)
+
     def embed_text(self, text: str) -> List[float]:
         """Generate embedding for text using multilingual-e5-large"""
-        # Add prefix for e5 model
-        prefixed_text = f"query: {text}"
-        embedding = self.embedding_model.encode(prefixed_text)
-        return embedding.tolist()
+        return self.embed_texts([text])[0].tolist()
+
+    @staticmethod
+    def _build_filter(filters: dict = None) -> Optional[Filter]:
+        """
+        Build a Qdrant filter from a field -> value dict:
+            value             - exact match
+            [values]          - match any
+            {"min", "max"}    - range (bounds optional); on "price", unpriced
+                                products also pass when FILTER_KEEP_UNPRICED
+        """
+        if not filters:
+            return None
+
+        conditions = []
+        for key, value in filters.items():
+            if isinstance(value, dict):
+                condition = FieldCondition(
+                    key=key, range=Range(gte=value.get("min"), lte=value.get("max"))
+                )
+                if key == "price" and settings.FILTER_KEEP_UNPRICED:
+                    # Ingested posts without a parsed price are stored with price 0
+                    condition = Filter(should=[
+                        condition,
+                        FieldCondition(key=key, range=Range(lte=0)),
+                        IsEmptyCondition(is_empty=PayloadField(key=key)),
+                    ])
+                conditions.append(condition)
+            elif isinstance(value, (list, tuple)):
+                conditions.append(FieldCondition(key=key, match=MatchAny(any=list(value))))
+            else:
+                conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
+        return Filter(must=conditions) if conditions else None
+
+    @staticmethod
+    def _matches_filters(payload: dict, filters: dict = None) -> bool:
+        """Evaluate _build_filter semantics on a payload (for results not from a filtered search)"""
+        for key, expected in (filters or {}).items():
+            value = payload
+            for part in key.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+
+            if isinstance(expected, dict):
+                if key == "price" and settings.FILTER_KEEP_UNPRICED and not value:
+                    continue
+                if value is None:
+                    return False
+                if expected.get("min") is not None and value < expected["min"]:
+                    return False
+                if expected.get("max") is not None and value > expected["max"]:
+                    return False
+            elif isinstance(expected, (list, tuple)):
+                if value not in expected:
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+    @staticmethod
+    def _search_requests(
+        embeddings: np.ndarray,
+        top_k: int,
+        query_filter: Optional[Filter],
+    ) -> List[SearchRequest]:
+        """One Qdrant search request per query variation"""
+        return [
+            SearchRequest(
+                vector=embedding.tolist(),
+                filter=query_filter,
+                limit=top_k,
+                with_payload=True,
+            )
+            for embedding in embeddings
+        ]
+
+    @staticmethod
+    def _fuse_results(batch_results, top_k: int, fusion: str) -> List[RetrievedDocument]:
+        """
+        Fuse per-variation hit lists into a single ranking.
+
+        Fusion strategies:
+        - max: best similarity score of each product across variations
+        - rrf: reciprocal rank fusion, sum of 1 / (RRF_K + rank)
+        """
+        index = {}
+        payloads = []
+        columns, ranks, scores = [], [], []
+
+        for hits in batch_results:
+            for rank, hit in enumerate(hits, 1):
+                if hit.id not in index:
+                    index[hit.id] = len(payloads)
+                    payloads.append(hit.payload)
+                columns.append(index[hit.id])
+                ranks.append(rank)
+                scores.append(hit.score)
+
+        if not payloads:
+            return []
+
+        columns = np.asarray(columns, dtype=np.int64)
+        if fusion == "max":
+            fused = np.full(len(payloads), -np.inf)
+            np.maximum.at(fused, columns, np.asarray(scores, dtype=np.float64))
+        elif fusion == "rrf":
+            fused = np.zeros(len(payloads))
+            np.add.at(fused, columns, 1.0 / (settings.RRF_K + np.asarray(ranks, dtype=np.float64)))
+        else:
+            raise ValueError(f"Unknown fusion strategy: {fusion}")
+
+        order = np.argsort(-fused, kind="stable")[:top_k]
+
+        results = []
+        for rank, i in enumerate(order, 1):
+            doc = RetrievedDocument(
+                product=Product(**payloads[i]),
+                score=float(fused[i])
+            )
+            doc.rank = rank
+            results.append(doc)
+
+        return results
 
     def search(
         self,
         query_variations: List[str],
         top_k: int = None,
-        filters: dict = None
+        filters: dict = None,
+        fusion: str = None,
     ) -> List[RetrievedDocument]:
         """
         Search Qdrant with multiple query variations.
-        Combines results from all variations.
+
+        All variation vectors are sent in one batch request and the
+        per-variation results are fused (see _fuse_results).
         """
         top_k = top_k or settings.RETRIEVAL_TOP_K
-        all_results = {}
-
-        for query in query_variations:
-            embedding = self.embed_text(query)
-
-            # Build filter if provided
-            query_filter = None
-            if filters:
-                conditions = []
-                for key, value in filters.items():
-                    conditions.append(
-                        FieldCondition(key=key, match=MatchValue(value=value))
-                    )
-                if conditions:
-                    query_filter = Filter(must=conditions)
+        fusion = fusion or settings.RETRIEVAL_FUSION
 
-            # Search
-            try:
-                results = self.qdrant.search(
-                    collection_name=self.collection_name,
-                    query_vector=embedding,
-                    limit=top_k,
-                    query_filter=query_filter,
-                )
+        # Embed all variations at once and build the filter once
+        embeddings = self.embed_texts(query_variations)
+        query_filter = self._build_filter(filters)
 
-                # Aggregate results (deduplicate and keep best scores)
-                for result in results:
-                    product_id = result.id
-                    if product_id not in all_results or result.score > all_results[product_id].score:
-                        # Parse payload to Product
-                        product = Product(**result.payload)
-                        all_results[product_id] = RetrievedDocument(
-                            product=product,
-                            score=result.score
-                        )
-
-            except Exception as e:
-                print(f"Error searching with query '{query}': {e}")
-                continue
+        try:
+            batch_results = self.qdrant.search_batch(
+                collection_name=self.collection_name,
+                requests=self._search_requests(embeddings, top_k, query_filter),
+            )
+        except Exception as e:
+            print(f"Error searching with queries {query_variations}: {e}")
+            return []
+
+        return self._fuse_results(batch_results, top_k, fusion)
+
+    async def asearch(
+        self,
+        query_variations: List[str],
+        top_k: int = None,
+        filters: dict = None,
+        fusion: str = None,
+    ) -> List[RetrievedDocument]:
+        """
+        Async variant of search.
+
+        Embeddings are computed on the inference executor and Qdrant is
+        queried through the async client, so the event loop never blocks.
+        """
+        if self.async_qdrant is None:
+            return await run_in_executor(self.search, query_variations, top_k, filters, fusion)
+
+        top_k = top_k or settings.RETRIEVAL_TOP_K
+        fusion = fusion or settings.RETRIEVAL_FUSION
 
-        # Sort by score and return top_k
-        sorted_results = sorted(
-            all_results.values(),
-            key=lambda x: x.score,
-            reverse=True
-        )[:top_k]
+        batch_results = await self._abatch_search(query_variations, top_k, filters)
 
-        # Add rank
-        for i, doc in enumerate(sorted_results):
-            doc.rank = i + 1
+        return self._fuse_results(batch_results, top_k, fusion)
+
+    async def _abatch_search(
+        self,
+        query_variations: List[str],
+        top_k: int,
+        filters: dict = None,
+    ) -> list:
+        """Embed variations and run one async batch search; returns hit lists"""
+        # Embed all variations at once and build the filter once
+        embeddings = await self.aembed_texts(query_variations)
+        query_filter = self._build_filter(filters)
 
-        return sorted_results
+        try:
+            return await self.async_qdrant.search_batch(
+                collection_name=self.collection_name,
+                requests=self._search_requests(embeddings, top_k, query_filter),
+            )
+        except Exception as e:
+            print(f"Error searching with queries {query_variations}: {e}")
+            return []
+
+    @staticmethod
+    def _slot_filters(slots: Slots = None) -> Optional[dict]:
+        """Build filters from slots (and the stock/channel settings)"""
+        filters = {}
+        if slots:
+            if slots.brand:
+                filters["brand"] = slots.brand
+            if slots.color:
+                filters["color"] = slots.color
+            if slots.price_range:
+                price_range = {
+                    bound: slots.price_range.get(bound)
+                    for bound in ("min", "max")
+                    if slots.price_range.get(bound)
+                }
+                if price_range:
+                    filters["price"] = price_range
+        if settings.FILTER_AVAILABLE_ONLY:
+            filters["availability"] = True
+        if settings.SEARCH_CHANNELS:
+            filters["metadata.channel"] = list(settings.SEARCH_CHANNELS)
+        return filters or None
 
     def retrieve(
         self,
@@ -185,34 +478,266 @@ D7A'K {num} F3.G E*A'H* '2 '
         # Generate variations
         variations = self.generate_query_variations(query)
 
-        # Build filters from slots
-        filters = {}
-        if slots:
-            if slots.brand:
-                filters["brand"] = slots.brand
-            if slots.color:
-                filters["color"] = slots.color
-
         # Search
-        results = self.search(variations, filters=filters if filters else None)
+        results = self.search(variations, filters=self._slot_filters(slots))
 
         return results
 
-    def add_product(self, product: Product) -> None:
-        """Add a product to Qdrant collection"""
-        # Generate embedding from product text
-        product_text = f"{product.name} {product.description or ''} {product.brand or ''}"
-        embedding = self.embed_text(product_text)
+    async def aretrieve(
+        self,
+        query: str,
+        intent: IntentType = None,
+        slots: Slots = None,
+        num_variations: int = None,
+        top_k: int = None,
+    ) -> List[RetrievedDocument]:
+        """
+        Async variant of retrieve for use inside the request event loop.
 
-        # Create point
-        point = PointStruct(
+        num_variations/top_k come from the request's retrieval budget
+        (defaults: QUERY_VARIATIONS, RETRIEVAL_TOP_K); one variation means
+        no expansion.
+        """
+        num_variations = num_variations or settings.QUERY_VARIATIONS
+        top_k = top_k or settings.RETRIEVAL_TOP_K
+
+        if self.sparse_index is not None:
+            return await self._aretrieve_hybrid(query, intent, slots, num_variations, top_k)
+
+        return await self._aretrieve_dense(query, intent, slots, num_variations, top_k)
+
+    async def _aretrieve_dense(
+        self,
+        query: str,
+        intent: IntentType,
+        slots: Slots,
+        num_variations: int,
+        top_k: int,
+    ) -> List[RetrievedDocument]:
+        """Dense retrieval (speculative when enabled)"""
+        if settings.SPECULATIVE_RETRIEVAL and self.async_qdrant is not None:
+            return await self._aretrieve_speculative(query, intent, slots, num_variations, top_k)
+
+        with record_latency("retrieval.total"):
+            # Generate variations
+            if num_variations > 1:
+                with record_latency("retrieval.expansion"):
+                    variations = await self.expansion.expand(query, intent, num_variations)
+            else:
+                variations = [query]
+
+            # Search
+            results = await self.asearch(variations, top_k, filters=self._slot_filters(slots))
+
+        return results
+
+    async def _aretrieve_speculative(
+        self,
+        query: str,
+        intent: IntentType = None,
+        slots: Slots = None,
+        num_variations: int = None,
+        top_k: int = None,
+    ) -> List[RetrievedDocument]:
+        """
+        Speculative retrieval.
+
+        The original query (always variation #0) is embedded and searched
+        immediately while query expansion is in flight. Variation
+        results are merged when they arrive; if expansion misses the
+        EXPANSION_DEADLINE_MS deadline it is cancelled and the original
+        query's results are used alone.
+        """
+        num_variations = num_variations or settings.QUERY_VARIATIONS
+        top_k = top_k or settings.RETRIEVAL_TOP_K
+        filters = self._slot_filters(slots)
+        start = time.perf_counter()
+
+        if num_variations <= 1:
+            with record_latency("retrieval.original_search"):
+                batch_results = await self._abatch_search([query], top_k, filters)
+            get_histogram("retrieval.total").observe((time.perf_counter() - start) * 1000)
+            return self._fuse_results(batch_results, top_k, settings.RETRIEVAL_FUSION)
+
+        async def expand() -> List[str]:
+            with record_latency("retrieval.expansion"):
+                return await self.expansion.expand(query, intent, num_variations)
+
+        expansion = asyncio.create_task(expand())
+
+        with record_latency("retrieval.original_search"):
+            batch_results = list(await self._abatch_search([query], top_k, filters))
+
+        remaining = settings.EXPANSION_DEADLINE_MS / 1000 - (time.perf_counter() - start)
+        try:
+            variations = await asyncio.wait_for(expansion, timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            get_histogram("retrieval.expansion_timeout").observe(
+                (time.perf_counter() - start) * 1000
+            )
+            variations = [query]
+
+        extra_variations = [v for v in variations if v != query]
+        if extra_variations:
+            with record_latency("retrieval.variation_search"):
+                batch_results.extend(
+                    await self._abatch_search(extra_variations, top_k, filters)
+                )
+
+        get_histogram("retrieval.total").observe((time.perf_counter() - start) * 1000)
+
+        return self._fuse_results(batch_results, top_k, settings.RETRIEVAL_FUSION)
+
+    async def _aretrieve_hybrid(
+        self,
+        query: str,
+        intent: IntentType,
+        slots: Slots,
+        num_variations: int,
+        top_k: int,
+    ) -> List[RetrievedDocument]:
+        """
+        Hybrid retrieval: BM25 over the sparse index fused (RRF) with dense results.
+
+        Identifier queries (model numbers, SKUs, Latin brands) whose top
+        BM25 hit is unambiguous are answered from the sparse index alone,
+        without running the embedding model.
+        """
+        filters = self._slot_filters(slots)
+        with record_latency("retrieval.sparse"):
+            sparse_hits = self.sparse_index.search(query, top_k)
+
+        if self.sparse_index.is_exact_match(query, sparse_hits):
+            with record_latency("retrieval.sparse_exact"):
+                documents = await self._afetch_products(sparse_hits, filters)
+            if documents:
+                return self._to_dense_scale(documents, [])
+
+        # Sparse payloads are fetched while the dense search runs
+        dense_docs, sparse_docs = await asyncio.gather(
+            self._aretrieve_dense(query, intent, slots, num_variations, top_k),
+            self._afetch_products(sparse_hits, filters),
+        )
+
+        return self._fuse_hybrid(dense_docs, sparse_docs, top_k)
+
+    async def _afetch_products(self, hits, filters: dict = None) -> List[RetrievedDocument]:
+        """Load (product id, score) hits from Qdrant by id, keeping hit order"""
+        if not hits:
+            return []
+
+        ids = [product_id for product_id, _ in hits]
+        try:
+            if self.async_qdrant is not None:
+                points = await self.async_qdrant.retrieve(
+                    collection_name=self.collection_name, ids=ids, with_payload=True
+                )
+            else:
+                points = await run_in_executor(
+                    self.qdrant.retrieve,
+                    collection_name=self.collection_name,
+                    ids=ids,
+                    with_payload=True,
+                )
+        except Exception as e:
+            print(f"Error fetching products {ids}: {e}")
+            return []
+
+        payloads = {str(point.id): point.payload for point in points}
+        documents = []
+        for product_id, score in hits:
+            payload = payloads.get(str(product_id))
+            if payload is None:
+                continue
+            if not self._matches_filters(payload, filters):
+                continue
+            doc = RetrievedDocument(product=Product(**payload), score=score)
+            doc.rank = len(documents) + 1
+            documents.append(doc)
+
+        return documents
+
+    @staticmethod
+    def _fuse_hybrid(
+        dense_docs: List[RetrievedDocument],
+        sparse_docs: List[RetrievedDocument],
+        top_k: int,
+    ) -> List[RetrievedDocument]:
+        """Reciprocal rank fusion of dense and sparse rankings (sparse weighted by SPARSE_WEIGHT)"""
+        dense_scores = [doc.score for doc in dense_docs]
+        fused, documents = {}, {}
+        for weight, ranking in ((1.0, dense_docs), (settings.SPARSE_WEIGHT, sparse_docs)):
+            for rank, doc in enumerate(ranking, 1):
+                documents.setdefault(doc.product.id, doc)
+                fused[doc.product.id] = fused.get(doc.product.id, 0.0) + weight / (settings.RRF_K + rank)
+
+        order = sorted(fused, key=lambda product_id: -fused[product_id])[:top_k]
+
+        results = []
+        for rank, product_id in enumerate(order, 1):
+            doc = documents[product_id]
+            doc.rank = rank
+            results.append(doc)
+
+        return MultiQueryRetriever._to_dense_scale(results, dense_scores)
+
+    @staticmethod
+    def _to_dense_scale(
+        documents: List[RetrievedDocument], dense_scores: List[float]
+    ) -> List[RetrievedDocument]:
+        """
+        Replace BM25/RRF scores of a ranking with scores on the dense
+        (cosine) scale, so score-gap rules downstream (the rerank cascade
+        skip margin) mean the same on every retrieval path. Rank r takes
+        the r-th best dense score; without dense scores every document
+        gets 1.0, so no gap can settle a BM25-only ranking.
+        """
+        scale = sorted(dense_scores, reverse=True)
+        for i, doc in enumerate(documents):
+            doc.score = scale[min(i, len(scale) - 1)] if scale else 1.0
+        return documents
+
+    @staticmethod
+    def _product_point(product: Product, embedding: List[float]) -> PointStruct:
+        """Create a Qdrant point for a product"""
+        return PointStruct(
             id=product.id,
             vector=embedding,
             payload=product.model_dump(mode="json")
         )
 
+    def _index_sparse(self, product: Product) -> None:
+        """Make an added product searchable in this worker's BM25 index (the file is rebuilt by ingestion)"""
+        if self.sparse_index is not None:
+            self.sparse_index.add(product.id, search_text(product))
+
+    def add_product(self, product: Product) -> None:
+        """Add a product to Qdrant collection"""
+        # Compute the search text once; it is stored with the product for reranking
+        product = with_search_text(product)
+        embedding = self.embed_text(search_text(product))
+
+        # Create point
+        point = self._product_point(product, embedding)
+
         # Upsert to collection
         self.qdrant.upsert(
             collection_name=self.collection_name,
             points=[point]
         )
+        self._index_sparse(product)
+
+    async def aadd_product(self, product: Product) -> None:
+        """Async variant of add_product (uses both embedding cache tiers)"""
+        if self.async_qdrant is None:
+            await run_in_executor(self.add_product, product)
+            return
+
+        product = with_search_text(product)
+        embedding = (await self.aembed_texts([search_text(product)]))[0].tolist()
+
+        await self.async_qdrant.upsert(
+            collection_name=self.collection_name,
+            points=[self._product_point(product, embedding)]
+        )
+        self._index_sparse(product)
@@ -0,0 +1,97 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from transformers import AutoTokenizer
+from app.models.schemas import Product
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Keys in Product.metadata (and so in the Qdrant payload)
+SEARCH_TEXT_KEY = "search_text"
+RERANK_TEXT_KEY = "rerank_text"
+SEARCH_TOKEN_IDS_KEY = "search_token_ids"
+
+
+@lru_cache()
+def get_reranker_tokenizer():
+    """Tokenizer of the reranker model (reranker input is cut to its token budget)"""
+    return AutoTokenizer.from_pretrained(settings.RERANKER_MODEL)
+
+
+def build_search_text(product: Product) -> str:
+    """
+    Canonical text of a product for embedding and reranking.
+
+    Name, description and brand, whitespace-normalised, without repeating
+    a part already contained in the previous ones (ingested posts use the
+    first 100 characters of the description as the name).
+    """
+    text = ""
+    for part in (product.name, product.description, product.brand):
+        part = " ".join((part or "").split())
+        if not part:
+            continue
+        if part.startswith(text) and text:
+            text = part
+        elif part not in text:
+            text = f"{text} {part}" if text else part
+    return text
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, List[int]]:
+    """Cut text to max_tokens reranker tokens; returns (text, token ids)"""
+    encoded = get_reranker_tokenizer()(
+        text,
+        add_special_tokens=False,
+        truncation=True,
+        max_length=max_tokens,
+        return_offsets_mapping=True,
+    )
+    offsets = encoded["offset_mapping"]
+    if offsets:
+        text = text[:offsets[-1][1]]
+    return text, list(encoded["input_ids"])
+
+
+def with_search_text(product: Product) -> Product:
+    """
+    Return a copy of the product with its search text stored in metadata,
+    computed once at ingestion. The full text is embedded; with
+    SEARCH_TEXT_MAX_TOKENS the cross-encoder input is cut to that many
+    reranker tokens (stored separately when shorter), and
+    SEARCH_TEXT_TOKEN_IDS keeps the ids.
+    """
+    text = build_search_text(product)
+    metadata = dict(product.metadata or {})
+    metadata.pop(RERANK_TEXT_KEY, None)
+    token_ids: Optional[List[int]] = None
+
+    if settings.SEARCH_TEXT_MAX_TOKENS:
+        rerank_input, token_ids = truncate_to_tokens(text, settings.SEARCH_TEXT_MAX_TOKENS)
+        if rerank_input != text:
+            metadata[RERANK_TEXT_KEY] = rerank_input
+
+    metadata[SEARCH_TEXT_KEY] = text
+    if settings.SEARCH_TEXT_TOKEN_IDS and token_ids is not None:
+        metadata[SEARCH_TOKEN_IDS_KEY] = token_ids
+    else:
+        metadata.pop(SEARCH_TOKEN_IDS_KEY, None)
+
+    return product.model_copy(update={"metadata": metadata})
+
+
+def search_text(product: Product) -> str:
+    """Stored search text, or computed on the fly for products ingested before it existed"""
+    stored = (product.metadata or {}).get(SEARCH_TEXT_KEY)
+    return stored if stored else build_search_text(product)
+
+
+def rerank_text(product: Product) -> str:
+    """Cross-encoder input: the search text cut to SEARCH_TEXT_MAX_TOKENS at ingestion"""
+    stored = (product.metadata or {}).get(RERANK_TEXT_KEY)
+    return stored if stored else search_text(product)
+
+
+def search_token_ids(product: Product) -> Optional[List[int]]:
+    """Stored reranker token ids of the search text, if ingested with them"""
+    return (product.metadata or {}).get(SEARCH_TOKEN_IDS_KEY)
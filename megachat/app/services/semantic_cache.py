@@ -0,0 +1,189 @@
+import json
+import struct
+from typing import Optional, Any, Dict, List, Tuple
+import numpy as np
+from app.models.schemas import IntentType, Slots
+from app.services.cache import CacheService
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+class SemanticCache:
+    """
+    Semantic response cache keyed by query embedding similarity.
+
+    Lookup order:
+    1. Exact match on the canonical query text (Redis)
+    2. Nearest previously answered query with cosine similarity above
+       the threshold AND the same intent and slots, whose response is
+       still cached in Redis
+
+    Embeddings of answered queries live in an in-process ring-buffer
+    matrix (brute-force dot product); they are also appended to a capped
+    Redis list so new workers warm up from what others have answered.
+    """
+
+    INDEX_KEY = "semantic:index"
+    CANDIDATES = 5
+
+    def __init__(
+        self,
+        cache_service: CacheService,
+        max_size: int = None,
+        threshold: float = None,
+    ):
+        self.cache_service = cache_service
+        self.max_size = max_size or settings.SEMANTIC_CACHE_SIZE
+        self.threshold = threshold or settings.SEMANTIC_CACHE_THRESHOLD
+
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[Tuple[str, str]]] = [None] * self.max_size
+        self._positions: Dict[str, int] = {}
+        self._next = 0
+        self._count = 0
+        self._warmed = False
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def guard_key(intent: IntentType, slots: Slots = None) -> str:
+        """Intent + slots signature that a semantic hit must match exactly"""
+        slot_values = slots.model_dump(mode="json", exclude_none=True) if slots else {}
+        return json.dumps(
+            {"intent": getattr(intent, "value", intent), "slots": slot_values},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _add_local(self, query: str, vector: np.ndarray, guard: str) -> None:
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+        row = self._positions.get(query)
+        if row is None:
+            row = self._next
+            self._next = (self._next + 1) % self.max_size
+            evicted = self._entries[row]
+            if evicted is not None:
+                self._positions.pop(evicted[0], None)
+            self._count = min(self._count + 1, self.max_size)
+
+        self._matrix[row] = vector
+        self._entries[row] = (query, guard)
+        self._positions[query] = row
+
+    @staticmethod
+    def _pack(query: str, guard: str, vector: np.ndarray) -> bytes:
+        header = json.dumps({"query": query, "guard": guard}, ensure_ascii=False).encode("utf-8")
+        return _HEADER_LENGTH.pack(len(header)) + header + vector.astype("<f4").tobytes()
+
+    @staticmethod
+    def _unpack(data: bytes) -> Tuple[str, str, np.ndarray]:
+        (length,) = _HEADER_LENGTH.unpack_from(data)
+        offset = _HEADER_LENGTH.size
+        header = json.loads(data[offset:offset + length])
+        vector = np.frombuffer(data, dtype="<f4", offset=offset + length)
+        return header["query"], header["guard"], vector
+
+    async def _warm(self) -> None:
+        """Load answered queries recorded by other workers (once)"""
+        if self._warmed or self.cache_service.binary_redis is None:
+            return
+        self._warmed = True
+
+        try:
+            items = await self.cache_service.binary_redis.lrange(
+                self.INDEX_KEY, 0, self.max_size - 1
+            )
+        except Exception as e:
+            print(f"Error loading semantic cache index: {e}")
+            return
+
+        # Oldest first, so the newest entries survive ring-buffer eviction
+        for item in reversed(items):
+            try:
+                query, guard, vector = self._unpack(item)
+            except Exception:
+                continue
+            self._add_local(query, vector, guard)
+
+    async def get_exact(self, query: str) -> Optional[str]:
+        """Exact lookup on the canonical query"""
+        response = await self.cache_service.get_cached_response(query)
+        if response:
+            self.exact_hits += 1
+        return response
+
+    async def get_similar(
+        self,
+        embedding: np.ndarray,
+        intent: IntentType,
+        slots: Slots = None,
+    ) -> Optional[str]:
+        """Nearest-neighbour lookup over previously answered queries"""
+        await self._warm()
+
+        if self._count:
+            guard = self.guard_key(intent, slots)
+            scores = self._matrix[:self._count] @ self._normalize(embedding)
+            candidates = np.argsort(-scores)[:self.CANDIDATES]
+
+            for row in candidates:
+                if scores[row] < self.threshold:
+                    break
+                query, entry_guard = self._entries[row]
+                if entry_guard != guard:
+                    continue
+                response = await self.cache_service.get_cached_response(query)
+                if response:
+                    self.semantic_hits += 1
+                    return response
+
+        self.misses += 1
+        return None
+
+    async def add(
+        self,
+        query: str,
+        embedding: np.ndarray,
+        intent: IntentType,
+        slots: Slots,
+        response: str,
+    ) -> None:
+        """Cache a response under the canonical query and index its embedding"""
+        await self.cache_service.set_cached_response(query, response)
+
+        guard = self.guard_key(intent, slots)
+        vector = self._normalize(embedding)
+        self._add_local(query, vector, guard)
+
+        if self.cache_service.binary_redis is not None:
+            try:
+                async with self.cache_service.binary_redis.pipeline(transaction=False) as pipe:
+                    pipe.lpush(self.INDEX_KEY, self._pack(query, guard, vector))
+                    pipe.ltrim(self.INDEX_KEY, 0, self.max_size - 1)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Error recording semantic cache entry: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters per lookup stage"""
+        lookups = max(self.exact_hits + self.semantic_hits + self.misses, 1)
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3),
+            "indexed_queries": self._count,
+        }
@@ -0,0 +1,242 @@
+import math
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.services.preprocessor import PersianPreprocessor, canonicalize
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring over Hazm-tokenised product text.
+
+    Built by scripts/ingest_data.py and persisted as a single .npz file
+    in CSR layout (term offsets into flat posting arrays of document
+    indices and term frequencies), so loading is a few array reads and
+    a query touches only the postings of its own terms.
+
+    Documents added after a build (products added through the API) are
+    searchable right away: they are scored alongside the CSR arrays,
+    replacing built documents with the same id, until the next build().
+    """
+
+    def __init__(self, k1: float = None, b: float = None):
+        self.k1 = k1 or settings.BM25_K1
+        self.b = b if b is not None else settings.BM25_B
+        self.preprocessor = PersianPreprocessor()
+
+        self.doc_ids: List[str] = []
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.vocabulary: Dict[str, int] = {}
+        self.term_offsets = np.zeros(1, dtype=np.int64)
+        self.posting_docs = np.zeros(0, dtype=np.int32)
+        self.posting_tfs = np.zeros(0, dtype=np.float32)
+
+        # Documents added since the last build (product id -> term counts)
+        self._pending: Dict[str, Counter] = {}
+        self._positions: Optional[Dict[str, int]] = None
+
+    def tokenize(self, text: str) -> List[str]:
+        """Hazm tokens, canonicalised, without punctuation/emoji-only tokens"""
+        terms = []
+        for token in self.preprocessor.tokenize(text):
+            term = canonicalize(token)
+            if term and any(char.isalnum() for char in term):
+                terms.extend(term.split())
+        return terms
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def average_length(self) -> float:
+        return float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+
+    def add(self, product_id: str, text: str) -> None:
+        """Queue a document for the next build (re-adding an id replaces it); searchable at once"""
+        self._pending[product_id] = Counter(self.tokenize(text))
+
+    def _position(self, product_id: str) -> Optional[int]:
+        if self._positions is None:
+            self._positions = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        return self._positions.get(product_id)
+
+    def build(self) -> None:
+        """Merge queued documents into the CSR arrays"""
+        if not self._pending:
+            return
+
+        # Existing documents, minus those being replaced
+        documents: Dict[str, Counter] = {}
+        terms = list(self.vocabulary)
+        for term_id, term in enumerate(terms):
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            for doc, tf in zip(self.posting_docs[start:end], self.posting_tfs[start:end]):
+                doc_id = self.doc_ids[doc]
+                if doc_id not in self._pending:
+                    documents.setdefault(doc_id, Counter())[term] = int(tf)
+        for doc_id in self.doc_ids:
+            if doc_id not in self._pending:
+                documents.setdefault(doc_id, Counter())
+        documents.update(self._pending)
+        self._pending = {}
+
+        self.doc_ids = list(documents)
+        self._positions = None
+        self.doc_lengths = np.asarray(
+            [sum(counts.values()) for counts in documents.values()], dtype=np.float32
+        )
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc, counts in enumerate(documents.values()):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        self.vocabulary = {term: i for i, term in enumerate(sorted(postings))}
+        offsets = [0]
+        docs, tfs = [], []
+        for term in self.vocabulary:
+            for doc, tf in postings[term]:
+                docs.append(doc)
+                tfs.append(tf)
+            offsets.append(len(docs))
+
+        self.term_offsets = np.asarray(offsets, dtype=np.int64)
+        self.posting_docs = np.asarray(docs, dtype=np.int32)
+        self.posting_tfs = np.asarray(tfs, dtype=np.float32)
+
+    def search(self, query: str, top_k: int = None) -> List[Tuple[str, float]]:
+        """Top documents as (product id, BM25 score), including documents added since the build"""
+        top_k = top_k or settings.RETRIEVAL_TOP_K
+        terms = set(self.tokenize(query))
+        # Snapshot: the API may add documents concurrently
+        pending = list(self._pending.items())
+        if not terms or not (self.doc_ids or pending):
+            return []
+
+        built = len(self.doc_ids)
+        replaced = np.asarray(
+            [row for row in (self._position(doc_id) for doc_id, _ in pending) if row is not None],
+            dtype=np.int64,
+        )
+        pending_lengths = np.asarray([sum(counts.values()) for _, counts in pending], dtype=np.float32)
+        lengths = np.concatenate([self.doc_lengths, pending_lengths])
+
+        total = built - len(replaced) + len(pending)
+        average = (float(lengths.sum()) - float(self.doc_lengths[replaced].sum())) / max(total, 1)
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / max(average, 1e-9))
+        scores = np.zeros(built + len(pending), dtype=np.float32)
+
+        for term in terms:
+            docs, tfs = self.posting_docs[:0], self.posting_tfs[:0]
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+                docs, tfs = self.posting_docs[start:end], self.posting_tfs[start:end]
+            frequency = len(docs) - int(np.isin(docs, replaced).sum()) if len(replaced) else len(docs)
+            if pending:
+                added = [(built + i, counts[term]) for i, (_, counts) in enumerate(pending) if term in counts]
+                if added:
+                    docs = np.concatenate([docs, np.asarray([doc for doc, _ in added], dtype=docs.dtype)])
+                    tfs = np.concatenate([tfs, np.asarray([tf for _, tf in added], dtype=tfs.dtype)])
+                    frequency += len(added)
+            if not len(docs):
+                continue
+            idf = math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[docs])
+
+        # Built versions of re-added documents are superseded
+        scores[replaced] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        doc_ids = self.doc_ids + [doc_id for doc_id, _ in pending] if pending else self.doc_ids
+        return [(doc_ids[i], float(scores[i])) for i in candidates]
+
+    def contains_terms(self, product_id: str, terms: List[str]) -> bool:
+        """Whether a document contains every given term"""
+        counts = self._pending.get(product_id)
+        if counts is not None:
+            return all(term in counts for term in terms)
+
+        doc = self._position(product_id)
+        if doc is None:
+            return False
+
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                return False
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            if doc not in self.posting_docs[start:end]:
+                return False
+        return True
+
+    @staticmethod
+    def identifier_terms(terms: List[str]) -> List[str]:
+        """Model numbers, SKUs and Latin brand names among query terms"""
+        return [term for term in terms if any(char.isascii() and char.isalnum() for char in term)]
+
+    def is_exact_match(self, query: str, hits: List[Tuple[str, float]]) -> bool:
+        """
+        Whether sparse results alone answer the query: it contains
+        identifier-like terms, the top document contains all of them, and
+        it clearly outscores the runner-up (SPARSE_EXACT_MARGIN).
+        """
+        if not hits:
+            return False
+
+        identifiers = self.identifier_terms(set(self.tokenize(query)))
+        if not identifiers or not self.contains_terms(hits[0][0], identifiers):
+            return False
+
+        return len(hits) == 1 or hits[0][1] >= settings.SPARSE_EXACT_MARGIN * hits[1][1]
+
+    def save(self, path: str = None) -> None:
+        """Persist the index as a single .npz file"""
+        self.build()
+        path = Path(path or settings.SPARSE_INDEX_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            doc_ids=np.asarray(self.doc_ids, dtype=str),
+            doc_lengths=self.doc_lengths,
+            terms=np.asarray(list(self.vocabulary), dtype=str),
+            term_offsets=self.term_offsets,
+            posting_docs=self.posting_docs,
+            posting_tfs=self.posting_tfs,
+            params=np.asarray([self.k1, self.b], dtype=np.float64),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = None) -> "BM25Index":
+        """Load an index written by save()"""
+        with np.load(path or settings.SPARSE_INDEX_PATH, allow_pickle=False) as data:
+            k1, b = data["params"]
+            index = cls(k1=float(k1), b=float(b))
+            index.doc_ids = data["doc_ids"].tolist()
+            index.doc_lengths = data["doc_lengths"]
+            index.vocabulary = {term: i for i, term in enumerate(data["terms"].tolist())}
+            index.term_offsets = data["term_offsets"]
+            index.posting_docs = data["posting_docs"]
+            index.posting_tfs = data["posting_tfs"]
+        return index
+
+
+def load_sparse_index() -> Optional[BM25Index]:
+    """The persisted BM25 index, or None when hybrid retrieval is off or no index was built"""
+    if not settings.HYBRID_RETRIEVAL:
+        return None
+    if not Path(settings.SPARSE_INDEX_PATH).exists():
+        print(f"Sparse index not found at {settings.SPARSE_INDEX_PATH}; dense retrieval only")
+        return None
+    return BM25Index.load()
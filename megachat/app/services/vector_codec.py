@@ -0,0 +1,94 @@
+import json
+import struct
+from typing import Optional
+import numpy as np
+
+# Bumped whenever the on-wire layout changes; part of the Redis key prefix
+CODEC_VERSION = 2
+
+# Four-byte header (tag + padding) in front of every encoded vector, so the
+# float32 payload stays 4-byte aligned for zero-copy decoding
+_HEADER_SIZE = 4
+_TAGS = {
+    "float32": b"f\x00\x00\x00",
+    "float16": b"h\x00\x00\x00",
+    "int8": b"q\x00\x00\x00",
+}
+_CODECS = {tag: name for name, tag in _TAGS.items()}
+_SCALE = struct.Struct("<f")
+
+
+def encode_vector(vector: np.ndarray, codec: str = "float32") -> bytes:
+    """
+    Encode a vector as compact bytes.
+
+    Layouts (after the header):
+    - float32: raw little-endian float32
+    - float16: raw little-endian float16 (half the size, ~1e-3 error)
+    - int8:    float32 scale + int8 values, symmetric quantisation
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+
+    if codec == "float32":
+        payload = vector.astype("<f4", copy=False).tobytes()
+    elif codec == "float16":
+        payload = vector.astype("<f2").tobytes()
+    elif codec == "int8":
+        max_abs = float(np.max(np.abs(vector))) if vector.size else 0.0
+        scale = max_abs / 127.0 if max_abs > 0 else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        payload = _SCALE.pack(scale) + quantized.tobytes()
+    else:
+        raise ValueError(f"Unknown vector codec: {codec}")
+
+    return _TAGS[codec] + payload
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """
+    Decode bytes produced by encode_vector.
+
+    float32/float16 are zero-copy read-only views over the buffer; int8 is
+    dequantised into a new float32 array.
+    """
+    codec = _CODECS.get(data[:_HEADER_SIZE])
+
+    if codec == "float32":
+        return np.frombuffer(data, dtype="<f4", offset=_HEADER_SIZE)
+    if codec == "float16":
+        return np.frombuffer(data, dtype="<f2", offset=_HEADER_SIZE)
+    if codec == "int8":
+        (scale,) = _SCALE.unpack_from(data, _HEADER_SIZE)
+        quantized = np.frombuffer(data, dtype=np.int8, offset=_HEADER_SIZE + _SCALE.size)
+        return quantized.astype(np.float32) * np.float32(scale)
+
+    raise ValueError("Unknown vector encoding tag")
+
+
+def decode_legacy_vector(data: bytes, dim: int = None) -> Optional[np.ndarray]:
+    """
+    Decode pre-versioned cache entries (JSON text or untagged raw float32).
+
+    With dim, anything that does not decode to a vector of that many
+    values is rejected (None), so stray bytes never reach the model's
+    embedding matrix.
+    """
+    if not data:
+        return None
+
+    vector = None
+    if data[:1] == b"[":
+        # Raw float32 bytes can start with "[" too; fall back to them
+        try:
+            vector = np.asarray(json.loads(data), dtype=np.float32)
+        except (ValueError, TypeError):
+            pass
+
+    if vector is None or not _has_dim(vector, dim):
+        vector = np.frombuffer(data, dtype=np.float32) if len(data) % 4 == 0 else None
+
+    return vector if vector is not None and _has_dim(vector, dim) else None
+
+
+def _has_dim(vector: np.ndarray, dim: Optional[int]) -> bool:
+    return vector.ndim == 1 and vector.size > 0 and (dim is None or vector.size == dim)
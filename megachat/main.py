@@ -5,6 +5,9 @@ from contextlib import asynccontextmanager
 
 from app.api.routes import router
 from app.core.config import get_settings
+from app.core.connections import init_connections, close_connections
+from app.core.executor import shutdown_executor
+from app.core.registry import init_registry
 
 settings = get_settings()
 
@@ -23,9 +26,26 @@ async def lifespan(app: FastAPI):
     print(f"= Embedding Model: {settings.EMBEDDING_MODEL}")
     print(f"= Reranker Model: {settings.RERANKER_MODEL}")
 
+    # Open pooled Redis/Qdrant connections shared by all requests
+    connections = init_connections()
+
+    # Load models and compile the pipeline once per worker
+    registry = init_registry(
+        connections.redis,
+        connections.qdrant,
+        connections.async_qdrant,
+        connections.redis_binary,
+    )
+    connections.on_qdrant_reconnect(registry.rebind_qdrant)
+    for name, stats in registry.stats.items():
+        print(f"   Loaded {name} in {stats.load_seconds:.2f}s (+{stats.rss_delta_mb:.0f} MB RSS)")
+
     yield
 
     # Shutdown
+    await registry.pipeline.reranker.batcher.close()
+    await close_connections()
+    shutdown_executor()
     print("=K Shutting down MegaChat API...")
 
 
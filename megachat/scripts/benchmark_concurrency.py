@@ -0,0 +1,121 @@
+"""
+Concurrency benchmark for the retrieval path (retrieve + rerank).
+
+Runs the same queries concurrently in two modes and reports per-worker
+throughput and latency:
+    blocking - sync retrieve/rerank called directly on the event loop (old path)
+    async    - aretrieve/arerank (async Qdrant client, inference executor, ainvoke)
+
+Usage:
+    python scripts/benchmark_concurrency.py --requests 64 --concurrency 16
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.connections import create_qdrant_client, create_async_qdrant_client
+from app.core.executor import shutdown_executor
+from app.core.registry import ModelRegistry
+from app.services.preprocessor import PersianPreprocessor
+from app.services.retriever import MultiQueryRetriever
+from app.services.reranker import RerankerService
+
+
+def load_queries(qa_path: Path, limit: int) -> list:
+    """Load customer questions from question_answers.json"""
+    with open(qa_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    preprocessor = PersianPreprocessor()
+    queries = []
+    for items in data.values():
+        for item in items:
+            queries.append(preprocessor.preprocess(item["question"]))
+    return queries[:limit]
+
+
+async def run_mode(mode: str, retriever, reranker, queries: list, concurrency: int) -> dict:
+    """Run all queries with bounded concurrency and collect latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query: str):
+        async with semaphore:
+            start = time.perf_counter()
+            if mode == "blocking":
+                docs = retriever.retrieve(query)
+                reranker.rerank(query, docs)
+            else:
+                docs = await retriever.aretrieve(query)
+                await reranker.arerank(query, docs)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": len(queries),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(queries) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+async def main_async(args):
+    registry = ModelRegistry()
+    registry.load_models()
+
+    async_qdrant = create_async_qdrant_client()
+    retriever = MultiQueryRetriever(
+        create_qdrant_client(),
+        embedding_model=registry.models["embedding_model"],
+        llm=registry.models["expansion_llm"],
+        async_qdrant_client=async_qdrant,
+    )
+    reranker = RerankerService(model=registry.models["reranker_model"])
+
+    queries = load_queries(Path(args.qa), args.requests)
+    print(f"Benchmarking {len(queries)} queries with concurrency {args.concurrency}\n")
+
+    results = []
+    for mode in ("blocking", "async"):
+        results.append(await run_mode(mode, retriever, reranker, queries, args.concurrency))
+
+    print(f"{'mode':<10} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+    for r in results:
+        print(
+            f"{r['mode']:<10} {r['throughput_rps']:>8.2f} {r['p50_ms']:>9.0f} "
+            f"{r['p95_ms']:>9.0f} {r['elapsed_s']:>9.1f}"
+        )
+
+    speedup = results[1]["throughput_rps"] / results[0]["throughput_rps"]
+    print(f"\nAsync throughput: {speedup:.2f}x blocking")
+
+    await async_qdrant.close()
+    shutdown_executor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs async retrieval concurrency")
+    parser.add_argument("--qa", type=str, default="../dataset/question_answers.json")
+    parser.add_argument("--requests", type=int, default=64, help="Number of queries to run")
+    parser.add_argument("--concurrency", type=int, default=16, help="In-flight requests")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark Redis embedding encodings: JSON text vs the binary codecs.
+
+For each encoding, writes sample vectors to Redis and reports average
+memory per key (MEMORY USAGE), decode latency, and reconstruction error.
+
+Usage:
+    python scripts/benchmark_embedding_codec.py --keys 1000 --dim 1024
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import numpy as np
+from redis.asyncio import Redis
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import get_settings
+from app.services.vector_codec import encode_vector, decode_vector
+
+settings = get_settings()
+
+ENCODINGS = ["json", "float32", "float16", "int8"]
+
+
+def encode(vector: np.ndarray, encoding: str) -> bytes:
+    if encoding == "json":
+        return json.dumps(vector.tolist()).encode("utf-8")
+    return encode_vector(vector, encoding)
+
+
+def decode(data: bytes, encoding: str) -> np.ndarray:
+    if encoding == "json":
+        return np.asarray(json.loads(data), dtype=np.float32)
+    return decode_vector(data)
+
+
+async def benchmark(encoding: str, vectors: np.ndarray, redis: Redis) -> dict:
+    prefix = f"bench:embedding:{encoding}"
+    payloads = [encode(vector, encoding) for vector in vectors]
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for i, payload in enumerate(payloads):
+            pipe.set(f"{prefix}:{i}", payload)
+        await pipe.execute()
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for i in range(len(payloads)):
+            pipe.memory_usage(f"{prefix}:{i}")
+        memory = await pipe.execute()
+
+    stored = await redis.mget([f"{prefix}:{i}" for i in range(len(payloads))])
+
+    start = time.perf_counter()
+    decoded = [decode(value, encoding) for value in stored]
+    decode_us = (time.perf_counter() - start) / len(stored) * 1e6
+
+    error = max(
+        float(np.max(np.abs(d.astype(np.float32) - v))) for d, v in zip(decoded, vectors)
+    )
+
+    await redis.delete(*[f"{prefix}:{i}" for i in range(len(payloads))])
+
+    return {
+        "encoding": encoding,
+        "value_bytes": sum(len(p) for p in payloads) / len(payloads),
+        "memory_bytes": sum(memory) / len(memory),
+        "decode_us": decode_us,
+        "max_abs_error": error,
+    }
+
+
+async def main_async(args):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.keys, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    redis = Redis.from_url(settings.redis_url)
+    results = [await benchmark(encoding, vectors, redis) for encoding in ENCODINGS]
+    await redis.close()
+
+    print(f"{args.keys} vectors x {args.dim} dims\n")
+    print(f"{'encoding':<10} {'value B':>9} {'redis B/key':>12} {'decode us':>10} {'max err':>10}")
+    for r in results:
+        print(
+            f"{r['encoding']:<10} {r['value_bytes']:>9.0f} {r['memory_bytes']:>12.0f} "
+            f"{r['decode_us']:>10.1f} {r['max_abs_error']:>10.2e}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding cache encodings")
+    parser.add_argument("--keys", type=int, default=1000, help="Number of vectors")
+    parser.add_argument("--dim", type=int, default=1024, help="Embedding dimension")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Latency benchmark for slot filters pushed down to Qdrant.
+
+Fills two scratch collections with the same synthetic products (random
+unit vectors, payloads with price, availability, brand and channel), one
+with the payload indexes the retriever creates and one without, then runs
+the same queries with each filter and reports:
+    pushdown  - filtered search on the indexed / unindexed collection
+    post      - unfiltered search for top_k * --overfetch, filtered in Python
+                (the old retrieve-then-discard behaviour); "kept" is the mean
+                number of results left out of top_k
+
+Usage:
+    python scripts/benchmark_filtered_search.py --points 200000
+    python scripts/benchmark_filtered_search.py --points 50000 --queries 200 --keep
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from qdrant_client.models import Distance, VectorParams, PointStruct
+from app.core.config import get_settings
+from app.core.dependencies import get_qdrant
+from app.services.retriever import MultiQueryRetriever, PAYLOAD_INDEXES
+
+settings = get_settings()
+
+BRANDS = ["samsung", "xiaomi", "apple", "huawei", "lg", "sony", "nokia", "asus"]
+CHANNELS = [f"channel_{i}" for i in range(20)]
+
+FILTERS = {
+    "none": None,
+    "brand": {"brand": "samsung"},
+    "price": {"price": {"min": 5_000_000, "max": 20_000_000}},
+    "channel": {"metadata.channel": CHANNELS[:3]},
+    "in_stock": {"availability": True},
+    "combined": {
+        "brand": "xiaomi",
+        "price": {"max": 15_000_000},
+        "availability": True,
+    },
+}
+
+
+def random_vectors(rng, count: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def random_payload(rng) -> dict:
+    # About a third of ingested posts have no parsed price (stored as 0)
+    price = 0 if rng.random() < 0.3 else int(rng.integers(1, 100)) * 500_000
+    return {
+        "price": price,
+        "availability": bool(rng.random() < 0.8),
+        "brand": BRANDS[rng.integers(len(BRANDS))],
+        "metadata": {"channel": CHANNELS[rng.integers(len(CHANNELS))]},
+    }
+
+
+def fill_collection(client, name: str, args, indexed: bool) -> None:
+    """Recreate a collection with --points synthetic products"""
+    client.recreate_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE),
+    )
+    if indexed:
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            client.create_payload_index(collection_name=name, field_name=field_name, field_schema=schema)
+
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    for offset in range(0, args.points, args.batch_size):
+        count = min(args.batch_size, args.points - offset)
+        vectors = random_vectors(rng, count, args.dim)
+        client.upsert(
+            collection_name=name,
+            points=[
+                PointStruct(id=offset + i, vector=vectors[i].tolist(), payload=random_payload(rng))
+                for i in range(count)
+            ],
+            wait=True,
+        )
+    print(f"  {name}: {args.points} points in {time.perf_counter() - start:.1f}s")
+
+
+def timed_search(client, name: str, queries: np.ndarray, limit: int, query_filter) -> tuple:
+    latencies, results = [], []
+    for vector in queries:
+        start = time.perf_counter()
+        hits = client.search(
+            collection_name=name,
+            query_vector=vector.tolist(),
+            query_filter=query_filter,
+            limit=limit,
+            with_payload=True,
+        )
+        latencies.append(time.perf_counter() - start)
+        results.append(hits)
+    return latencies, results
+
+
+def summarize(latencies: list) -> tuple:
+    latencies = sorted(latencies)
+    return (
+        statistics.median(latencies) * 1000,
+        latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark filtered search with and without payload indexes")
+    parser.add_argument("--points", type=int, default=100_000, help="Synthetic products per collection")
+    parser.add_argument("--dim", type=int, default=1024, help="Vector size (multilingual-e5-large: 1024)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=settings.RETRIEVAL_TOP_K)
+    parser.add_argument("--overfetch", type=int, default=5, help="Post-filter baseline fetches top_k * this")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Points per upsert")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections")
+    args = parser.parse_args()
+
+    client = get_qdrant()
+    collections = {
+        "indexed": f"{settings.QDRANT_COLLECTION_NAME}_bench_indexed",
+        "unindexed": f"{settings.QDRANT_COLLECTION_NAME}_bench_unindexed",
+    }
+
+    print("Filling collections...")
+    for kind, name in collections.items():
+        fill_collection(client, name, args, indexed=kind == "indexed")
+
+    queries = random_vectors(np.random.default_rng(args.seed + 1), args.queries, args.dim)
+
+    print(
+        f"\n{'filter':<10} {'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'kept':>6}"
+    )
+    for filter_name, filters in FILTERS.items():
+        query_filter = MultiQueryRetriever._build_filter(filters)
+
+        for kind, name in collections.items():
+            latencies, results = timed_search(client, name, queries, args.top_k, query_filter)
+            p50, p95 = summarize(latencies)
+            kept = statistics.mean(len(hits) for hits in results)
+            print(f"{filter_name:<10} {kind:<10} {p50:>8.1f} {p95:>8.1f} {kept:>6.1f}")
+
+        latencies, results = timed_search(
+            client, collections["indexed"], queries, args.top_k * args.overfetch, None
+        )
+        p50, p95 = summarize(latencies)
+        kept = statistics.mean(
+            len([h for h in hits if MultiQueryRetriever._matches_filters(h.payload, filters)][:args.top_k])
+            for hits in results
+        )
+        print(f"{filter_name:<10} {'post':<10} {p50:>8.1f} {p95:>8.1f} {kept:>6.1f}")
+
+    if not args.keep:
+        for name in collections.values():
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
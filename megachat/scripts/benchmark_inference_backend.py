@@ -0,0 +1,161 @@
+"""
+Accuracy/latency comparison of inference backends on the product corpus.
+
+Embeds product posts and customer questions with each backend, then
+reranks every question's top retrieved products, and reports against the
+PyTorch reference:
+    embedder - docs/s, mean cosine to reference vectors, recall@k overlap
+               of nearest products
+    reranker - pairs/s, mean absolute score difference, top-n agreement
+
+Backends:
+    torch      - SentenceTransformer / CrossEncoder (reference)
+    onnx_fp32  - exported ONNX model, full precision
+    onnx_int8  - exported ONNX model, dynamic int8 quantisation
+
+Usage:
+    python scripts/benchmark_inference_backend.py --dataset ../dataset/sampled_posts
+    python scripts/benchmark_inference_backend.py --docs 500 --queries 100 --backends torch onnx_int8
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sentence_transformers import SentenceTransformer, CrossEncoder
+from app.core.config import get_settings
+from app.core.registry import current_rss_mb
+
+settings = get_settings()
+
+
+def load_corpus(dataset_dir: Path, limit: int) -> list:
+    """Post texts from every channel file"""
+    texts = []
+    for json_file in sorted(dataset_dir.glob("*.json")):
+        with open(json_file, "r", encoding="utf-8") as f:
+            texts.extend(post["text"] for post in json.load(f) if post.get("text"))
+    return texts[:limit]
+
+
+def load_queries(qa_path: Path, limit: int) -> list:
+    with open(qa_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [item["question"] for items in data.values() for item in items][:limit]
+
+
+def load_backend(name: str):
+    """(embedder, reranker) for a backend name"""
+    if name == "torch":
+        return SentenceTransformer(settings.EMBEDDING_MODEL), CrossEncoder(settings.RERANKER_MODEL)
+
+    from app.core.onnx_backend import OnnxEmbedder, OnnxCrossEncoder
+
+    quantize = name == "onnx_int8"
+    return (
+        OnnxEmbedder(settings.EMBEDDING_MODEL, quantize=quantize),
+        OnnxCrossEncoder(settings.RERANKER_MODEL, quantize=quantize),
+    )
+
+
+def embed(model, texts: list, batch_size: int):
+    prefixed = [f"query: {text}" for text in texts]
+    start = time.perf_counter()
+    embeddings = model.encode(prefixed, batch_size=batch_size, convert_to_numpy=True)
+    elapsed = time.perf_counter() - start
+    return np.asarray(embeddings, dtype=np.float32), len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare torch and ONNX inference backends")
+    parser.add_argument("--dataset", type=str, default="../dataset/sampled_posts")
+    parser.add_argument("--qa", type=str, default="../dataset/question_answers.json")
+    parser.add_argument("--docs", type=int, default=1000, help="Products to embed")
+    parser.add_argument("--queries", type=int, default=100, help="Questions to retrieve/rerank")
+    parser.add_argument("--top-k", type=int, default=settings.RETRIEVAL_TOP_K, help="Products reranked per question")
+    parser.add_argument("--top-n", type=int, default=settings.RERANK_TOP_K, help="Reranked products compared")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx_fp32", "onnx_int8"])
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.dataset), args.docs)
+    queries = load_queries(Path(args.qa), args.queries)
+    print(f"Corpus: {len(corpus)} products, {len(queries)} questions\n")
+
+    reference = None
+    results = []
+
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        rss_before = current_rss_mb()
+        embedder, reranker = load_backend(name)
+        rss_mb = current_rss_mb() - rss_before
+
+        doc_vectors, docs_per_s = embed(embedder, corpus, args.batch_size)
+        query_vectors, _ = embed(embedder, queries, args.batch_size)
+
+        top_k_docs = np.argsort(-(query_vectors @ doc_vectors.T), axis=1)[:, :args.top_k]
+
+        if reference is None:
+            # Candidate products come from the reference embeddings for every backend
+            pairs = [
+                [query, corpus[j]]
+                for query, row in zip(queries, top_k_docs)
+                for j in row
+            ]
+
+        start = time.perf_counter()
+        scores = np.asarray(reranker.predict(pairs, batch_size=args.batch_size), dtype=np.float32)
+        pairs_per_s = len(pairs) / (time.perf_counter() - start)
+        scores = scores.reshape(len(queries), -1)
+        top_n = np.argsort(-scores, axis=1)[:, :args.top_n]
+
+        if reference is None:
+            reference = {"docs": doc_vectors, "top_k": top_k_docs, "scores": scores, "top_n": top_n}
+
+        cosine = float(np.mean(np.sum(doc_vectors * reference["docs"], axis=1)))
+        recall = np.mean([
+            len(set(a) & set(b)) / args.top_k for a, b in zip(top_k_docs, reference["top_k"])
+        ])
+        agreement = np.mean([
+            len(set(a) & set(b)) / args.top_n for a, b in zip(top_n, reference["top_n"])
+        ])
+
+        results.append({
+            "backend": name,
+            "rss_mb": rss_mb,
+            "docs_per_s": docs_per_s,
+            "cosine": cosine,
+            "recall": recall,
+            "pairs_per_s": pairs_per_s,
+            "score_diff": float(np.mean(np.abs(scores - reference["scores"]))),
+            "agreement": agreement,
+        })
+
+        del embedder, reranker
+
+    print(
+        f"{'backend':<10} {'+RSS MB':>8} {'docs/s':>8} {'cosine':>8} {f'recall@{args.top_k}':>10} "
+        f"{'pairs/s':>8} {'|dscore|':>9} {f'top-{args.top_n}':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['backend']:<10} {r['rss_mb']:>8.0f} {r['docs_per_s']:>8.1f} {r['cosine']:>8.4f} "
+            f"{r['recall']:>10.3f} {r['pairs_per_s']:>8.1f} {r['score_diff']:>9.4f} {r['agreement']:>7.3f}"
+        )
+
+    base = results[0]
+    for r in results[1:]:
+        print(
+            f"\n{r['backend']}: embedder {r['docs_per_s'] / base['docs_per_s']:.2f}x, "
+            f"reranker {r['pairs_per_s'] / base['pairs_per_s']:.2f}x torch"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Throughput benchmark for cross-encoder micro-batching.
+
+Simulates concurrent /chat requests, each reranking --docs pairs, in two
+modes and reports throughput, latency and batch sizes:
+    per_request - one cross-encoder call per request on the inference executor
+    batched     - requests share calls through the MicroBatcher
+
+Usage:
+    python scripts/benchmark_rerank_batching.py --requests 256 --concurrency 32
+    python scripts/benchmark_rerank_batching.py --max-batch 128 --max-wait-ms 10
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sentence_transformers import CrossEncoder
+from app.core.config import get_settings
+from app.core.executor import run_in_executor, shutdown_executor
+from app.services.batching import MicroBatcher
+
+settings = get_settings()
+
+
+def load_jobs(qa_path: Path, requests: int, docs: int) -> list:
+    """Build rerank jobs: each question paired with `docs` answers"""
+    with open(qa_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    items = [item for group in data.values() for item in group]
+    answers = [item["answer"] for item in items]
+
+    jobs = []
+    for i in range(requests):
+        question = items[i % len(items)]["question"]
+        jobs.append([[question, answers[(i + j) % len(answers)]] for j in range(docs)])
+    return jobs
+
+
+async def run_mode(mode: str, model: CrossEncoder, jobs: list, args) -> dict:
+    """Run all jobs with bounded concurrency and collect latencies"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    def predict(pairs):
+        return model.predict(pairs, batch_size=max(len(pairs), 1))
+
+    batcher = MicroBatcher(predict, args.max_batch, args.max_wait_ms, name=f"bench.{mode}")
+
+    async def one(pairs):
+        async with semaphore:
+            start = time.perf_counter()
+            if mode == "per_request":
+                await run_in_executor(predict, pairs)
+            else:
+                await batcher.submit(pairs)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(pairs) for pairs in jobs))
+    elapsed = time.perf_counter() - start
+    await batcher.close()
+
+    pairs = sum(len(pairs) for pairs in jobs)
+    latencies.sort()
+    stats = batcher.stats()
+    return {
+        "mode": mode,
+        "requests_per_s": len(jobs) / elapsed,
+        "pairs_per_s": pairs / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "batch_size": stats["mean_batch_size"] if mode == "batched" else len(jobs[0]),
+    }
+
+
+async def main_async(args):
+    model = CrossEncoder(settings.RERANKER_MODEL)
+    jobs = load_jobs(Path(args.qa), args.requests, args.docs)
+
+    # Warm up
+    model.predict(jobs[0])
+
+    print(
+        f"{len(jobs)} requests x {args.docs} pairs, concurrency {args.concurrency}, "
+        f"max batch {args.max_batch}, max wait {args.max_wait_ms} ms\n"
+    )
+
+    results = []
+    for mode in ("per_request", "batched"):
+        results.append(await run_mode(mode, model, jobs, args))
+
+    print(f"{'mode':<12} {'req/s':>8} {'pairs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'batch':>7}")
+    for r in results:
+        print(
+            f"{r['mode']:<12} {r['requests_per_s']:>8.1f} {r['pairs_per_s']:>9.0f} "
+            f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['batch_size']:>7.1f}"
+        )
+
+    speedup = results[1]["pairs_per_s"] / results[0]["pairs_per_s"]
+    print(f"\nBatched throughput: {speedup:.2f}x per-request")
+
+    shutdown_executor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-encoder micro-batching")
+    parser.add_argument("--qa", type=str, default="../dataset/question_answers.json")
+    parser.add_argument("--requests", type=int, default=256, help="Number of rerank requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="In-flight requests")
+    parser.add_argument("--docs", type=int, default=settings.RETRIEVAL_TOP_K, help="Pairs per request")
+    parser.add_argument("--max-batch", type=int, default=settings.RERANK_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.RERANK_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Report how the response cache key affects hit rate on perturbed queries.
+
+Every question in question_answers.json is "answered" once (its key is
+cached), then replayed with typical typing variations. A replay is a hit
+when its cache key equals the original's. Keys compared:
+    raw        - the query exactly as typed (previous behaviour)
+    canonical  - canonicalize() fast path (current cache key)
+    hazm       - full Hazm normalisation, for reference
+
+Usage:
+    python scripts/cache_hit_report.py --qa ../dataset/question_answers.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.preprocessor import PersianPreprocessor, canonicalize
+
+PERSIAN_DIGITS = str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹")
+
+PERTURBATIONS = {
+    "arabic_chars": lambda q: q.replace("ی", "ي").replace("ک", "ك"),
+    "extra_spaces": lambda q: "  " + q.replace(" ", "   ") + " ",
+    "zwnj_as_space": lambda q: q.replace("‌", " "),
+    "space_as_zwnj": lambda q: q.replace("می ", "می‌"),
+    "question_mark": lambda q: q.rstrip("?؟") + "؟" if not q.endswith("؟") else q[:-1] + "?",
+    "persian_digits": lambda q: q.translate(PERSIAN_DIGITS),
+    "tatweel": lambda q: q.replace("ه", "ـه", 1),
+}
+PERTURBATIONS["combined"] = lambda q: PERTURBATIONS["arabic_chars"](
+    PERTURBATIONS["extra_spaces"](PERTURBATIONS["question_mark"](PERTURBATIONS["persian_digits"](q)))
+)
+
+
+def load_questions(qa_path: Path) -> list:
+    with open(qa_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [item["question"] for items in data.values() for item in items]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache hit rate on perturbed queries")
+    parser.add_argument("--qa", type=str, default="../dataset/question_answers.json")
+    args = parser.parse_args()
+
+    questions = load_questions(Path(args.qa))
+    preprocessor = PersianPreprocessor()
+
+    key_functions = {
+        "raw": lambda q: q,
+        "canonical": canonicalize,
+        "hazm": preprocessor.preprocess,
+    }
+
+    print(f"{len(questions)} questions\n")
+    print(f"{'perturbation':<16}" + "".join(f"{name:>12}" for name in key_functions))
+
+    totals = {name: 0 for name in key_functions}
+    replays = 0
+    for perturbation, perturb in PERTURBATIONS.items():
+        variants = [perturb(q) for q in questions]
+        changed = [(q, v) for q, v in zip(questions, variants) if q != v]
+        if not changed:
+            continue
+
+        row = f"{perturbation:<16}"
+        for name, key in key_functions.items():
+            hits = sum(1 for q, v in changed if key(q) == key(v))
+            totals[name] += hits
+            row += f"{hits / len(changed):>12.1%}"
+        replays += len(changed)
+        print(row + f"   (n={len(changed)})")
+
+    print(f"{'overall':<16}" + "".join(f"{totals[name] / replays:>12.1%}" for name in key_functions))
+
+    # Cost of computing each key
+    print()
+    for name, key in key_functions.items():
+        start = time.perf_counter()
+        for q in questions:
+            key(q)
+        elapsed_us = (time.perf_counter() - start) / len(questions) * 1e6
+        print(f"{name:<10} key cost: {elapsed_us:8.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
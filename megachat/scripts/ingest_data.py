@@ -1,13 +1,30 @@
 """
 Data ingestion script to load products from dataset into Qdrant.
 
+Also builds the BM25 index used for hybrid retrieval (SPARSE_INDEX_PATH).
+
+Ingestion is incremental: per-channel manifests (INGEST_MANIFEST_DIR) hold a
+content hash of every ingested post, so unchanged posts are skipped, posts
+whose text is unchanged only get their payload rewritten, and posts gone
+from a channel file (or with a removed channel file) are deleted. Progress is checkpointed, so re-running
+after an interruption resumes with the remaining posts.
+
+Embeddings are kept in a persistent store (EMBEDDING_STORE_DIR) and reused
+on later runs, so rebuilding the collection (--recreate, e.g. after
+changing Qdrant settings or on a new node) does not re-run the model.
+
 Usage:
     python scripts/ingest_data.py --dataset ../dataset/sampled_posts
+    python scripts/ingest_data.py --no-sparse
+    python scripts/ingest_data.py --workers 4 --embed-batch 512 --parallel-upserts 8
+    python scripts/ingest_data.py --dry-run
+    python scripts/ingest_data.py --full
+    python scripts/ingest_data.py --recreate
 """
 
-import json
 import sys
 import argparse
+from collections import Counter, namedtuple
 from pathlib import Path
 from datetime import datetime
 import uuid
@@ -17,14 +34,43 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from app.models.schemas import Product
 from app.services.retriever import MultiQueryRetriever
+from app.services.embedding_store import EmbeddingStore
+from app.services.ingestion import (
+    BulkIngestor,
+    IngestManifest,
+    iter_json_array,
+    prefetch,
+)
+from app.services.search_text import build_search_text, with_search_text
+from app.services.sparse_index import BM25Index
 from app.core.dependencies import get_qdrant
+from app.core.vector_store import LocalVectorStore
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+# End of a channel file in the post stream (deletions only follow complete channels)
+ChannelEnd = namedtuple("ChannelEnd", ["posts", "errors", "complete"])
+
 
+def read_posts(dataset_dir: Path):
+    """Stream (channel, post) from every JSON file, then (channel, ChannelEnd) per file"""
+    json_files = sorted(dataset_dir.glob("*.json"))
+    print(f"Found {len(json_files)} JSON files")
 
-def load_posts_from_json(file_path: Path) -> list:
-    """Load posts from JSON file"""
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data
+    for json_file in json_files:
+        channel_name = json_file.stem
+        posts = 0
+        try:
+            for post in iter_json_array(json_file):
+                posts += 1
+                yield channel_name, post
+        except Exception as e:
+            print(f"   Error processing file {json_file.name}: {e}")
+            yield channel_name, ChannelEnd(posts, 0, complete=False)
+            continue
+        yield channel_name, ChannelEnd(posts, 0, complete=True)
 
 
 def post_to_product(post: dict, channel_name: str) -> Product:
@@ -67,36 +113,148 @@ def post_to_product(post: dict, channel_name: str) -> Product:
     return product
 
 
-def ingest_from_directory(dataset_dir: Path, qdrant_client):
-    """Ingest all JSON files from dataset directory"""
-    retriever = MultiQueryRetriever(qdrant_client)
+def extract_products(records, sparse_index: BM25Index = None, prepare: bool = True):
+    """Turn (channel, post) records into (channel, product), counting failed posts"""
+    errors = 0
+    for channel_name, post in records:
+        if isinstance(post, ChannelEnd):
+            yield channel_name, post._replace(errors=errors)
+            errors = 0
+            continue
 
-    json_files = list(dataset_dir.glob("*.json"))
-    print(f"Found {len(json_files)} JSON files")
+        try:
+            product = post_to_product(post, channel_name)
+        except Exception as e:
+            print(f"  Error processing post {post.get('id')}: {e}")
+            errors += 1
+            continue
 
-    total_products = 0
+        if sparse_index is not None:
+            sparse_index.add(product.id, build_search_text(product))
+        if prepare:
+            # Search text (reranker tokenisation) off the main thread
+            product = with_search_text(product)
+        yield channel_name, product
 
-    for json_file in json_files:
-        print(f"\nProcessing {json_file.name}...")
-        channel_name = json_file.stem
 
-        try:
-            posts = load_posts_from_json(json_file)
-            print(f"  Found {len(posts)} posts")
+def iter_products(
+    dataset_dir: Path,
+    sparse_index: BM25Index = None,
+    manifest: IngestManifest = None,
+    ingestor: BulkIngestor = None,
+    summary: Counter = None,
+):
+    """
+    Yield products from all JSON files in the dataset directory.
 
-            for post in posts:
-                try:
-                    product = post_to_product(post, channel_name)
-                    retriever.add_product(product)
-                    total_products += 1
-                except Exception as e:
-                    print(f"  Error processing post {post.get('id')}: {e}")
+    Posts are parsed incrementally and converted to products in two
+    background stages connected by bounded queues (INGEST_QUEUE_SIZE), so
+    memory stays flat whatever the size of the channel dumps.
 
-            print(f"   Ingested {len(posts)} products from {channel_name}")
+    With a manifest only new and changed products are yielded; payload-only
+    changes and deletions go straight to the ingestor (none: dry run), and
+    change counts are added to summary. Products of channels whose file was
+    removed from the dataset are deleted at the end.
+    """
+    records = prefetch(read_posts(dataset_dir), name="parse")
+    records = prefetch(
+        extract_products(records, sparse_index, prepare=ingestor is not None), name="extract"
+    )
 
-        except Exception as e:
-            print(f"   Error processing file {json_file.name}: {e}")
+    changes = Counter()
+    seen = set()
+
+    for channel_name, product in records:
+        if not isinstance(product, ChannelEnd):
+            if manifest is None:
+                yield product
+                continue
+
+            seen.add(product.id)
+            change = manifest.classify(channel_name, product)
+            changes[change] += 1
+            if ingestor is None or change == IngestManifest.UNCHANGED:
+                continue
+            if change == IngestManifest.PAYLOAD:
+                ingestor.update_payloads([product])
+            else:
+                yield product
+            continue
+
+        end = product
+        print(f"\n{channel_name}: {end.posts} posts, {end.errors} failed")
+        if manifest is not None:
+            # Posts that failed to parse or convert are not deletions
+            vanished = manifest.vanished(channel_name, seen) if end.complete and not end.errors else []
+            changes["delete"] = len(vanished)
+            if vanished and ingestor is not None:
+                ingestor.delete(vanished)
+                manifest.forget(channel_name, vanished)
+
+            print(
+                f"  {changes[IngestManifest.ADD]} new, {changes[IngestManifest.UPDATE]} changed, "
+                f"{changes[IngestManifest.PAYLOAD]} payload-only, {changes[IngestManifest.UNCHANGED]} unchanged, "
+                f"{changes['delete']} deleted"
+            )
+            if summary is not None:
+                summary.update(changes)
+
+        changes = Counter()
+        seen = set()
+
+    if manifest is not None:
+        present = {json_file.stem for json_file in dataset_dir.glob("*.json")}
+        for channel_name, product_ids in manifest.removed_channels(present).items():
+            print(f"\n{channel_name}: channel file removed, {len(product_ids)} products deleted")
+            if summary is not None:
+                summary["delete"] += len(product_ids)
+            if ingestor is not None:
+                if product_ids:
+                    ingestor.delete(product_ids)
+                manifest.drop(channel_name)
 
+
+def ingest_from_directory(
+    dataset_dir: Path,
+    qdrant_client,
+    sparse_index: BM25Index = None,
+    manifest: IngestManifest = None,
+    recreate: bool = False,
+    **ingest_options,
+):
+    """Ingest all JSON files from dataset directory"""
+    if recreate:
+        print(f"Dropping collection {settings.QDRANT_COLLECTION_NAME}")
+        qdrant_client.delete_collection(settings.QDRANT_COLLECTION_NAME)
+
+    summary = Counter()
+    on_upserted = manifest.confirm if manifest is not None else None
+    if manifest is not None and isinstance(qdrant_client, LocalVectorStore):
+        # Local points reach disk on save(): persist them before each checkpoint
+        manifest.flush = qdrant_client.save
+    try:
+        # The ingestor loads the model in this process only without --workers
+        with BulkIngestor(qdrant_client, on_upserted=on_upserted, **ingest_options) as ingestor:
+            # Create the collection and payload indexes if needed
+            MultiQueryRetriever.ensure_collection(qdrant_client, ingestor.vector_size)
+            collection = qdrant_client.get_collection(settings.QDRANT_COLLECTION_NAME)
+            if manifest is not None and collection.points_count == 0 and any(manifest.directory.glob("*.json")):
+                # Manifests of a collection that was since emptied or replaced
+                print("Collection is empty but manifests exist; re-ingesting every post")
+                manifest.channels = {json_file.stem: {} for json_file in dataset_dir.glob("*.json")}
+            stats = ingestor.ingest(
+                iter_products(dataset_dir, sparse_index, manifest, ingestor, summary)
+            )
+    finally:
+        # Checkpoint whatever was acknowledged, also when interrupted
+        if manifest is not None:
+            manifest.save()
+
+    if manifest is not None:
+        print(f"\nChanges: {dict(summary)}")
+
+    total_products = stats.products
+    print(f"\n{stats.report()}")
     print(f"\n Total products ingested: {total_products}")
 
 
@@ -108,6 +266,51 @@ def main():
         default="../dataset/sampled_posts",
         help="Path to dataset directory containing JSON files",
     )
+    parser.add_argument(
+        "--sparse-index",
+        type=str,
+        default=settings.SPARSE_INDEX_PATH,
+        help="Where to write the BM25 index for hybrid retrieval",
+    )
+    parser.add_argument("--no-sparse", action="store_true", help="Skip building the BM25 index")
+    parser.add_argument(
+        "--manifest-dir",
+        type=str,
+        default=settings.INGEST_MANIFEST_DIR,
+        help="Directory of per-channel ingestion manifests",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-ingest every post, ignoring the manifests (e.g. after recreating the collection)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report adds/updates/deletes")
+    parser.add_argument(
+        "--recreate",
+        action="store_true",
+        help="Drop and recreate the collection, re-ingesting everything (vectors come from the embedding store)",
+    )
+    parser.add_argument(
+        "--embedding-store",
+        type=str,
+        default=settings.EMBEDDING_STORE_DIR,
+        help="Directory of the persistent embedding store",
+    )
+    parser.add_argument("--no-embedding-store", action="store_true", help="Always encode, store nothing")
+    parser.add_argument("--embed-batch", type=int, default=settings.INGEST_EMBED_BATCH, help="Products per embedding call")
+    parser.add_argument("--upsert-batch", type=int, default=settings.INGEST_UPSERT_BATCH, help="Points per upsert request")
+    parser.add_argument(
+        "--parallel-upserts",
+        type=int,
+        default=settings.INGEST_PARALLEL_UPSERTS,
+        help="Upsert requests in flight",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.INGEST_WORKERS,
+        help="Embedding processes (0 = embed in this process)",
+    )
     args = parser.parse_args()
 
     dataset_dir = Path(args.dataset)
@@ -115,11 +318,45 @@ def main():
         print(f"Error: Dataset directory not found: {dataset_dir}")
         sys.exit(1)
 
+    manifest = IngestManifest(args.manifest_dir)
+    if args.full or args.recreate:
+        # Start from empty manifests; they are rewritten as products are upserted
+        manifest.channels = {
+            json_file.stem: {} for json_file in dataset_dir.glob("*.json")
+        }
+
+    if args.dry_run:
+        summary = Counter()
+        for _ in iter_products(dataset_dir, manifest=manifest, summary=summary):
+            pass
+        print(f"\nDry run: {dict(summary)}")
+        return
+
     print("Connecting to Qdrant...")
     qdrant_client = get_qdrant()
 
     print(f"Starting ingestion from {dataset_dir}")
-    ingest_from_directory(dataset_dir, qdrant_client)
+    sparse_index = None if args.no_sparse else BM25Index()
+    store = None
+    if settings.EMBEDDING_STORE and not args.no_embedding_store:
+        store = EmbeddingStore(args.embedding_store)
+        print(f"Embedding store: {len(store)} products, {store.rows} vectors in {store.directory}")
+    ingest_from_directory(
+        dataset_dir,
+        qdrant_client,
+        sparse_index,
+        manifest,
+        recreate=args.recreate,
+        store=store,
+        embed_batch=args.embed_batch,
+        upsert_batch=args.upsert_batch,
+        parallel_upserts=args.parallel_upserts,
+        workers=args.workers,
+    )
+
+    if sparse_index is not None:
+        sparse_index.save(args.sparse_index)
+        print(f"BM25 index: {len(sparse_index)} products, {len(sparse_index.vocabulary)} terms -> {args.sparse_index}")
 
     print("\n Ingestion complete!")
 
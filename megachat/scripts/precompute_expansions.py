@@ -0,0 +1,109 @@
+"""
+Precompute query expansions into the persistent expansion cache.
+
+Sources:
+    - questions in question_answers.json
+    - queries that missed the expansion cache in production
+      (the expansion:history Redis list)
+
+Each query is normalised the way the pipeline does it, expanded by the
+LLM, and stored in the expansion:cache Redis hash, so live requests for
+the same (canonical) query never wait on the expansion LLM.
+
+Usage:
+    python scripts/precompute_expansions.py --qa ../dataset/question_answers.json
+    python scripts/precompute_expansions.py --history-only --skip-existing
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from redis.asyncio import Redis
+from app.services.preprocessor import PersianPreprocessor, canonicalize
+from app.services.retriever import MultiQueryRetriever
+from app.services.expansion import ExpansionCache
+from app.core.dependencies import get_qdrant
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def load_questions(qa_path: Path) -> list:
+    with open(qa_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [item["question"] for items in data.values() for item in items]
+
+
+async def precompute(args) -> None:
+    redis_client = Redis.from_url(settings.redis_url, encoding="utf-8", decode_responses=True)
+    cache = ExpansionCache(redis_client)
+    retriever = MultiQueryRetriever(get_qdrant())
+    preprocessor = PersianPreprocessor()
+
+    # Collect queries, deduplicated on the cache key
+    queries = []
+    if not args.history_only:
+        queries.extend(preprocessor.preprocess(q) for q in load_questions(Path(args.qa)))
+    history = await redis_client.lrange(ExpansionCache.HISTORY_KEY, 0, -1)
+    queries.extend(history)
+
+    unique = {}
+    for query in queries:
+        unique.setdefault(canonicalize(query), query)
+
+    if args.skip_existing:
+        existing = set(await redis_client.hkeys(ExpansionCache.HASH_KEY))
+        unique = {key: q for key, q in unique.items() if key not in existing}
+
+    print(f"Queries: {len(queries)} collected, {len(history)} from history, "
+          f"{len(unique)} to expand")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    done = 0
+    failed = 0
+
+    async def expand(query: str) -> None:
+        nonlocal done, failed
+        async with semaphore:
+            variations = await retriever.agenerate_query_variations(query)
+        if len(variations) > 1:
+            await cache.set(query, variations)
+            done += 1
+        else:
+            failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(expand(q) for q in unique.values()))
+    elapsed = time.perf_counter() - start
+
+    # Replayed history is covered now (newer misses were pushed to the head)
+    if history:
+        await redis_client.ltrim(ExpansionCache.HISTORY_KEY, 0, -len(history) - 1)
+
+    total = await redis_client.hlen(ExpansionCache.HASH_KEY)
+    print(f"Expanded {done} queries in {elapsed:.1f}s ({failed} failed)")
+    print(f"Expansion cache now holds {total} queries")
+
+    await redis_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute query expansions")
+    parser.add_argument("--qa", type=str, default="../dataset/question_answers.json")
+    parser.add_argument("--history-only", action="store_true", help="Only replay cache misses")
+    parser.add_argument("--skip-existing", action="store_true", help="Keep already cached queries")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel LLM calls")
+    args = parser.parse_args()
+
+    asyncio.run(precompute(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# Settings require an OpenAI key; tests never call the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
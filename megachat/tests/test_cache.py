@@ -0,0 +1,81 @@
+import asyncio
+import numpy as np
+from app.services import cache
+from app.services.cache import CacheService, RerankScoreCache
+
+
+def test_embedding_key_depends_on_inference_backend(monkeypatch):
+    keys = {}
+    for backend, quantize in (("torch", True), ("onnx", False), ("onnx", True)):
+        monkeypatch.setattr(cache.settings, "INFERENCE_BACKEND", backend)
+        monkeypatch.setattr(cache.settings, "ONNX_QUANTIZE", quantize)
+        keys[(backend, quantize)] = CacheService.embedding_key("گوشی  سامسونگ")
+
+    assert len(set(keys.values())) == 3
+
+
+def test_embedding_key_normalises_whitespace():
+    assert CacheService.embedding_key("a  b\n") == CacheService.embedding_key("a b")
+
+
+def test_legacy_keys_do_not_depend_on_backend(monkeypatch):
+    before = CacheService.legacy_embedding_keys("query")
+    monkeypatch.setattr(cache.settings, "INFERENCE_BACKEND", "onnx")
+    assert CacheService.legacy_embedding_keys("query") == before
+
+
+def test_rerank_cache_model_name_uses_same_backend_tag(monkeypatch):
+    monkeypatch.setattr(cache.settings, "INFERENCE_BACKEND", "onnx")
+    monkeypatch.setattr(cache.settings, "ONNX_QUANTIZE", True)
+    assert RerankScoreCache.default_model_name().endswith(":onnx-int8")
+
+
+class FakeBinaryRedis:
+    """The few binary-client calls the embedding cache makes"""
+
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.writes = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.writes.append((key, value))
+
+    async def execute(self):
+        self.redis.data.update(self.writes)
+
+
+def test_legacy_entries_are_migrated_and_wrong_sizes_dropped():
+    good, bad = np.arange(4, dtype=np.float32), np.arange(6, dtype=np.float32)
+    redis = FakeBinaryRedis({
+        CacheService.legacy_embedding_keys("good")[0]: good.tobytes(),
+        CacheService.legacy_embedding_keys("bad")[1]: bad.tobytes(),
+    })
+    service = CacheService(None, redis)
+
+    result = asyncio.run(service.get_cached_embeddings(["good", "bad"], dim=4))
+
+    assert np.array_equal(result[0], good)
+    assert result[1] is None
+    # Both legacy keys are gone; only the good vector was rewritten
+    assert set(redis.data) == {CacheService.embedding_key("good")}
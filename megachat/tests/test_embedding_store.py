@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from app.services.embedding_store import EmbeddingStore
+
+DIM = 8
+
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def store(tmp_path, dtype: str = "float32") -> EmbeddingStore:
+    return EmbeddingStore(str(tmp_path), version="test-model:torch", dtype=dtype)
+
+
+def test_put_lookup_and_reload(tmp_path):
+    texts = ["phone", "case", "charger"]
+    embeddings = vectors(3)
+    first = store(tmp_path)
+    first.put_many(texts, embeddings)
+    first.map_products(["a", "b", "c"], texts)
+    first.flush()
+
+    reloaded = store(tmp_path)
+    assert len(reloaded) == 3
+    assert reloaded.lookup(["case", "missing"]) == [1, None]
+    found = reloaded.get_many(["charger", "missing", "phone"])
+    assert np.array_equal(found[0], embeddings[2])
+    assert found[1] is None
+    assert np.array_equal(found[2], embeddings[0])
+
+
+def test_identical_texts_share_a_row(tmp_path):
+    embeddings = store(tmp_path)
+    embeddings.put_many(["same  text", "same text", "other"], vectors(3))
+    assert embeddings.rows == 2
+    assert embeddings.lookup(["same text"]) == [0]
+
+
+def test_rows_written_after_the_last_flush_are_discarded(tmp_path):
+    interrupted = store(tmp_path)
+    kept = vectors(2)
+    interrupted.put_many(["a", "b"], kept)
+    interrupted.flush()
+    # Appended to the file, but the run dies before the index is written
+    interrupted.put_many(["c", "d"], vectors(2, seed=1))
+
+    resumed = store(tmp_path)
+    assert resumed.rows == 2
+    assert resumed.lookup(["c"]) == [None]
+    added = vectors(1, seed=2)
+    resumed.put_many(["e"], added)
+    resumed.flush()
+
+    reloaded = store(tmp_path)
+    assert reloaded.rows == 3
+    assert reloaded.vectors_path.stat().st_size == 3 * DIM * 4
+    assert np.array_equal(reloaded.get_many(["a"])[0], kept[0])
+    assert np.array_equal(reloaded.get_many(["e"])[0], added[0])
+
+
+def test_float16_store(tmp_path):
+    embeddings = vectors(4)
+    half = store(tmp_path, dtype="float16")
+    half.put_many(list("wxyz"), embeddings)
+    half.flush()
+
+    # An existing store keeps its dtype
+    reloaded = store(tmp_path, dtype="float32")
+    assert reloaded.dtype_name == "float16"
+    assert np.allclose(reloaded.get_many(["y"])[0], embeddings[2], atol=1e-2)
+
+
+def test_dimension_mismatch(tmp_path):
+    embeddings = store(tmp_path)
+    embeddings.put_many(["a"], vectors(1))
+    with pytest.raises(ValueError):
+        embeddings.put_many(["b"], np.zeros((1, DIM + 1), dtype=np.float32))
+
+
+def test_forget_and_iter_products(tmp_path):
+    embeddings = store(tmp_path)
+    texts = [f"text {i}" for i in range(5)]
+    matrix = vectors(5)
+    embeddings.put_many(texts, matrix)
+    embeddings.map_products([f"p{i}" for i in range(5)], texts)
+    embeddings.forget(["p1", "p3"])
+
+    batches = list(embeddings.iter_products(batch_size=2))
+    product_ids = [product_id for ids, _ in batches for product_id in ids]
+    assert product_ids == ["p0", "p2", "p4"]
+    assert np.array_equal(np.vstack([batch for _, batch in batches]), matrix[[0, 2, 4]])
+    # Rows stay for identical texts
+    assert embeddings.lookup(["text 1"]) == [1]
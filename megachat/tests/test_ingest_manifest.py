@@ -0,0 +1,92 @@
+import json
+from app.models.schemas import Product
+from app.services.ingestion import IngestManifest
+
+
+def product(product_id: str, description: str, views: int = 0) -> Product:
+    return Product(
+        id=product_id,
+        name=description[:100],
+        description=description,
+        price=0,
+        metadata={"channel": "shop", "views": views},
+    )
+
+
+def manifest(tmp_path, **kwargs) -> IngestManifest:
+    return IngestManifest(str(tmp_path / "manifests"), version="test", **kwargs)
+
+
+def ingest(manifest: IngestManifest, channel: str, products) -> None:
+    for item in products:
+        manifest.classify(channel, item)
+    manifest.confirm(products)
+    manifest.save()
+
+
+def test_classifies_changes_against_the_saved_manifest(tmp_path):
+    ingest(manifest(tmp_path), "shop", [product("a", "phone"), product("b", "case")])
+
+    reloaded = manifest(tmp_path)
+    assert reloaded.classify("shop", product("a", "phone")) == IngestManifest.UNCHANGED
+    assert reloaded.classify("shop", product("b", "red case")) == IngestManifest.UPDATE
+    assert reloaded.classify("shop", product("a", "phone", views=5)) == IngestManifest.PAYLOAD
+    assert reloaded.classify("shop", product("c", "charger")) == IngestManifest.ADD
+    assert reloaded.vanished("shop", {"a", "c"}) == ["b"]
+
+
+def test_unconfirmed_writes_are_not_recorded(tmp_path):
+    first = manifest(tmp_path)
+    first.classify("shop", product("a", "phone"))
+    first.save()
+
+    assert manifest(tmp_path).classify("shop", product("a", "phone")) == IngestManifest.ADD
+
+
+def test_other_version_reingests_the_channel(tmp_path):
+    ingest(manifest(tmp_path), "shop", [product("a", "phone")])
+
+    other = IngestManifest(str(tmp_path / "manifests"), version="other")
+    assert other.classify("shop", product("a", "phone")) == IngestManifest.ADD
+
+
+def test_checkpoint_flushes_the_store_first(tmp_path):
+    events = []
+    checkpointed = manifest(tmp_path, checkpoint_every=2, flush=lambda: events.append("flush"))
+    original_save = checkpointed.save
+
+    def save():
+        original_save()
+        events.append("save")
+
+    checkpointed.save = save
+    products = [product(str(i), f"item {i}") for i in range(4)]
+    for item in products:
+        checkpointed.classify("shop", item)
+    checkpointed.confirm(products[:1])
+    assert events == []
+    checkpointed.confirm(products[1:])
+    assert events == ["flush", "save"]
+
+
+def test_removed_channels_are_reported_and_dropped(tmp_path):
+    flushed = []
+    ingest(manifest(tmp_path), "shop", [product("a", "phone"), product("b", "case")])
+    ingest(manifest(tmp_path), "gone", [product("c", "watch")])
+    # Written for another version: still deleted
+    stale = IngestManifest(str(tmp_path / "manifests"), version="old")
+    ingest(stale, "older", [product("d", "laptop")])
+
+    current = manifest(tmp_path, flush=lambda: flushed.append(True))
+    removed = current.removed_channels({"shop"})
+    assert removed == {"gone": ["c"], "older": ["d"]}
+
+    for channel in removed:
+        current.drop(channel)
+    assert current.removed_channels({"shop"}) == {}
+    current.save()
+
+    assert flushed == [True]
+    assert sorted(path.stem for path in (tmp_path / "manifests").glob("*.json")) == ["shop"]
+    with open(tmp_path / "manifests" / "shop.json", encoding="utf-8") as f:
+        assert sorted(json.load(f)["posts"]) == ["a", "b"]
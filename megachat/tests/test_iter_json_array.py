@@ -0,0 +1,47 @@
+import json
+import pytest
+from app.services.ingestion import iter_json_array
+
+DOCUMENTS = [
+    "[]",
+    "  [ ]  ",
+    "[1234, 5678]",
+    '[\n -15000000000.0,\n null\n]',
+    "[1e5, -2.5E-3, 0, -0.0, 12.75e+2]",
+    '[true, false, null, "a, b ] c", "\\u0627\\"]"]',
+    '[{"id": 1, "text": "سلام ]["}, [1, [2, 3]], {"nested": {"x": [4.5e1]}}]',
+]
+CHUNK_SIZES = [1, 2, 3, 4, 5, 7, 16, 4096]
+
+
+def write(tmp_path, text: str):
+    path = tmp_path / "posts.json"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_matches_json_for_every_chunk_size(tmp_path, text, chunk_size):
+    path = write(tmp_path, text)
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": 1}',
+        "[1 2]",
+        "[1,, 2]",
+        "[1, 2,]",
+        "[,1]",
+        "[1, 2",
+        '[{"a": 1}',
+        "[1.5e]",
+    ],
+)
+def test_rejects_invalid_arrays(tmp_path, text, chunk_size):
+    path = write(tmp_path, text)
+    with pytest.raises(ValueError):
+        list(iter_json_array(path, chunk_size=chunk_size))
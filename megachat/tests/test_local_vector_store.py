@@ -0,0 +1,188 @@
+import asyncio
+import numpy as np
+import pytest
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchAny,
+    MatchValue,
+    OverwritePayloadOperation,
+    PointIdsList,
+    PointStruct,
+    Range,
+    SearchRequest,
+    SetPayload,
+    VectorParams,
+)
+from app.core import vector_store
+from app.core.vector_index import brute_force_search
+from app.core.vector_store import AsyncLocalVectorStore, LocalVectorStore
+
+DIM = 16
+COLLECTION = "products"
+
+
+def unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+VECTORS = unit(np.random.default_rng(0).standard_normal((200, DIM)).astype(np.float32))
+
+
+def payload(i: int) -> dict:
+    return {
+        "id": f"p{i}",
+        "price": i * 1000,
+        "availability": i % 2 == 0,
+        "metadata": {"channel": f"shop{i % 4}"},
+    }
+
+
+@pytest.fixture
+def store(tmp_path) -> LocalVectorStore:
+    store = LocalVectorStore(str(tmp_path / "store"))
+    store.create_collection(COLLECTION, VectorParams(size=DIM, distance=Distance.COSINE))
+    store.upsert(
+        COLLECTION,
+        [PointStruct(id=i, vector=VECTORS[i].tolist(), payload=payload(i)) for i in range(len(VECTORS))],
+    )
+    return store
+
+
+def ids(points) -> list:
+    return [point.id for point in points]
+
+
+def test_search_is_exact_without_a_graph(store):
+    query = VECTORS[3]
+    expected, _ = brute_force_search(VECTORS, query, 5)
+    assert ids(store.search(COLLECTION, query.tolist(), limit=5)) == expected.tolist()
+
+
+def test_filters(store):
+    query_filter = Filter(
+        must=[
+            FieldCondition(key="metadata.channel", match=MatchAny(any=["shop1", "shop2"])),
+            FieldCondition(key="price", range=Range(gte=50_000, lt=150_000)),
+        ],
+        must_not=[FieldCondition(key="availability", match=MatchValue(value=True))],
+    )
+    found = store.search(COLLECTION, VECTORS[0].tolist(), query_filter=query_filter, limit=200)
+
+    expected = {
+        i for i in range(len(VECTORS))
+        if i % 4 in (1, 2) and 50_000 <= i * 1000 < 150_000 and i % 2 == 1
+    }
+    assert set(ids(found)) == expected
+    scores = [point.score for point in found]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_batch_matches_single_searches(store):
+    query_filter = Filter(must=[FieldCondition(key="metadata.channel", match=MatchValue(value="shop3"))])
+    requests = [
+        SearchRequest(vector=VECTORS[i].tolist(), filter=query_filter, limit=4, with_payload=True)
+        for i in range(3)
+    ] + [SearchRequest(vector=VECTORS[9].tolist(), limit=2, with_payload=True)]
+
+    batch = store.search_batch(COLLECTION, requests)
+    for request, points in zip(requests, batch):
+        single = store.search(COLLECTION, request.vector, query_filter=request.filter, limit=request.limit)
+        assert ids(points) == ids(single)
+
+
+def test_upsert_replaces_and_delete_removes(store):
+    store.upsert(COLLECTION, [PointStruct(id=5, vector=VECTORS[7].tolist(), payload={"id": "new"})])
+    store.delete(COLLECTION, points_selector=PointIdsList(points=[7]))
+
+    found = store.search(COLLECTION, VECTORS[7].tolist(), limit=1)
+    assert ids(found) == [5]
+    assert found[0].payload == {"id": "new"}
+    assert store.retrieve(COLLECTION, [7]) == []
+    assert store.get_collection(COLLECTION).points_count == len(VECTORS) - 1
+
+
+def test_delete_by_filter(store):
+    selector = FilterSelector(filter=Filter(must=[FieldCondition(key="availability", match=MatchValue(value=True))]))
+    store.delete(COLLECTION, points_selector=selector)
+    assert store.get_collection(COLLECTION).points_count == len(VECTORS) // 2
+    assert all(i % 2 == 1 for i in ids(store.search(COLLECTION, VECTORS[0].tolist(), limit=50)))
+
+
+def test_payload_updates(store):
+    store.overwrite_payload(COLLECTION, {"id": "p1", "price": 1}, points=[1])
+    store.batch_update_points(
+        COLLECTION,
+        [OverwritePayloadOperation(overwrite_payload=SetPayload(payload={"id": "p2", "price": 2}, points=[2]))],
+    )
+    records = {record.id: record.payload for record in store.retrieve(COLLECTION, [1, 2])}
+    assert records == {1: {"id": "p1", "price": 1}, 2: {"id": "p2", "price": 2}}
+
+    # Filter structures see the new payloads
+    cheap = Filter(must=[FieldCondition(key="price", range=Range(lte=2))])
+    assert set(ids(store.search(COLLECTION, VECTORS[0].tolist(), query_filter=cheap, limit=10))) == {0, 1, 2}
+
+
+def test_compaction_keeps_live_points(store):
+    store.delete(COLLECTION, points_selector=PointIdsList(points=list(range(150))))
+    collection = store._collection(COLLECTION)
+    # More than half the rows were dead: compacted
+    assert collection.size == 50
+
+    query = VECTORS[160]
+    assert ids(store.search(COLLECTION, query.tolist(), limit=1)) == [160]
+    expected, _ = brute_force_search(VECTORS[150:], query, 5)
+    assert ids(store.search(COLLECTION, query.tolist(), limit=5)) == (expected + 150).tolist()
+
+
+def test_save_and_reload(store, tmp_path):
+    store.create_payload_index(COLLECTION, "metadata.channel", "keyword")
+    store.save()
+
+    reloaded = LocalVectorStore(str(tmp_path / "store"), read_only=True)
+    info = reloaded.get_collection(COLLECTION)
+    assert info.points_count == len(VECTORS)
+    assert info.payload_schema == {"metadata.channel": "keyword"}
+    query = VECTORS[11].tolist()
+    assert ids(reloaded.search(COLLECTION, query, limit=5)) == ids(store.search(COLLECTION, query, limit=5))
+
+
+def test_read_only_store_rejects_writes(store, tmp_path):
+    store.save()
+    reloaded = LocalVectorStore(str(tmp_path / "store"), read_only=True)
+    with pytest.raises(PermissionError):
+        reloaded.upsert(COLLECTION, [PointStruct(id=1, vector=VECTORS[0].tolist(), payload={})])
+    with pytest.raises(PermissionError):
+        reloaded.delete(COLLECTION, points_selector=PointIdsList(points=[1]))
+
+
+def test_graph_search_with_unindexed_tail(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store.settings, "LOCAL_INDEX", "hnsw")
+    store.save()
+    collection = store._collection(COLLECTION)
+    assert collection.index is not None and collection.index.size == len(VECTORS)
+
+    # Added after the graph was built: found by the exact scan of the tail
+    extra = unit(np.random.default_rng(1).standard_normal((20, DIM)).astype(np.float32))
+    store.upsert(COLLECTION, [PointStruct(id=1000 + i, vector=extra[i].tolist(), payload={}) for i in range(20)])
+    for i in range(20):
+        assert ids(store.search(COLLECTION, extra[i].tolist(), limit=1)) == [1000 + i]
+
+
+def test_async_facade_runs_concurrent_reads_and_writes(store):
+    client = AsyncLocalVectorStore(store)
+
+    async def main():
+        searches = [client.search(COLLECTION, VECTORS[i].tolist(), limit=1) for i in range(20)]
+        writes = [
+            client.upsert(COLLECTION, [PointStruct(id=500 + i, vector=VECTORS[i].tolist(), payload={})])
+            for i in range(5)
+        ]
+        return await asyncio.gather(*searches, *writes)
+
+    results = asyncio.run(main())
+    for i, found in enumerate(results[:20]):
+        assert ids(found)[0] in (i, 500 + i)
+    assert store.get_collection(COLLECTION).points_count == len(VECTORS) + 5
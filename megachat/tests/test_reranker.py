@@ -0,0 +1,68 @@
+import pytest
+from app.models.schemas import Product, RetrievedDocument
+from app.services.reranker import RerankerService
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number in the product name"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, pairs, batch_size=None):
+        self.calls += 1
+        return [float(pair[1].split()[-1]) / 100 for pair in pairs]
+
+
+def documents(scores):
+    return [
+        RetrievedDocument(
+            product=Product(id=str(i), name=f"product {i}", description=f"product {i}", price=0),
+            score=score,
+        )
+        for i, score in enumerate(scores)
+    ]
+
+
+def reranker():
+    return RerankerService(model=FakeCrossEncoder())
+
+
+# Top 2 lead clearly: as cosine similarities and as RRF scores of the same ranking
+SETTLED = [
+    [0.90, 0.88, 0.70, 0.69, 0.68],
+    [1 / 61 + 1 / 62, 1 / 62 + 1 / 61, 1 / 63, 1 / 64, 1 / 65],
+]
+# Evenly spread: nothing settled on either scale
+AMBIGUOUS = [
+    [0.90, 0.88, 0.86, 0.84, 0.82],
+    [1 / 61, 1 / 62, 1 / 63, 1 / 64, 1 / 65],
+]
+
+
+@pytest.mark.parametrize("scores", SETTLED)
+def test_cascade_skips_cross_encoder_on_clear_margin(scores):
+    service = reranker()
+    result = service.rerank("query", documents(scores), top_k=2)
+
+    assert service.model.calls == 0
+    assert {doc.product.id for doc in result} == {"0", "1"}
+    assert [doc.rank for doc in result] == [1, 2]
+    assert service.cascade_stats()["skipped"] == 1
+
+
+@pytest.mark.parametrize("scores", AMBIGUOUS)
+def test_cascade_scores_ambiguous_head(scores):
+    service = reranker()
+    result = service.rerank("query", documents(scores), top_k=2)
+
+    assert service.model.calls == 1
+    # Cross-encoder order (higher product number first)
+    assert [doc.product.id for doc in result] == ["4", "3"]
+    assert [doc.score for doc in result] == [0.04, 0.03]
+
+
+def test_cascade_never_skips_on_tied_scores():
+    service = reranker()
+    service.rerank("query", documents([1.0] * 5), top_k=2)
+    assert service.model.calls == 1
@@ -0,0 +1,31 @@
+from app.models.schemas import Product, RetrievedDocument
+from app.services.retrieval_policy import RetrievalPolicy
+
+
+def top(score):
+    return [RetrievedDocument(product=Product(id="1", name="p", price=0), score=score)]
+
+
+def test_mean_top_score_only_covers_cross_encoder_scores():
+    policy = RetrievalPolicy()
+    budget = policy.budgets["standard"]
+
+    policy.record(budget, 10.0, top(0.8))
+    policy.record(budget, 10.0, top(0.4))
+    # Settled by the cascade on an RRF score: another scale
+    policy.record(budget, 10.0, top(0.016), rerank_skipped=True)
+    policy.record(budget, 10.0, [])
+
+    stats = policy.stats()["standard"]
+    assert stats["requests"] == 4
+    assert stats["mean_top_score"] == 0.6
+    assert stats["rerank_rate"] == 0.75
+    assert stats["rerank_skip_rate"] == 0.25
+    assert stats["empty_rate"] == 0.25
+
+
+def test_lookup_budget_records_retrieval_scores():
+    policy = RetrievalPolicy()
+    budget = policy.budgets["lookup"]
+    policy.record(budget, 5.0, top(0.9))
+    assert policy.stats()["lookup"]["mean_top_score"] == 0.9
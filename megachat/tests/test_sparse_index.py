@@ -0,0 +1,88 @@
+import pytest
+from app.services.sparse_index import BM25Index
+
+PRODUCTS = {
+    "a": "گوشی سامسونگ Galaxy A54 مشکی",
+    "b": "گوشی شیائومی Redmi Note 12",
+    "c": "کولر گازی گری ۱۸۰۰۰",
+    "d": "قاب گوشی سامسونگ A54",
+    "e": "هدفون بی سیم شیائومی",
+}
+
+
+def build(products=PRODUCTS) -> BM25Index:
+    index = BM25Index()
+    for product_id, text in products.items():
+        index.add(product_id, text)
+    index.build()
+    return index
+
+
+def test_search_ranks_by_bm25():
+    hits = build().search("کولر گازی", top_k=3)
+    assert hits[0][0] == "c"
+    assert len(hits) == 1
+
+
+def test_search_top_k_and_order():
+    hits = build().search("گوشی سامسونگ شیائومی", top_k=2)
+    assert len(hits) == 2
+    assert hits[0][1] >= hits[1][1]
+
+
+def test_unknown_terms_return_nothing():
+    assert build().search("یخچال") == []
+
+
+def test_exact_match_needs_identifiers_in_the_top_document():
+    index = build()
+    hits = index.search("redmi", top_k=5)
+    assert hits[0][0] == "b"
+    assert index.is_exact_match("redmi", hits)
+
+    # No identifier-like terms
+    hits = index.search("کولر گازی", top_k=5)
+    assert not index.is_exact_match("کولر گازی", hits)
+
+
+def test_exact_match_needs_a_clear_margin():
+    index = build()
+    # "a54" is in both a and d with similar scores
+    hits = index.search("a54", top_k=5)
+    assert {product_id for product_id, _ in hits} == {"a", "d"}
+    assert not index.is_exact_match("a54", hits)
+
+
+def test_rebuild_replaces_documents():
+    index = build()
+    index.add("c", "بخاری برقی")
+    index.build()
+    assert index.search("کولر") == []
+    assert index.search("بخاری")[0][0] == "c"
+    assert len(index) == len(PRODUCTS)
+
+
+def test_added_documents_are_searchable_before_build():
+    index = build()
+    index.add("f", "گوشی Pixel 8 گوگل")
+    index.add("c", "بخاری برقی")
+
+    live = index.search("گوشی pixel بخاری کولر", top_k=10)
+
+    rebuilt = build({**PRODUCTS, "f": "گوشی Pixel 8 گوگل", "c": "بخاری برقی"})
+    expected = rebuilt.search("گوشی pixel بخاری کولر", top_k=10)
+    assert [product_id for product_id, _ in live] == [product_id for product_id, _ in expected]
+    assert [score for _, score in live] == pytest.approx([score for _, score in expected], rel=1e-5)
+
+    assert index.is_exact_match("pixel", index.search("pixel"))
+    assert not index.contains_terms("c", ["کولر"])
+
+
+def test_save_and_load(tmp_path):
+    index = build()
+    path = tmp_path / "bm25.npz"
+    index.save(str(path))
+
+    loaded = BM25Index.load(str(path))
+    assert loaded.doc_ids == index.doc_ids
+    assert loaded.search("گوشی سامسونگ") == index.search("گوشی سامسونگ")
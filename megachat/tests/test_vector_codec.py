@@ -0,0 +1,59 @@
+import json
+import numpy as np
+import pytest
+from app.services.vector_codec import decode_legacy_vector, decode_vector, encode_vector
+
+rng = np.random.default_rng(0)
+VECTOR = rng.standard_normal(1024).astype(np.float32)
+
+
+@pytest.mark.parametrize("codec, tolerance", [("float32", 0.0), ("float16", 1e-2), ("int8", 2e-2)])
+def test_round_trip(codec, tolerance):
+    decoded = decode_vector(encode_vector(VECTOR, codec))
+    assert decoded.shape == VECTOR.shape
+    assert np.max(np.abs(decoded.astype(np.float32) - VECTOR)) <= tolerance * np.max(np.abs(VECTOR))
+
+
+def test_float32_decode_is_zero_copy():
+    data = encode_vector(VECTOR)
+    assert not decode_vector(data).flags.owndata
+
+
+def test_unknown_tag_raises():
+    with pytest.raises(ValueError):
+        decode_vector(b"x\x00\x00\x00" + VECTOR.tobytes())
+
+
+def test_zero_vector_int8():
+    assert not np.any(decode_vector(encode_vector(np.zeros(8), "int8")))
+
+
+def test_legacy_json():
+    data = json.dumps(VECTOR.tolist()).encode()
+    assert np.allclose(decode_legacy_vector(data, dim=1024), VECTOR)
+
+
+def test_legacy_raw_float32():
+    assert np.array_equal(decode_legacy_vector(VECTOR.tobytes(), dim=1024), VECTOR)
+
+
+def test_legacy_raw_float32_starting_with_bracket():
+    vector = VECTOR.copy()
+    # First byte of the little-endian float is "["
+    vector[0] = np.frombuffer(b"[\x00\x00\x3f", dtype=np.float32)[0]
+    assert np.array_equal(decode_legacy_vector(vector.tobytes(), dim=1024), vector)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        VECTOR[:512].tobytes(),
+        b"abcd" * 3,
+        json.dumps([1.0, 2.0]).encode(),
+        json.dumps([[1.0] * 1024]).encode(),
+        b"abc",
+    ],
+)
+def test_legacy_rejects_other_sizes(data):
+    assert decode_legacy_vector(data, dim=1024) is None
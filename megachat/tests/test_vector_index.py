@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from app.core.vector_index import HNSWIndex, brute_force_search, brute_force_search_batch
+
+
+def unit_vectors(count: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+MATRIX = unit_vectors(2000)
+QUERIES = unit_vectors(50, seed=1)
+
+
+def recall(index: HNSWIndex, k: int = 10, allowed=None) -> float:
+    hits = 0
+    for query in QUERIES:
+        exact, _ = brute_force_search(MATRIX, query, k, allowed)
+        approx, _ = index.search(MATRIX, query, k, allowed)
+        hits += len(set(exact.tolist()) & set(approx.tolist()))
+    return hits / (k * len(QUERIES))
+
+
+@pytest.fixture(scope="module")
+def index() -> HNSWIndex:
+    index = HNSWIndex(m=16, ef_construction=100, ef_search=64)
+    index.add(MATRIX)
+    return index
+
+
+def test_brute_force_matches_numpy():
+    rows, scores = brute_force_search(MATRIX, QUERIES[0], 5)
+    expected = np.argsort(-(MATRIX @ QUERIES[0]))[:5]
+    assert rows.tolist() == expected.tolist()
+    assert np.allclose(scores, MATRIX[expected] @ QUERIES[0])
+
+
+def test_brute_force_batch_respects_allowed_rows():
+    allowed = np.zeros(len(MATRIX), dtype=bool)
+    allowed[::7] = True
+    for rows, _ in brute_force_search_batch(MATRIX, QUERIES[:5], 10, allowed):
+        assert len(rows) == 10
+        assert allowed[rows].all()
+
+
+def test_brute_force_with_nothing_allowed():
+    rows, scores = brute_force_search(MATRIX, QUERIES[0], 5, np.zeros(len(MATRIX), dtype=bool))
+    assert len(rows) == len(scores) == 0
+
+
+def test_hnsw_recall_against_brute_force(index):
+    assert recall(index) >= 0.9
+
+
+def test_hnsw_filtered_results_are_allowed(index):
+    allowed = np.zeros(len(MATRIX), dtype=bool)
+    allowed[::2] = True
+    for query in QUERIES[:10]:
+        rows, _ = index.search(MATRIX, query, 10, allowed, ef=256)
+        assert allowed[rows].all()
+    assert recall(index, allowed=allowed) >= 0.8
+
+
+def test_incremental_add_covers_new_rows():
+    index = HNSWIndex(m=16, ef_construction=100, ef_search=64)
+    index.add(MATRIX[:1000])
+    assert index.size == 1000
+    index.add(MATRIX)
+    assert index.size == len(MATRIX)
+    assert recall(index) >= 0.9
+
+
+def test_save_and_load(tmp_path, index):
+    path = tmp_path / "hnsw.npz"
+    index.save(path)
+    loaded = HNSWIndex.load(path)
+
+    assert loaded.size == index.size
+    for query in QUERIES[:10]:
+        assert loaded.search(MATRIX, query, 10)[0].tolist() == index.search(MATRIX, query, 10)[0].tolist()